@@ -0,0 +1,102 @@
+"""
+    Throughput of namespace exports and imports
+
+    Creates --notebooks notebooks in the namespace of the TileDB Cloud stand-in of tests/localcloud.py and exports them with
+    export_archive. A second export shows the cost of resuming when everything is already in the archive. Then the
+    notebooks are copied the way it was done before, one get and one save at a time, and imported back with
+    import_archive. Copies and imports go to the same namespace under incremented names.
+
+    Usage: python benchmarks/archive_throughput.py [--notebooks 200] [--cells 200] [--latency-ms 20]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from nbformat.sign import MemorySignatureStore  # noqa: E402
+
+from tests.localcloud import NAMESPACE, LocalCloud, notebook_model  # noqa: E402
+from tiledbcontents.tiledbcontents import TileDBCloudContentsManager  # noqa: E402
+
+SOURCE = "cloud/owned/{}".format(NAMESPACE)
+
+
+def report(name, notebooks, size, seconds):
+    print(
+        "{:>22s} {:10d} {:10.2f} {:14.1f} {:10.2f}".format(
+            name, notebooks, seconds, notebooks / seconds, size / 1e6 / seconds
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notebooks", type=int, default=200)
+    parser.add_argument("--cells", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="tiledbcontents-archive-")
+    cloud = LocalCloud(os.path.join(root, "arrays"), latency=args.latency_ms / 1000.0)
+    os.makedirs(cloud.root)
+    os.makedirs(os.path.join(root, "local"))
+    cloud.install()
+    try:
+        cm = TileDBCloudContentsManager(root_dir=os.path.join(root, "local"))
+        cm.notary.store = MemorySignatureStore()
+        # Notebooks without language_info are saved as new arrays
+        names = [
+            cm.save(
+                notebook_model(args.cells, i, new=True),
+                "{}/nb{:05d}.ipynb".format(SOURCE, i),
+            )["name"]
+            for i in range(args.notebooks)
+        ]
+        size = sum(model["size"] for model in cm.get(SOURCE)["content"])
+
+        print(
+            "{} notebooks, {:.1f} MB, latency {:g} ms".format(
+                args.notebooks, size / 1e6, args.latency_ms
+            )
+        )
+        print(
+            "{:>22s} {:>10s} {:>10s} {:>14s} {:>10s}".format(
+                "method", "notebooks", "seconds", "notebooks/s", "MB/s"
+            )
+        )
+
+        archive = os.path.join(root, "archive")
+        stats = cm.export_archive(SOURCE, archive)
+        assert not stats["failed"], stats["failed"]
+        report("export", stats["notebooks"], stats["bytes"], stats["seconds"])
+
+        stats = cm.export_archive(SOURCE, archive)
+        print(
+            "{:>22s} {:10d} {:10.2f} skipped {}".format(
+                "resumed export", stats["notebooks"], stats["seconds"], stats["skipped"]
+            )
+        )
+
+        # The stand-in only has the namespace of the user, copies get incremented names
+        start = time.perf_counter()
+        for name in names:
+            model = cm.get("{}/{}.ipynb".format(SOURCE, name))
+            model["content"]["metadata"].pop("language_info", None)
+            cm.save(model, "{}/{}.ipynb".format(SOURCE, name))
+        report("get and save", len(names), size, time.perf_counter() - start)
+
+        stats = cm.import_archive(archive, SOURCE)
+        assert not stats["failed"], stats["failed"]
+        report("import", stats["notebooks"], stats["bytes"], stats["seconds"])
+    finally:
+        cloud.uninstall()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+    Time and bytes written by checkpoints of large local notebooks
+
+    Saves a local notebook of --size-mb MB of outputs and creates a checkpoint of it --repeat times, with the
+    checkpoints of the notebook server (the notebook is read, validated and written again) and with the file
+    copies of TileDBCheckpoints, as a copy, a hardlink or a reflink depending on the filesystem of --root.
+    Bytes written are read from /proc/self/io where available.
+
+    Usage: python benchmarks/checkpoint_io.py [--size-mb 50] [--repeat 5] [--root /tmp]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import nbformat  # noqa: E402
+from notebook.services.contents.filecheckpoints import (  # noqa: E402
+    GenericFileCheckpoints,
+)
+from traitlets.config import Config  # noqa: E402
+
+from tiledbcontents.tiledbcontents import TileDBCloudContentsManager  # noqa: E402
+
+PATH = "large.ipynb"
+
+
+def written_bytes():
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def make_notebook(size_mb):
+    output = nbformat.v4.new_output("stream", name="stdout", text="x" * 1024 * 1024)
+    cells = [
+        nbformat.v4.new_code_cell("print('x' * 2 ** 20)", outputs=[output])
+        for _ in range(size_mb)
+    ]
+    return nbformat.v4.new_notebook(cells=cells)
+
+
+def run_case(root, checkpoints_class, hardlink, notebook, repeat):
+    config = Config()
+    config.TileDBCheckpoints.hardlink_checkpoints = hardlink
+    cm = TileDBCloudContentsManager(root_dir=root, config=config)
+    if checkpoints_class is not None:
+        cm.checkpoints_class = checkpoints_class
+    cm.save({"type": "notebook", "content": notebook}, PATH)
+
+    written = written_bytes()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cm.create_checkpoint(PATH)
+    elapsed = (time.perf_counter() - start) / repeat
+    return elapsed, (written_bytes() - written) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--root", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    notebook = make_notebook(args.size_mb)
+    print("{} MB notebook, {} checkpoints".format(args.size_mb, args.repeat))
+    print("{:>22s} {:>14s} {:>14s}".format("checkpoints", "ms each", "MB written"))
+    cases = (
+        ("notebook server", GenericFileCheckpoints, False),
+        ("copy or reflink", None, False),
+        ("hardlink or reflink", None, True),
+    )
+    for name, checkpoints_class, hardlink in cases:
+        with tempfile.TemporaryDirectory(dir=args.root) as root:
+            elapsed, written = run_case(
+                root, checkpoints_class, hardlink, notebook, args.repeat
+            )
+        print("{:>22s} {:14.1f} {:14.1f}".format(name, elapsed * 1000, written / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+    Peak memory of encoding file downloads
+
+    Compares reading a whole file and encoding it at once with the sliced encoding used for cloud file downloads.
+    Each case runs in a fresh interpreter and reports its peak RSS growth. The array is simulated by a reader
+    returning slices of a repeated pattern, so only the memory of reading and encoding is measured. The whole case
+    is conservative: reading the array through TileDB also returned 8 bytes of coordinates per byte of contents.
+
+    Usage: python benchmarks/download_memory.py [--sizes 100,1024] [--format base64] [--chunk-size 3145728]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ENCODING_MODULE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "tiledbcontents", "encoding.py"
+)
+
+CASE = """
+import importlib.util, resource, sys, time
+spec = importlib.util.spec_from_file_location("encoding", {module!r})
+encoding = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(encoding)
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+size = {size}
+pattern = bytes(range(32, 127)) * 11
+def read_slice(start, stop):
+    repeat = (stop - start) // len(pattern) + 1
+    return (pattern * repeat)[: stop - start]
+
+before = rss_mb()
+start = time.perf_counter()
+if {method!r} == "whole":
+    data = read_slice(0, size)
+    content, format = encoding.encode_contents(lambda a, b: data[a:b], size, {format!r}, chunk_size=size + 3)
+    del data
+else:
+    content, format = encoding.encode_contents(read_slice, size, {format!r}, chunk_size={chunk_size})
+elapsed = time.perf_counter() - start
+print("{{:.1f}} {{:.2f}}".format(rss_mb() - before, elapsed))
+"""
+
+
+def run_case(method, size, format, chunk_size):
+    proc = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            CASE.format(
+                module=ENCODING_MODULE,
+                size=size,
+                method=method,
+                format=format,
+                chunk_size=chunk_size,
+            ),
+        ],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    peak, elapsed = proc.stdout.split()
+    return float(peak), float(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="100,1024", help="file sizes in MB")
+    parser.add_argument("--format", default="base64", choices=("base64", "text"))
+    parser.add_argument("--chunk-size", type=int, default=3 * 1024 * 1024)
+    args = parser.parse_args()
+
+    print(
+        "{:>8s} {:>8s} {:>14s} {:>10s}".format("size MB", "method", "peak RSS +MB", "seconds")
+    )
+    for size_mb in (int(size) for size in args.sizes.split(",")):
+        size = size_mb * 1024 * 1024
+        for method in ("whole", "sliced"):
+            peak, elapsed = run_case(method, size, args.format, args.chunk_size)
+            print("{:8d} {:>8s} {:14.1f} {:10.2f}".format(size_mb, method, peak, elapsed))
+
+
+if __name__ == "__main__":
+    main()
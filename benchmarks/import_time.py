@@ -0,0 +1,96 @@
+"""
+    Import time benchmark for the contents manager
+
+    Runs `python -X importtime -c "import tiledbcontents"` in a fresh interpreter, reports the slowest imports and
+    exits non-zero when the import is over budget or when a lazily loaded module was imported eagerly.
+
+    Usage: python benchmarks/import_time.py [--budget-ms 1000] [--runs 5] [--top 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tiledbcontents.lazy import LAZY_MODULES  # noqa: E402
+
+EAGER_CHECK = (
+    "import sys, tiledbcontents\n"
+    "print(','.join(m for m in {modules!r} if m in sys.modules))"
+)
+
+
+def parse_importtime(stderr):
+    """
+    Parse the output of -X importtime
+    :param stderr: stderr of the interpreter
+    :return: list of (cumulative microseconds, module name)
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        fields = line[len("import time:") :].split("|")
+        entries.append((int(fields[1]), fields[2].rstrip()))
+    return entries
+
+
+def measure():
+    """
+    Import the package once in a fresh interpreter
+    :return: tuple of total import time in ms and the parsed entries
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import tiledbcontents"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    entries = parse_importtime(proc.stderr)
+    total = [us for us, name in entries if name.strip() == "tiledbcontents"]
+    return total[-1] / 1000.0, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings = []
+    entries = []
+    for _ in range(args.runs):
+        total_ms, entries = measure()
+        timings.append(total_ms)
+
+    median = statistics.median(timings)
+    print("import tiledbcontents: median {:.1f} ms over {} runs".format(median, args.runs))
+    print("slowest imports (cumulative, last run):")
+    for us, name in sorted(entries, reverse=True)[: args.top]:
+        print("  {:10.1f} ms  {}".format(us / 1000.0, name))
+
+    proc = subprocess.run(
+        [sys.executable, "-c", EAGER_CHECK.format(modules=LAZY_MODULES)],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    eager = [name for name in proc.stdout.strip().split(",") if name]
+
+    failed = False
+    if eager:
+        print("FAIL: imported eagerly: {}".format(", ".join(eager)))
+        failed = True
+    if median > args.budget_ms:
+        print("FAIL: {:.1f} ms is over the {:.1f} ms budget".format(median, args.budget_ms))
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+    Memory and latency of large namespace listings
+
+    Builds a namespace listing of --entries notebooks the way it was built before (one model dict per notebook,
+    encoded at once) and with compact entries, materialized either all at once for the contents API or a batch at a
+    time by the streamed listing endpoint. Reports the memory held by the built listing and the peak while encoding
+    it (tracemalloc), and the time taken in a separate run without tracing.
+
+    Usage: python benchmarks/listing_memory.py [--entries 50000] [--repeat 3]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tiledbcontents.listing import DirectoryListing, ListingEntry  # noqa: E402
+from tiledbcontents.tiledbcontents import (  # noqa: E402
+    DUMMY_CREATED_DATE,
+    base_directory_model,
+    base_model,
+)
+
+PATH = "cloud/public/bench"
+
+
+def date_default(obj):
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    raise TypeError(repr(obj))
+
+
+def make_arrays(count):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        types.SimpleNamespace(
+            name="notebook-{:06d}".format(i),
+            last_accessed=now - datetime.timedelta(seconds=i),
+            allowed_actions=["read"],
+            meta={
+                "file_size": 1000 + i,
+                "content_hash": "{:064x}".format(i),
+                "kernel_name": "python3",
+                "nbformat": 4,
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def directory_model():
+    model = base_directory_model("bench")
+    model["path"] = PATH
+    return model
+
+
+def build_dicts(arrays):
+    model = directory_model()
+    model["format"] = "json"
+    model["content"] = []
+    for notebook in arrays:
+        nbmodel = base_model(notebook.name)
+        nbmodel["path"] = "{}/{}.ipynb".format(PATH, notebook.name)
+        nbmodel["last_modified"] = notebook.last_accessed
+        nbmodel["type"] = "notebook"
+        nbmodel["size"] = notebook.meta["file_size"]
+        nbmodel["hash"] = notebook.meta["content_hash"]
+        nbmodel["hash_algorithm"] = "sha256"
+        nbmodel["kernel_name"] = notebook.meta["kernel_name"]
+        nbmodel["nbformat"] = notebook.meta["nbformat"]
+        model["content"].append(nbmodel)
+    return model
+
+
+def build_compact(arrays):
+    entries = [
+        ListingEntry(notebook.name, notebook.last_accessed, notebook.meta)
+        for notebook in arrays
+    ]
+    return DirectoryListing(directory_model(), entries, DUMMY_CREATED_DATE)
+
+
+CASES = (
+    (
+        "dicts, encoded at once",
+        build_dicts,
+        lambda model: len(json.dumps(model, default=date_default)),
+    ),
+    (
+        "compact, encoded at once",
+        build_compact,
+        lambda listing: len(json.dumps(listing.to_model(), default=date_default)),
+    ),
+    (
+        "compact, streamed",
+        build_compact,
+        lambda listing: sum(
+            len(chunk) for chunk in listing.iter_json(default=date_default)
+        ),
+    ),
+)
+
+
+def run_case(arrays, build, encode):
+    """
+    Build and encode a listing, timed without tracing, then again with tracemalloc for its memory
+    :return: tuple of bytes held by the listing, peak bytes while encoding, build and encode seconds, JSON size
+    """
+    start = time.perf_counter()
+    listing = build(arrays)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    size = encode(listing)
+    encoded = time.perf_counter() - start
+    del listing
+
+    tracemalloc.start()
+    listing = build(arrays)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    encode(listing)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return held, peak, built, encoded, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    arrays = make_arrays(args.entries)
+    print("{} entries".format(args.entries))
+    print(
+        "{:>26s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s}".format(
+            "case", "held MB", "peak MB", "build ms", "encode ms", "JSON MB"
+        )
+    )
+    for name, build, encode in CASES:
+        runs = [run_case(arrays, build, encode) for _ in range(args.repeat)]
+        held, peak, built, encoded, size = min(runs, key=lambda run: run[2] + run[3])
+        print(
+            "{:>26s} {:10.1f} {:10.1f} {:10.1f} {:10.1f} {:10.1f}".format(
+                name,
+                held / 1e6,
+                peak / 1e6,
+                built * 1000,
+                encoded * 1000,
+                size / 1e6,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
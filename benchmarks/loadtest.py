@@ -0,0 +1,287 @@
+"""
+    Multi-user load test of the contents manager
+
+    Drives one TileDBCloudContentsManager with many simulated users, each polling the listing of their namespace,
+    opening notebooks, autosaving them, renaming them and creating new ones on the JupyterLab cadence. TileDB Cloud is
+    replaced by an in-process stand-in which keeps the arrays in a local directory and adds a fixed latency to every
+    call (tests/localcloud.py), so the load can be reproduced without an account. The cadences are divided by --speedup to compress a
+    long session into a short run.
+
+    Users run concurrently, like a server running contents calls in a thread pool. With --serialize the calls are
+    made one at a time, like the synchronous contents API of notebook 6, so the latencies include queueing.
+
+    Reports throughput and p50/p95/p99 latency per operation. Exits non-zero when the error rate or an operation's
+    p95 is over the given limits, so it can guard CI against regressions.
+
+    Usage: python benchmarks/loadtest.py [--users 20] [--duration 30] [--speedup 50] [--latency-ms 20]
+           [--notebooks 3] [--cells 50] [--serialize] [--max-p95-ms 0] [--max-error-rate 0.01] [--config '{"listing_cache_ttl": 0}']
+"""
+
+import argparse
+import collections
+import contextlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from nbformat.sign import MemorySignatureStore  # noqa: E402
+from traitlets.config import Config  # noqa: E402
+
+from tests.localcloud import NAMESPACE, LocalCloud, notebook_model  # noqa: E402
+from tiledbcontents.tiledbcontents import TileDBCloudContentsManager  # noqa: E402
+
+# Seconds between operations of a user in JupyterLab, before the speedup is applied
+CADENCES = collections.OrderedDict(
+    [
+        ("list", 10.0),
+        ("open", 60.0),
+        ("autosave", 120.0),
+        ("create", 600.0),
+        ("rename", 900.0),
+    ]
+)
+
+
+class Stats:
+    """
+    Latencies and errors per operation
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+        self.first_errors = {}
+
+    def record(self, op, seconds, error=None):
+        with self._lock:
+            self.latencies[op].append(seconds)
+            if error is not None:
+                self.errors[op] += 1
+                self.first_errors.setdefault(op, error)
+
+
+def percentile(values, p):
+    index = min(len(values) - 1, int(len(values) * p / 100.0))
+    return values[index]
+
+
+class User(threading.Thread):
+    """
+    A simulated user working on their own notebooks, one operation at a time like a single JupyterLab session
+    """
+
+    def __init__(self, index, cm, stats, args, stop_at, server_lock):
+        super().__init__(name="loadtest-user-{}".format(index), daemon=True)
+        self.index = index
+        self.cm = cm
+        self.server_lock = server_lock
+        self.stats = stats
+        self.args = args
+        self.stop_at = stop_at
+        self.random = random.Random(index)
+        self.paths = []
+        self.created = 0
+
+    def path(self, name):
+        return "cloud/owned/{}/{}.ipynb".format(NAMESPACE, name)
+
+    def create(self):
+        self.created += 1
+        model = notebook_model(self.args.cells, self.created, new=True)
+        saved = self.cm.save(
+            model, self.path("user{}-nb{}".format(self.index, self.created))
+        )
+        self.paths.append(saved["path"] + ".ipynb")
+
+    def run_op(self, op):
+        if op == "list":
+            self.cm.get("cloud/owned/{}".format(NAMESPACE), content=True)
+        elif op == "create":
+            self.create()
+        elif not self.paths:
+            return
+        elif op == "open":
+            self.cm.get(self.random.choice(self.paths), content=True)
+        elif op == "autosave":
+            path = self.random.choice(self.paths)
+            self.cm.save(
+                notebook_model(self.args.cells, self.random.random()), path
+            )
+        elif op == "rename":
+            i = self.random.randrange(len(self.paths))
+            old_path = self.paths[i]
+            new_path = self.path("user{}-renamed{}".format(self.index, time.time_ns()))
+            self.cm.rename(old_path, new_path)
+            self.paths[i] = new_path
+
+    def run(self):
+        for _ in range(self.args.notebooks):
+            self.create()
+
+        now = time.monotonic()
+        # Spread the first operations so the users do not start in lockstep
+        due = {
+            op: now + self.random.uniform(0, cadence / self.args.speedup)
+            for op, cadence in CADENCES.items()
+        }
+        while True:
+            op = min(due, key=due.get)
+            delay = due[op] - time.monotonic()
+            if due[op] >= self.stop_at:
+                return
+            if delay > 0:
+                time.sleep(delay)
+
+            start = time.monotonic()
+            error = None
+            try:
+                with self.server_lock:
+                    self.run_op(op)
+            except Exception as e:
+                error = "{}: {}".format(type(e).__name__, e)
+            self.stats.record(op, time.monotonic() - start, error)
+            due[op] += CADENCES[op] / self.args.speedup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--speedup", type=float, default=50.0)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--notebooks", type=int, default=3, help="per user at start")
+    parser.add_argument("--cells", type=int, default=50)
+    parser.add_argument(
+        "--serialize", action="store_true", help="one contents call at a time"
+    )
+    parser.add_argument(
+        "--config", default="{}", help="JSON of contents manager traits to set"
+    )
+    parser.add_argument(
+        "--max-p95-ms", type=float, default=0.0, help="0 for no limit"
+    )
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="tiledbcontents-loadtest-")
+    cloud = LocalCloud(os.path.join(root, "arrays"), latency=args.latency_ms / 1000.0)
+    os.makedirs(cloud.root)
+    cloud.install()
+    try:
+        config = Config()
+        for name, value in json.loads(args.config).items():
+            config.TileDBCloudContentsManager[name] = value
+        os.makedirs(os.path.join(root, "local"))
+        cm = TileDBCloudContentsManager(
+            root_dir=os.path.join(root, "local"), config=config
+        )
+        # The default SQLite signature store can only be used by the thread which opened it
+        cm.notary.store = MemorySignatureStore()
+
+        stats = Stats()
+        server_lock = threading.Lock() if args.serialize else contextlib.nullcontext()
+        start = time.monotonic()
+        users = [
+            User(i, cm, stats, args, start + args.duration, server_lock)
+            for i in range(args.users)
+        ]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        elapsed = time.monotonic() - start
+        metrics = cm.metrics()
+    finally:
+        cloud.uninstall()
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(
+        "{} users, {:.0f}s, speedup {:g}, latency {:g} ms{}".format(
+            args.users,
+            elapsed,
+            args.speedup,
+            args.latency_ms,
+            ", serialized" if args.serialize else "",
+        )
+    )
+    print(
+        "{:>10s} {:>8s} {:>8s} {:>8s} {:>10s} {:>10s} {:>10s}".format(
+            "operation", "count", "errors", "ops/s", "p50 ms", "p95 ms", "p99 ms"
+        )
+    )
+    failed = False
+    total = total_errors = 0
+    for op in CADENCES:
+        latencies = sorted(stats.latencies[op])
+        if not latencies:
+            continue
+        total += len(latencies)
+        total_errors += stats.errors[op]
+        p95 = percentile(latencies, 95) * 1000
+        print(
+            "{:>10s} {:8d} {:8d} {:8.1f} {:10.1f} {:10.1f} {:10.1f}".format(
+                op,
+                len(latencies),
+                stats.errors[op],
+                len(latencies) / elapsed,
+                percentile(latencies, 50) * 1000,
+                p95,
+                percentile(latencies, 99) * 1000,
+            )
+        )
+        if args.max_p95_ms and p95 > args.max_p95_ms:
+            print("FAIL: {} p95 {:.1f} ms is over {:.1f} ms".format(op, p95, args.max_p95_ms))
+            failed = True
+
+    print(
+        "remote calls: {}".format(
+            ", ".join(
+                "{} {} ({} coalesced)".format(
+                    kind, counters.get("calls", 0), counters.get("coalesced", 0)
+                )
+                for kind, counters in sorted(metrics["remote"].items())
+            )
+        )
+    )
+    # Empty without cloud_max_concurrency or cloud_rate_limit
+    scheduler = metrics.get("scheduler")
+    if scheduler:
+        print(
+            "admissions: {}".format(
+                ", ".join(
+                    "{} {} (max queued {}, waited {:.1f}s)".format(
+                        name,
+                        counters.get("admitted", 0),
+                        counters.get("max_queued", 0),
+                        counters.get("waited", 0.0),
+                    )
+                    for name, counters in sorted(scheduler.items())
+                    if name != "running"
+                )
+            )
+        )
+    for op, error in stats.first_errors.items():
+        print("first {} error: {}".format(op, error))
+
+    error_rate = total_errors / float(total) if total else 0.0
+    if error_rate > args.max_error_rate:
+        print(
+            "FAIL: error rate {:.2%} is over {:.2%}".format(
+                error_rate, args.max_error_rate
+            )
+        )
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+    Storage and time of saves and reads of notebooks sharing large outputs, with and without deduplicated outputs
+
+    Saves --versions versions of a notebook with --outputs image outputs of --output-kb KB each to the namespace of
+    the TileDB Cloud stand-in of tests/localcloud.py. Each version changes the source of one cell and one output,
+    the other outputs are unchanged, like a notebook saved while working on it. Then the notebook is read by a new contents
+    manager, as after a restart, and once more by the same one. Stored bytes are the size of the array directories.
+
+    Usage: python benchmarks/output_dedup.py [--versions 10] [--outputs 10] [--output-kb 500] [--latency-ms 20]
+"""
+
+import argparse
+import base64
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import nbformat  # noqa: E402
+from nbformat.sign import MemorySignatureStore  # noqa: E402
+from traitlets.config import Config  # noqa: E402
+
+from tests.localcloud import NAMESPACE, LocalCloud  # noqa: E402
+from tiledbcontents.tiledbcontents import TileDBCloudContentsManager  # noqa: E402
+
+PATH = "cloud/owned/{}/versions.ipynb".format(NAMESPACE)
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def image(rng, size):
+    return base64.b64encode(rng.getrandbits(8 * size).to_bytes(size, "little")).decode()
+
+
+def make_notebook(images, version):
+    cells = [
+        nbformat.v4.new_code_cell(
+            "plot({}, version={})".format(i, version if i == 0 else 0),
+            outputs=[
+                nbformat.v4.new_output(
+                    "display_data",
+                    data={"image/png": data, "text/plain": "<Figure {}>".format(i)},
+                )
+            ],
+        )
+        for i, data in enumerate(images)
+    ]
+    return nbformat.v4.new_notebook(cells=cells)
+
+
+def new_manager(root, dedup):
+    config = Config()
+    config.TileDBCloudContentsManager.dedup_outputs = dedup
+    cm = TileDBCloudContentsManager(root_dir=os.path.join(root, "local"), config=config)
+    cm.notary.store = MemorySignatureStore()
+    return cm
+
+
+def run_case(args, dedup):
+    root = tempfile.mkdtemp(prefix="tiledbcontents-dedup-")
+    cloud = LocalCloud(os.path.join(root, "arrays"), latency=args.latency_ms / 1000.0)
+    os.makedirs(cloud.root)
+    os.makedirs(os.path.join(root, "local"))
+    cloud.install()
+    try:
+        rng = random.Random(0)
+        images = [image(rng, args.output_kb * 1024) for _ in range(args.outputs)]
+        cm = new_manager(root, dedup)
+        cm.save({"type": "notebook", "content": make_notebook(images, 0)}, PATH)
+
+        start = time.perf_counter()
+        for version in range(1, args.versions):
+            images[0] = image(rng, args.output_kb * 1024)
+            notebook = make_notebook(images, version)
+            notebook.metadata["language_info"] = {"name": "python"}
+            cm.save({"type": "notebook", "content": notebook}, PATH)
+        saves = (time.perf_counter() - start) / (args.versions - 1)
+        stored = directory_size(cloud.root)
+
+        cm = new_manager(root, dedup)
+        start = time.perf_counter()
+        cm.get(PATH)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        cm.get(PATH)
+        warm = time.perf_counter() - start
+        return saves, stored, cold, warm
+    finally:
+        cloud.uninstall()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--versions", type=int, default=10)
+    parser.add_argument("--outputs", type=int, default=10)
+    parser.add_argument("--output-kb", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    print(
+        "{} versions, {} outputs of {} KB, latency {:g} ms".format(
+            args.versions, args.outputs, args.output_kb, args.latency_ms
+        )
+    )
+    print(
+        "{:>14s} {:>12s} {:>12s} {:>12s} {:>12s}".format(
+            "outputs", "save ms", "stored MB", "cold get ms", "warm get ms"
+        )
+    )
+    for name, dedup in (("inline", False), ("deduplicated", True)):
+        saves, stored, cold, warm = run_case(args, dedup)
+        print(
+            "{:>14s} {:12.1f} {:12.1f} {:12.1f} {:12.1f}".format(
+                name, saves * 1000, stored / 1e6, cold * 1000, warm * 1000
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+    Path routing microbenchmark
+
+    Simulates the routing done for a listing-heavy workload: every listed cloud notebook path is checked for being
+    remote, for being a directory and converted to a tiledb:// URI, several times per request. Compares the
+    original string splitting with the memoized CloudPath.
+
+    Usage: python benchmarks/path_routing.py [--entries 5000] [--lookups 4] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tiledbcontents.paths import CloudPath, NOTEBOOK_EXT  # noqa: E402
+
+
+def split_is_remote_path(path):
+    return path.split(os.sep)[0] == "cloud" or path.split("/")[0] == "cloud"
+
+
+def split_is_remote_dir(path):
+    for sep in [os.sep, "/"]:
+        splits = path.split(sep)
+        if len(splits) == 1 and splits[0] == "cloud":
+            return True
+        if (
+            (len(splits) == 2 or len(splits) == 3)
+            and splits[0] == "cloud"
+            and (splits[1] == "owned" or splits[1] == "public" or splits[1] == "shared")
+        ):
+            return True
+    return False
+
+
+def split_tiledb_uri_from_path(path):
+    parts = path.split(os.sep)
+    if len(parts) == 1:
+        parts = path.split("/")
+    length = len(parts)
+    return "tiledb://{}/{}".format(parts[length - 2], parts[length - 1])
+
+
+def route_split(path):
+    path_fixed = path.strip("/")
+    if split_is_remote_path(path_fixed) and not split_is_remote_dir(path_fixed):
+        if path_fixed.endswith(NOTEBOOK_EXT):
+            path_fixed = path_fixed[: -1 * len(NOTEBOOK_EXT)]
+        return split_tiledb_uri_from_path(path_fixed)
+    return None
+
+
+def route_cloud_path(path):
+    cloud_path = CloudPath.parse(path)
+    if cloud_path.is_remote and not cloud_path.is_dir:
+        return cloud_path.tiledb_uri
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=4, help="routings per entry per request")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = [
+        "/cloud/{}/namespace-{}/notebook-{}{}".format(
+            ("owned", "shared", "public")[i % 3], i % 50, i, NOTEBOOK_EXT
+        )
+        for i in range(args.entries)
+    ]
+
+    for route in (route_split, route_cloud_path):
+        assert [route(p) for p in paths] == [route_split(p) for p in paths]
+
+    def workload(route):
+        for path in paths:
+            for _ in range(args.lookups):
+                route(path)
+
+    CloudPath.parse.cache_clear()
+    cold = timeit.timeit(lambda: workload(route_cloud_path), number=1)
+    results = {
+        "split": min(timeit.repeat(lambda: workload(route_split), number=1, repeat=args.repeat)),
+        "CloudPath (cold cache)": cold,
+        "CloudPath (warm cache)": min(
+            timeit.repeat(lambda: workload(route_cloud_path), number=1, repeat=args.repeat)
+        ),
+    }
+
+    calls = args.entries * args.lookups
+    print("{} entries, {} routings per entry".format(args.entries, args.lookups))
+    for name, seconds in results.items():
+        print(
+            "  {:24s} {:8.2f} ms total {:8.3f} us/call".format(
+                name, seconds * 1000.0, seconds * 1e6 / calls
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+    Fixtures running contents managers against the in-process TileDB Cloud stand-in of localcloud.py
+"""
+
+import collections
+import os
+import sys
+
+import pytest
+from nbformat.sign import MemorySignatureStore
+from traitlets.config import Config
+
+from tiledbcontents.tiledbcontents import TileDBCloudContentsManager
+
+from .localcloud import NAMESPACE, LocalCloud
+
+NAMESPACE_PATH = "cloud/owned/{}".format(NAMESPACE)
+
+
+class TracingCloud(LocalCloud):
+    """
+    LocalCloud counting the TileDB Cloud calls made, by name
+    """
+
+    def __init__(self, root, latency=0.0):
+        super().__init__(root, latency=latency)
+        self.calls = collections.Counter()
+
+    def _wait(self):
+        # Every call of the stand-in waits first, the caller is the call
+        self.calls[sys._getframe(1).f_code.co_name] += 1
+        super()._wait()
+
+    def reset(self):
+        self.calls.clear()
+
+
+@pytest.fixture
+def cloud(tmp_path):
+    cloud = TracingCloud(str(tmp_path / "arrays"))
+    os.makedirs(cloud.root)
+    cloud.install()
+    try:
+        yield cloud
+    finally:
+        cloud.uninstall()
+
+
+@pytest.fixture
+def make_manager(cloud, tmp_path):
+    """
+    :return: function creating a contents manager with the given traits
+    """
+    root_dir = tmp_path / "local"
+    root_dir.mkdir()
+
+    def make_manager(**traits):
+        config = Config()
+        for name, value in traits.items():
+            setattr(config.TileDBCloudContentsManager, name, value)
+        cm = TileDBCloudContentsManager(root_dir=str(root_dir), config=config)
+        cm.notary.store = MemorySignatureStore()
+        return cm
+
+    return make_manager
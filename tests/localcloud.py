@@ -0,0 +1,207 @@
+"""
+    In-process stand-in for TileDB Cloud, used by the tests and the benchmarks
+"""
+
+import datetime
+import os
+import threading
+import time
+import types
+
+import nbformat
+import tiledb
+import tiledb.cloud
+
+NAMESPACE = "loadtest"
+
+
+class LocalCloud:
+    """
+    In-process stand-in for TileDB Cloud: arrays are registered in memory and stored in a local directory, every
+    call sleeps for the simulated network latency
+    """
+
+    def __init__(self, root, latency=0.02):
+        self.root = root
+        self.latency = latency
+        self.ctx = tiledb.Ctx()
+        self._lock = threading.Lock()
+        self._arrays = {}
+        self._patched = []
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _not_found(self):
+        return tiledb.cloud.tiledb_cloud_error.TileDBCloudError(
+            404, json_data={"message": "Array or Namespace Not found"}
+        )
+
+    def _record(self, tiledb_uri):
+        with self._lock:
+            record = self._arrays.get(tiledb_uri)
+        if record is None:
+            raise self._not_found()
+        return record
+
+    def user_profile(self):
+        self._wait()
+        return types.SimpleNamespace(
+            username=NAMESPACE,
+            organizations=[],
+            enabled_features=["notebook_sharing"],
+            notebook_settings=types.SimpleNamespace(default_s3_path=self.root + "/"),
+        )
+
+    def organization(self, namespace):
+        self._wait()
+        raise self._not_found()
+
+    def _metadata(self, record):
+        """
+        Array metadata as TileDB Cloud returns it with listings, values are strings
+        """
+        with self._real_open(record["location"], ctx=self.ctx) as A:
+            return [
+                types.SimpleNamespace(
+                    key=key, value=str(A.meta[key]), type=type(A.meta[key]).__name__
+                )
+                for key in A.meta.keys()
+            ]
+
+    def list_arrays(self, tag=None, namespace=None, with_metadata=None, **kwargs):
+        self._wait()
+        with self._lock:
+            records = list(self._arrays.values())
+        arrays = []
+        for record in records:
+            if (namespace is None or record["namespace"] == namespace) and (
+                not tag or set(tag) <= set(record["tags"])
+            ):
+                metadata = self._metadata(record) if with_metadata else None
+                arrays.append(types.SimpleNamespace(metadata=metadata, **record))
+        return arrays
+
+    def list_other_arrays(self, tag=None, namespace=None, **kwargs):
+        self._wait()
+        return []
+
+    def info(self, uri):
+        self._wait()
+        return types.SimpleNamespace(**self._record(uri))
+
+    def update_info(self, uri, array_name=None, tags=None, **kwargs):
+        self._wait()
+        record = self._record(uri)
+        with self._lock:
+            record["tags"] = list(tags or [])
+
+    def deregister_array(self, uri):
+        self._wait()
+        with self._lock:
+            if self._arrays.pop(uri, None) is None:
+                raise self._not_found()
+
+    def rename_notebook(self, uri, notebook_name=None, **kwargs):
+        self._wait()
+        with self._lock:
+            record = self._arrays.pop(uri, None)
+            if record is None:
+                raise self._not_found()
+            record["name"] = notebook_name
+            self._arrays[
+                "tiledb://{}/{}".format(record["namespace"], notebook_name)
+            ] = record
+
+    def create(self, uri, schema, **kwargs):
+        """
+        SparseArray.create: the URI is tiledb://<namespace>/<default s3 path><name>
+        """
+        self._wait()
+        namespace, location = uri[len("tiledb://") :].split("/", 1)
+        name = location.rsplit("/", 1)[-1]
+        tiledb_uri = "tiledb://{}/{}".format(namespace, name)
+        with self._lock:
+            if tiledb_uri in self._arrays or os.path.exists(location):
+                raise tiledb.TileDBError("Array {} already exists".format(uri))
+            self._arrays[tiledb_uri] = dict(
+                name=name,
+                namespace=namespace,
+                location=location,
+                tags=[],
+                allowed_actions=["read", "write"],
+                share_count=0,
+                public_share=False,
+                last_accessed=datetime.datetime.now(datetime.timezone.utc),
+            )
+        self._real_sparse_array.create(location, schema)
+
+    def open(self, uri, mode="r", ctx=None, **kwargs):
+        self._wait()
+        if not uri.startswith("tiledb://"):
+            return self._real_open(uri, mode=mode, ctx=ctx, **kwargs)
+        try:
+            record = self._record(uri)
+        except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
+            raise tiledb.TileDBError(str(e))
+        with self._lock:
+            record["last_accessed"] = datetime.datetime.now(datetime.timezone.utc)
+        return self._real_open(record["location"], mode=mode, ctx=self.ctx)
+
+    def _patch(self, owner, name, value):
+        self._patched.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, value)
+
+    def install(self):
+        """
+        Replace the TileDB Cloud calls made by the contents manager with the stand-in
+        :return:
+        """
+        self._real_open = tiledb.open
+        self._real_sparse_array = tiledb.SparseArray
+        client = tiledb.cloud.client
+        self._patch(client, "user_profile", self.user_profile)
+        self._patch(client, "organization", self.organization)
+        self._patch(client, "list_arrays", self.list_arrays)
+        self._patch(client, "list_shared_arrays", self.list_other_arrays)
+        self._patch(client, "list_public_arrays", self.list_other_arrays)
+        self._patch(tiledb.cloud.array, "info", self.info)
+        self._patch(tiledb.cloud.array, "update_info", self.update_info)
+        self._patch(tiledb.cloud.array, "deregister_array", self.deregister_array)
+        self._patch(tiledb.cloud.notebook, "rename_notebook", self.rename_notebook)
+        self._patch(tiledb.cloud, "Ctx", lambda *args, **kwargs: self.ctx)
+        self._patch(tiledb, "open", self.open)
+        cloud = self
+
+        class SparseArray(self._real_sparse_array):
+            # TileDB also instantiates SparseArray itself, so only create is replaced
+            @classmethod
+            def create(cls, uri, schema, **kwargs):
+                return cloud.create(uri, schema, **kwargs)
+
+        self._patch(tiledb, "SparseArray", SparseArray)
+
+    def uninstall(self):
+        while self._patched:
+            owner, name, value = self._patched.pop()
+            setattr(owner, name, value)
+
+
+def notebook_model(cells, seed, new=False):
+    nb = nbformat.v4.new_notebook()
+    nb.metadata["kernelspec"] = {
+        "name": "python3",
+        "display_name": "Python 3",
+        "language": "python",
+    }
+    if not new:
+        # Notebooks which were never run are created as new arrays on save
+        nb.metadata["language_info"] = {"name": "python"}
+    for i in range(cells):
+        nb.cells.append(
+            nbformat.v4.new_code_cell(
+                "x_{0} = compute({0}, seed={1})\nprint(x_{0})".format(i, seed)
+            )
+        )
+    return {"type": "notebook", "format": "json", "content": nb}
@@ -0,0 +1,240 @@
+"""
+    Stress tests of concurrent saves, remote calls and their admission
+"""
+
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import tiledb
+
+from tiledbcontents.remote import DeadlineExceeded, RemoteCalls
+from tiledbcontents.scheduler import BACKGROUND, PRIORITIES, CallScheduler, priority
+
+from .conftest import NAMESPACE_PATH
+from .localcloud import notebook_model
+
+THREADS = 16
+
+
+class _Concurrency:
+    """
+    Counts the calls running at the same time, per key
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = collections.Counter()
+        self.max_running = collections.Counter()
+        self.max_total = 0
+
+    def enter(self, key):
+        with self._lock:
+            self._running[key] += 1
+            self.max_running[key] = max(self.max_running[key], self._running[key])
+            self.max_total = max(self.max_total, sum(self._running.values()))
+
+    def exit(self, key):
+        with self._lock:
+            self._running[key] -= 1
+
+
+class _TrackedWrite:
+    def __init__(self, array, uri, concurrency):
+        self._array = array
+        self._uri = uri
+        self._concurrency = concurrency
+
+    def __enter__(self):
+        self._concurrency.enter(self._uri)
+        # Keep the write open long enough for concurrent saves to overlap
+        time.sleep(0.01)
+        return self._array.__enter__()
+
+    def __exit__(self, *exc_info):
+        try:
+            return self._array.__exit__(*exc_info)
+        finally:
+            self._concurrency.exit(self._uri)
+
+
+@pytest.fixture
+def writes(cloud):
+    concurrency = _Concurrency()
+    open_array = cloud.open
+
+    def open(uri, mode="r", ctx=None, **kwargs):
+        array = open_array(uri, mode=mode, ctx=ctx, **kwargs)
+        if mode == "w":
+            return _TrackedWrite(array, uri, concurrency)
+        return array
+
+    cloud._patch(tiledb, "open", open)
+    return concurrency
+
+
+def test_concurrent_saves(cloud, make_manager, writes):
+    cm = make_manager()
+    paths = ["{}/nb{}.ipynb".format(NAMESPACE_PATH, i) for i in range(4)]
+    for i, path in enumerate(paths):
+        cm.save(notebook_model(2, i, new=True), path)
+    cloud.reset()
+
+    def save(i):
+        path = paths[i % len(paths)]
+        if i % 3 == 0:
+            # New notebooks saved at the same time must not turn the other saves into creations
+            cm.save(
+                notebook_model(2, i, new=True),
+                "{}/new{}.ipynb".format(NAMESPACE_PATH, i),
+            )
+        else:
+            cm.save(notebook_model(2, i), path)
+
+    saves = THREADS * 4
+    with ThreadPoolExecutor(THREADS) as executor:
+        list(executor.map(save, range(saves)))
+
+    created = len([i for i in range(saves) if i % 3 == 0])
+    assert cloud.calls["create"] == created
+    assert len(cloud._arrays) == len(paths) + created
+    # Saves of the same notebook are serialized, saves of different ones overlap
+    for path in paths:
+        tiledb_uri = "tiledb://{}/{}".format(*path[: -len(".ipynb")].split("/")[2:])
+        assert writes.max_running[tiledb_uri] == 1
+    assert writes.max_total > 1
+
+    for path in paths:
+        assert cm.get(path)["content"]["nbformat"] == 4
+
+
+def test_calls_are_direct_by_default(cloud, make_manager):
+    cm = make_manager()
+    path = NAMESPACE_PATH + "/nb.ipynb"
+    cm.save(notebook_model(2, 0, new=True), path)
+
+    threads = set()
+    open_array = cloud.open
+
+    def open(uri, mode="r", ctx=None, **kwargs):
+        threads.add(threading.current_thread())
+        return open_array(uri, mode=mode, ctx=ctx, **kwargs)
+
+    cloud._patch(tiledb, "open", open)
+    cm.get(path, type="notebook")
+    assert threads == {threading.current_thread()}
+    assert cm.metrics()["scheduler"] == {}
+
+
+def test_scheduler_limits_concurrency():
+    scheduler = CallScheduler(max_concurrent=4)
+    concurrency = _Concurrency()
+
+    def call(i):
+        name = PRIORITIES[i % len(PRIORITIES)]
+        with scheduler.admit(name):
+            concurrency.enter("all")
+            time.sleep(0.005)
+            concurrency.exit("all")
+
+    calls = 300
+    with ThreadPoolExecutor(THREADS * 2) as executor:
+        list(executor.map(call, range(calls)))
+
+    metrics = scheduler.metrics()
+    assert concurrency.max_running["all"] <= 4
+    assert metrics["running"] == 0
+    assert sum(metrics[name]["admitted"] for name in PRIORITIES) == calls
+    assert all(metrics[name]["queued"] == 0 for name in PRIORITIES)
+
+
+def test_interactive_slot_is_reserved():
+    scheduler = CallScheduler(max_concurrent=2)
+    background = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with priority(BACKGROUND), scheduler.admit():
+            background.set()
+            release.wait(10)
+
+    holders = [threading.Thread(target=hold) for _ in range(3)]
+    for holder in holders:
+        holder.start()
+    background.wait(10)
+    try:
+        # Background calls only get one of the two slots, an interactive call is admitted at once
+        start = time.monotonic()
+        with scheduler.admit():
+            pass
+        assert time.monotonic() - start < 1.0
+        assert scheduler.metrics()["running"] == 1
+    finally:
+        release.set()
+        for holder in holders:
+            holder.join(10)
+
+
+def test_remote_calls_coalesce_and_bound():
+    remote = RemoteCalls(deadlines={"read": 5.0}, scheduler=CallScheduler(4))
+    concurrency = _Concurrency()
+    calls = collections.Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+
+    def read(key):
+        with lock:
+            calls[key] += 1
+        concurrency.enter("all")
+        time.sleep(0.2)
+        concurrency.exit("all")
+        return key * 2
+
+    def call(i):
+        barrier.wait()
+        # Half of the threads read the same resource, the others one each
+        key = 0 if i % 2 else i + THREADS
+        return key, remote.call("read", read, key)
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = list(executor.map(call, range(THREADS)))
+
+    assert all(result == key * 2 for key, result in results)
+    assert calls[0] == 1
+    assert remote.metrics()["read"]["coalesced"] == THREADS // 2 - 1
+    assert concurrency.max_running["all"] <= 4
+
+    with pytest.raises(DeadlineExceeded):
+        RemoteCalls(deadlines={"read": 0.05}).call("read", time.sleep, 1.0)
+
+
+def test_interactive_calls_do_not_join_background_calls():
+    remote = RemoteCalls()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def read(key):
+        calls.append(key)
+        if len(calls) == 1:
+            started.set()
+            release.wait(10)
+        return key
+
+    def background_read():
+        with priority(BACKGROUND):
+            return remote.call("read", read, 1)
+
+    with ThreadPoolExecutor(1) as executor:
+        background = executor.submit(background_read)
+        started.wait(10)
+        try:
+            # The interactive caller makes its own call instead of waiting for the background one
+            assert remote.call("read", read, 1) == 1
+            assert "coalesced" not in remote.metrics()["read"]
+        finally:
+            release.set()
+        assert background.result(10) == 1
+    assert calls == [1, 1]
@@ -0,0 +1,124 @@
+"""
+    REST handlers of the TileDB contents operations, served by a tornado application without a notebook server
+"""
+
+import asyncio
+import json
+
+import pytest
+import tornado.web
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+
+from tiledbcontents.handlers import setup_handlers
+
+from .conftest import NAMESPACE_PATH
+
+
+@pytest.fixture
+def fetch(make_manager):
+    """
+    :return: function making a request to the handlers, returning the response
+    """
+    app = tornado.web.Application([], contents_manager=make_manager(), base_url="/")
+    setup_handlers(app)
+
+    def fetch(path, **kwargs):
+        async def request():
+            sock, port = bind_unused_port()
+            server = HTTPServer(app)
+            server.add_sockets([sock])
+            try:
+                return await AsyncHTTPClient().fetch(
+                    "http://127.0.0.1:{}/api/tiledb/contents/{}".format(port, path),
+                    raise_error=False,
+                    **kwargs
+                )
+            finally:
+                server.stop()
+
+        return asyncio.run(request())
+
+    return fetch
+
+
+def test_conditional_get_of_local_file(fetch, tmp_path):
+    (tmp_path / "local" / "notes.txt").write_text("first")
+
+    response = fetch("conditional/notes.txt")
+    assert response.code == 200
+    etag = response.headers["ETag"]
+    assert json.loads(response.body)["hash"] == etag.strip('"')
+
+    response = fetch("conditional/notes.txt", headers={"If-None-Match": etag})
+    assert response.code == 304
+
+    (tmp_path / "local" / "notes.txt").write_text("second")
+    response = fetch("conditional/notes.txt", headers={"If-None-Match": etag})
+    assert response.code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("body", ["[]", '"delete"', "1", '{"action": "move"}'])
+def test_invalid_bulk_request(fetch, body):
+    response = fetch("bulk", method="POST", body=body)
+    assert response.code == 400
+
+
+def test_bulk_delete(fetch, tmp_path):
+    (tmp_path / "local" / "a.txt").write_text("a")
+
+    response = fetch(
+        "bulk",
+        method="POST",
+        body=json.dumps({"action": "delete", "items": ["a.txt", "missing.txt"]}),
+    )
+    assert response.code == 200
+    results = json.loads(response.body)["results"]
+    assert [result["ok"] for result in results] == [True, False]
+    assert results[1]["code"] == 404
+    assert not (tmp_path / "local" / "a.txt").exists()
+
+
+def _export(fetch, archive):
+    body = {"action": "export", "path": NAMESPACE_PATH, "archive": archive}
+    return fetch("archive", method="POST", body=json.dumps(body))
+
+
+def test_export_inside_root(fetch, tmp_path):
+    response = _export(fetch, "backups/namespace")
+    assert response.code == 200
+    assert (tmp_path / "local" / "backups" / "namespace").is_dir()
+
+
+@pytest.mark.parametrize("archive", ["../outside", "backups/../../outside", "link"])
+def test_export_outside_root(fetch, tmp_path, archive):
+    (tmp_path / "local" / "link").symlink_to(tmp_path)
+
+    response = _export(fetch, archive)
+    assert response.code == 400
+    assert not (tmp_path / "outside").exists()
+
+
+def test_export_to_absolute_path(fetch, tmp_path):
+    response = _export(fetch, str(tmp_path / "outside"))
+    assert response.code == 400
+    assert not (tmp_path / "outside").exists()
+
+
+def test_invalid_archive_request(fetch):
+    response = fetch("archive", method="POST", body='["export"]')
+    assert response.code == 400
+
+
+@pytest.mark.parametrize("limit", ["-1", "ten"])
+def test_invalid_search_limit(fetch, limit):
+    response = fetch("search?q=plot&limit={}".format(limit))
+    assert response.code == 400
+
+
+@pytest.mark.parametrize("body", ["[]", '["sample_rate"]', "1", '"sample_rate"'])
+def test_invalid_profiling_settings(fetch, body):
+    response = fetch("profiling", method="PATCH", body=body)
+    assert response.code == 400
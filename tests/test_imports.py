@@ -0,0 +1,60 @@
+"""
+    Import budget of the contents manager: the notebook server imports it at startup
+"""
+
+import subprocess
+import sys
+
+from tiledbcontents.lazy import LAZY_MODULES
+
+# The notebook server has loaded these before it imports the contents manager, they are not part of the budget
+DEPENDENCIES = (
+    "nbformat",
+    "notebook.services.contents.checkpoints",
+    "notebook.services.contents.filecheckpoints",
+    "notebook.services.contents.filemanager",
+    "notebook.services.contents.manager",
+    "tornado.web",
+    "traitlets",
+)
+
+BUDGET_MS = 250
+
+IMPORT = """
+import sys, time
+{dependencies}
+start = time.perf_counter()
+import tiledbcontents
+print((time.perf_counter() - start) * 1000)
+print(",".join(name for name in {lazy!r} if name in sys.modules))
+"""
+
+
+def _import_tiledbcontents():
+    """
+    Import the package in a fresh interpreter
+    :return: tuple of milliseconds spent importing it and lazy modules it imported
+    """
+    code = IMPORT.format(
+        dependencies="\n".join("import " + name for name in DEPENDENCIES),
+        lazy=LAZY_MODULES,
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    elapsed, eager = proc.stdout.split("\n")[:2]
+    return float(elapsed), [name for name in eager.split(",") if name]
+
+
+def test_lazy_modules_are_not_imported():
+    _, eager = _import_tiledbcontents()
+    assert eager == []
+
+
+def test_import_budget():
+    # The best of a few runs, so a busy machine does not fail the check
+    elapsed = min(_import_tiledbcontents()[0] for _ in range(3))
+    assert elapsed < BUDGET_MS
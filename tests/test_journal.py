@@ -0,0 +1,109 @@
+"""
+    Recovery and retries of the write-ahead journal of saves
+"""
+
+import logging
+import os
+import threading
+import time
+
+from tiledbcontents.journal import FAILED_DIR, SaveJournal
+
+log = logging.getLogger(__name__)
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_superseded_failed_entries_are_not_replayed(tmp_path):
+    available = threading.Event()
+    replayed = []
+
+    def replay(tiledb_uri, data, meta):
+        if not available.is_set():
+            raise RuntimeError("unavailable")
+        replayed.append(data)
+
+    directory = str(tmp_path / "journal")
+    failed_dir = os.path.join(directory, FAILED_DIR)
+    journal = SaveJournal(
+        directory, replay, log, max_attempts=1, retry_delay=60.0, max_delay=60.0
+    )
+    journal.append("tiledb://owner/nb", b"version 1", {})
+    wait_until(lambda: len(os.listdir(failed_dir)) == 1)
+
+    available.set()
+    journal.append("tiledb://owner/nb", b"version 2", {})
+    assert journal.wait("tiledb://owner/nb", timeout=5.0)
+    assert os.listdir(failed_dir) == []
+
+    # A restarted server does not replay the failed entry over the newer save
+    journal = SaveJournal(directory, replay, log)
+    assert journal.metrics() == {"pending": 0, "failed": 0}
+    assert journal.wait("tiledb://owner/nb", timeout=5.0)
+    assert replayed == [b"version 2"]
+
+
+def test_failing_array_does_not_block_others(tmp_path):
+    replayed = []
+    lock = threading.Lock()
+
+    def replay(tiledb_uri, data, meta):
+        if tiledb_uri == "tiledb://owner/broken":
+            raise RuntimeError("unavailable")
+        with lock:
+            replayed.append(tiledb_uri)
+
+    journal = SaveJournal(
+        str(tmp_path / "journal"), replay, log, retry_delay=5.0, max_delay=5.0
+    )
+    journal.append("tiledb://owner/broken", b"", {})
+    uris = ["tiledb://owner/nb{}".format(i) for i in range(5)]
+    for uri in uris:
+        journal.append(uri, b"", {})
+
+    # The broken array waits 5 seconds for its next attempt, the others are replayed meanwhile
+    for uri in uris:
+        assert journal.wait(uri, timeout=2.0)
+    assert replayed == uris
+    assert journal.latest("tiledb://owner/broken") is not None
+
+
+def test_failed_entries_are_still_served_and_retried(tmp_path):
+    available = threading.Event()
+    replayed = []
+
+    def replay(tiledb_uri, data, meta):
+        if not available.is_set():
+            raise RuntimeError("unavailable")
+        replayed.append(data)
+
+    directory = str(tmp_path / "journal")
+    journal = SaveJournal(directory, replay, log, max_attempts=1, max_delay=0.1)
+    journal.append("tiledb://owner/nb", b"edits", {})
+    wait_until(lambda: journal.metrics()["failed"] == 1)
+    assert journal.latest("tiledb://owner/nb") == (b"edits", {})
+
+    # A restarted server recovers the failed entry, serves it and retries it
+    journal = SaveJournal(directory, replay, log, max_attempts=1, max_delay=0.1)
+    assert journal.latest("tiledb://owner/nb") == (b"edits", {})
+    available.set()
+    assert journal.wait("tiledb://owner/nb", timeout=5.0)
+    assert b"edits" in replayed
+    assert journal.metrics() == {"pending": 0, "failed": 0}
+    assert os.listdir(os.path.join(directory, FAILED_DIR)) == []
+
+
+def test_interrupted_appends_are_removed(tmp_path):
+    directory = tmp_path / "journal"
+    (directory / FAILED_DIR).mkdir(parents=True)
+    tmp_file = directory / "{:020d}.journal.tmp".format(1)
+    tmp_file.write_bytes(b'{"tiledb_uri": "tiledb://owner/nb"')
+
+    journal = SaveJournal(str(directory), lambda *args: None, log)
+    assert not tmp_file.exists()
+    assert journal.metrics()["pending"] == 0
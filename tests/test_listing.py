@@ -0,0 +1,77 @@
+"""
+    Metadata shown in namespace listings, returned by TileDB Cloud with the listing instead of read per array
+"""
+
+import pytest
+import tiledb
+
+from .conftest import NAMESPACE_PATH
+from .localcloud import notebook_model
+
+NOTEBOOKS = 5
+
+
+def _save_notebooks(make_manager):
+    cm = make_manager()
+    for i in range(NOTEBOOKS):
+        cm.save(
+            notebook_model(3, i, new=True), "{}/nb{}.ipynb".format(NAMESPACE_PATH, i)
+        )
+
+
+def _listed(cloud, cm):
+    cloud.reset()
+    return cm.get(NAMESPACE_PATH)["content"]
+
+
+def test_listing_metadata_without_reads(cloud, make_manager):
+    _save_notebooks(make_manager)
+
+    content = _listed(cloud, make_manager())
+    assert len(content) == NOTEBOOKS
+    for model in content:
+        assert model["size"] > 0
+        assert model["hash_algorithm"] == "sha256"
+        assert model["nbformat"] == 4
+    assert dict(cloud.calls) == {"list_arrays": 1}
+
+
+def test_client_without_listing_metadata(cloud, make_manager):
+    _save_notebooks(make_manager)
+    list_arrays = cloud.list_arrays
+
+    def old_list_arrays(tag=None, namespace=None):
+        return list_arrays(tag=tag, namespace=namespace)
+
+    cloud._patch(tiledb.cloud.client, "list_arrays", old_list_arrays)
+
+    # Names and dates only, without a read per array
+    content = _listed(cloud, make_manager())
+    assert [model.get("size") for model in content] == [None] * NOTEBOOKS
+    assert "open" not in cloud.calls
+
+    # Reads per array are opt-in
+    content = _listed(cloud, make_manager(listing_metadata=True))
+    assert all(model["size"] > 0 for model in content)
+    assert cloud.calls["open"] == NOTEBOOKS
+
+
+def test_errors_of_listings_with_metadata_are_not_cached(cloud, make_manager):
+    _save_notebooks(make_manager)
+    list_arrays = cloud.list_arrays
+    failures = [TypeError("bad response")]
+
+    def failing_list_arrays(tag=None, namespace=None, with_metadata=None):
+        if failures:
+            raise failures.pop()
+        return list_arrays(tag=tag, namespace=namespace, with_metadata=with_metadata)
+
+    cloud._patch(tiledb.cloud.client, "list_arrays", failing_list_arrays)
+    cm = make_manager()
+    with pytest.raises(Exception):
+        cm.get(NAMESPACE_PATH)
+
+    # A failed listing does not turn off listing the metadata
+    content = _listed(cloud, cm)
+    assert all(model["size"] > 0 for model in content)
+    assert "open" not in cloud.calls
@@ -0,0 +1,98 @@
+"""
+    Local files written while they are hardlinked, by checkpoints or by users, and checkpoints of local files
+    created and restored as reflinks or streamed copies
+"""
+
+import errno
+import os
+import types
+
+import pytest
+
+from tiledbcontents import localfiles
+
+
+def _unsupported_ioctl(fd, request, arg):
+    raise OSError(errno.EOPNOTSUPP, os.strerror(errno.EOPNOTSUPP))
+
+
+def _checkpoint_and_edit(cm, tmp_path):
+    """
+    Create a checkpoint of a local file, then change the file by saving it and by writing it in place
+    :return: checkpoint model
+    """
+    cm.save({"type": "file", "format": "text", "content": "old"}, "a.txt")
+    checkpoint = cm.create_checkpoint("a.txt")
+
+    cm.save({"type": "file", "format": "text", "content": "new"}, "a.txt")
+    assert cm.get("a.txt")["content"] == "new"
+    with open(str(tmp_path / "local" / "a.txt"), "r+") as f:
+        f.write("NEW")
+    assert cm.get("a.txt")["content"] == "NEW"
+    return checkpoint
+
+
+def test_hardlinked_checkpoint_keeps_contents(make_manager, tmp_path):
+    cm = make_manager()
+    cm.checkpoints.hardlink_checkpoints = True
+    cm.save({"type": "file", "format": "text", "content": "old"}, "a.txt")
+    checkpoint = cm.create_checkpoint("a.txt")
+
+    cm.save({"type": "file", "format": "text", "content": "new"}, "a.txt")
+    assert cm.get("a.txt")["content"] == "new"
+    cm.restore_checkpoint(checkpoint["id"], "a.txt")
+    assert cm.get("a.txt")["content"] == "old"
+
+
+def test_user_hardlinks_are_written_in_place(make_manager, tmp_path):
+    cm = make_manager(use_atomic_writing=False)
+    cm.save({"type": "file", "format": "text", "content": "old"}, "a.txt")
+    os_path = str(tmp_path / "local" / "a.txt")
+    link = str(tmp_path / "link.txt")
+    os.link(os_path, link)
+
+    cm.save({"type": "file", "format": "text", "content": "new"}, "a.txt")
+    assert os.path.samefile(os_path, link)
+    with open(link) as f:
+        assert f.read() == "new"
+
+
+def test_copied_checkpoint_keeps_contents(make_manager, tmp_path, monkeypatch):
+    # A filesystem without reflinks, the checkpoint is a streamed copy
+    fcntl = types.SimpleNamespace(ioctl=_unsupported_ioctl)
+    monkeypatch.setattr(localfiles, "fcntl", fcntl)
+    methods = []
+    clone_file = localfiles.clone_file
+
+    def traced_clone_file(src, dst, hardlink=False):
+        methods.append(clone_file(src, dst, hardlink=hardlink))
+        return methods[-1]
+
+    monkeypatch.setattr(
+        "tiledbcontents.tiledbcontents.clone_file", traced_clone_file
+    )
+    cm = make_manager()
+    checkpoint = _checkpoint_and_edit(cm, tmp_path)
+
+    cm.restore_checkpoint(checkpoint["id"], "a.txt")
+    assert cm.get("a.txt")["content"] == "old"
+    assert methods == [localfiles.COPY, localfiles.COPY]
+
+    # The restored file is a copy too, editing it leaves the checkpoint as it was
+    cm.save({"type": "file", "format": "text", "content": "newer"}, "a.txt")
+    cm.restore_checkpoint(checkpoint["id"], "a.txt")
+    assert cm.get("a.txt")["content"] == "old"
+
+
+def test_reflinked_checkpoint_keeps_contents(make_manager, tmp_path):
+    src = str(tmp_path / "src")
+    with open(src, "w") as f:
+        f.write("probe")
+    if localfiles.clone_file(src, str(tmp_path / "dst")) != localfiles.REFLINK:
+        pytest.skip("the filesystem of the test directory does not support reflinks")
+
+    cm = make_manager()
+    checkpoint = _checkpoint_and_edit(cm, tmp_path)
+
+    cm.restore_checkpoint(checkpoint["id"], "a.txt")
+    assert cm.get("a.txt")["content"] == "old"
@@ -0,0 +1,130 @@
+"""
+    Deduplicated outputs of cloud notebooks, and notebooks whose readers can not read the output store
+"""
+
+import nbformat
+import pytest
+from tornado.web import HTTPError
+
+from tiledbcontents.outputs import OutputCache
+
+from .conftest import NAMESPACE_PATH
+from .localcloud import NAMESPACE
+
+PATH = NAMESPACE_PATH + "/plots"
+STORE_URI = "tiledb://{}/__jupyter-outputs".format(NAMESPACE)
+
+
+def notebook_model(text, new=False):
+    notebook = nbformat.v4.new_notebook(
+        cells=[
+            nbformat.v4.new_code_cell(
+                "plot()",
+                outputs=[
+                    nbformat.v4.new_output("display_data", data={"text/plain": text})
+                ],
+            )
+        ]
+    )
+    if not new:
+        notebook.metadata["language_info"] = {"name": "python"}
+    return {"type": "notebook", "content": notebook}
+
+
+def stored_meta(cm):
+    return cm._read_array("tiledb://{}/plots".format(NAMESPACE))[1]
+
+
+@pytest.fixture
+def dedup_manager(make_manager):
+    return lambda: make_manager(dedup_outputs=True, dedup_min_output_size=10)
+
+
+def test_outputs_are_deduplicated(cloud, dedup_manager):
+    cm = dedup_manager()
+    cm.save(notebook_model("x" * 100, new=True), PATH)
+    assert stored_meta(cm)["output_refs"] == 1
+
+    content = dedup_manager().get(PATH, type="notebook")["content"]
+    assert content["cells"][0]["outputs"][0]["data"]["text/plain"] == "x" * 100
+
+
+def test_shared_notebooks_are_not_deduplicated(cloud, dedup_manager):
+    cm = dedup_manager()
+    cm.save(notebook_model("x" * 100, new=True), PATH)
+    cloud._record("tiledb://{}/plots".format(NAMESPACE))["share_count"] = 1
+
+    cm.save(notebook_model("y" * 100), PATH)
+    assert not stored_meta(cm).get("output_refs")
+
+
+def test_unreadable_output_store(cloud, dedup_manager):
+    dedup_manager().save(notebook_model("x" * 100, new=True), PATH)
+    # TileDB Cloud answers like for a missing array when an array is not shared with the user
+    with cloud._lock:
+        del cloud._arrays[STORE_URI]
+
+    # Readers still open the notebook, the output is replaced by a note naming the store
+    content = dedup_manager().get(PATH, type="notebook")["content"]
+    data = content["cells"][0]["outputs"][0]["data"]
+    assert list(data) == ["text/plain"]
+    assert STORE_URI in data["text/plain"]
+
+    # Copies need the outputs themselves
+    with pytest.raises(HTTPError) as e:
+        dedup_manager().copy(PATH + ".ipynb", "cloud/owned/other")
+    assert e.value.status_code == 403, e.value.reason
+
+
+def test_notebooks_shared_later_are_inlined_by_the_owner(cloud, dedup_manager):
+    dedup_manager().save(notebook_model("x" * 100, new=True), PATH)
+    cloud._record("tiledb://{}/plots".format(NAMESPACE))["share_count"] = 1
+
+    cm = dedup_manager()
+    content = cm.get(PATH, type="notebook")["content"]
+    assert content["cells"][0]["outputs"][0]["data"]["text/plain"] == "x" * 100
+    assert not stored_meta(cm)["output_refs"]
+
+    # Readers do not need the output store anymore
+    with cloud._lock:
+        del cloud._arrays[STORE_URI]
+    content = dedup_manager().get(PATH, type="notebook")["content"]
+    assert content["cells"][0]["outputs"][0]["data"]["text/plain"] == "x" * 100
+
+
+def test_stored_payloads_are_bounded():
+    cache = OutputCache(0, max_stored=2)
+    for digest in ("a", "b", "c"):
+        cache.add(STORE_URI, digest, b"")
+    assert not cache.stored(STORE_URI, "a")
+    assert cache.stored(STORE_URI, "b") and cache.stored(STORE_URI, "c")
+
+
+def test_exported_archives_hold_outputs_inline(cloud, dedup_manager, tmp_path):
+    cm = dedup_manager()
+    cm.save(notebook_model("x" * 100, new=True), PATH)
+    directory = str(tmp_path / "archive")
+    stats = cm.export_archive(NAMESPACE_PATH, directory)
+    assert stats["notebooks"] == 1 and not stats["failed"]
+
+    # The archive does not depend on the output store of the namespace
+    with cloud._lock:
+        del cloud._arrays[STORE_URI]
+    stats = cm.import_archive(directory)
+    assert stats["notebooks"] == 1 and not stats["failed"]
+
+    imported = [
+        uri
+        for uri in cloud._arrays
+        if uri.startswith("tiledb://{}/plots-".format(NAMESPACE))
+    ]
+    assert len(imported) == 1
+    meta = cm._read_array(imported[0])[1]
+    assert not meta["output_refs"]
+    content = cm.get(
+        "{}/{}".format(NAMESPACE_PATH, imported[0].rsplit("/", 1)[1]), type="notebook"
+    )["content"]
+    assert content["cells"][0]["outputs"][0]["data"]["text/plain"] == "x" * 100
+
+    # Unchanged notebooks are still skipped by the next export
+    assert cm.export_archive(NAMESPACE_PATH, directory)["skipped"] == 1
@@ -0,0 +1,31 @@
+"""
+    Parsing of contents API paths
+"""
+
+from tiledbcontents.paths import CloudPath
+
+
+def test_local_notebook_named_cloud_is_local():
+    parsed = CloudPath.parse("cloud.ipynb")
+    assert not parsed.is_remote
+    assert not parsed.is_dir
+    assert parsed.path == "cloud"
+    assert parsed.extension == ".ipynb"
+
+
+def test_notebook_in_cloud_folder_is_remote_file():
+    parsed = CloudPath.parse("cloud/foo.ipynb")
+    assert parsed.is_remote
+    assert not parsed.is_dir
+
+    assert not CloudPath.parse("cloud/owned.ipynb").is_dir
+
+
+def test_cloud_directories():
+    for path in ("cloud", "/cloud/", "cloud/owned", "cloud/shared/ns"):
+        parsed = CloudPath.parse(path)
+        assert parsed.is_remote and parsed.is_dir, path
+
+    parsed = CloudPath.parse("cloud/owned/ns/nb.ipynb")
+    assert parsed.is_remote and not parsed.is_dir
+    assert parsed.tiledb_uri == "tiledb://ns/nb"
@@ -0,0 +1,92 @@
+"""
+    Sampled profiles of contents operations whose TileDB Cloud calls run on worker threads
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import types
+
+from tiledbcontents import profiling
+
+from .conftest import NAMESPACE_PATH
+from .localcloud import notebook_model
+
+PATH = "{}/profiled.ipynb".format(NAMESPACE_PATH)
+
+
+class _SingleProfile(cProfile.Profile):
+    """
+    cProfile of Python 3.12 and later: only one profiler can be active at a time
+    """
+
+    active = None
+
+    def enable(self, *args, **kwargs):
+        if _SingleProfile.active not in (None, self):
+            raise ValueError("Another profiling tool is already active")
+        _SingleProfile.active = self
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        super().disable()
+        if _SingleProfile.active is self:
+            _SingleProfile.active = None
+
+
+def _sampled_manager(make_manager, tmp_path):
+    # With a deadline, reads run on the worker threads of RemoteCalls
+    cm = make_manager(
+        profile_sample_rate=1.0,
+        profile_dir=str(tmp_path / "profiles"),
+        remote_deadlines={"read": 30, "info": 30},
+    )
+    cm.save(notebook_model(5, 0, new=True), PATH)
+    return cm
+
+
+def _profiled_functions(directory):
+    names = set()
+    for name in os.listdir(directory):
+        stats = pstats.Stats(os.path.join(directory, name))
+        names.update(function for _, _, function in stats.stats)
+    return names
+
+
+def test_sampled_read_on_worker_thread(make_manager, tmp_path):
+    cm = _sampled_manager(make_manager, tmp_path)
+    assert cm.get(PATH)["content"]["nbformat"] == 4
+
+    functions = _profiled_functions(str(tmp_path / "profiles"))
+    assert "get" in functions
+    if sys.version_info < (3, 12):
+        # The read made on a worker thread is profiled on its own and merged into the profile
+        assert "_read_array_from_tiledb" in functions
+
+
+def test_sampled_read_with_a_single_profiler(make_manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        profiling, "cProfile", types.SimpleNamespace(Profile=_SingleProfile)
+    )
+    cm = _sampled_manager(make_manager, tmp_path)
+    assert cm.get(PATH)["content"]["nbformat"] == 4
+    assert "get" in _profiled_functions(str(tmp_path / "profiles"))
+
+
+def test_operation_runs_when_another_profiler_is_active(
+    make_manager, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(
+        profiling, "cProfile", types.SimpleNamespace(Profile=_SingleProfile)
+    )
+    cm = _sampled_manager(make_manager, tmp_path)
+    outside = _SingleProfile()
+    outside.enable()
+    try:
+        model = cm.get(PATH)
+    finally:
+        outside.disable()
+
+    assert model["content"]["nbformat"] == 4
+    assert cm._profiler.settings()["skipped_busy"] >= 1
@@ -0,0 +1,35 @@
+"""
+    Renames of cloud notebooks
+"""
+
+import pytest
+from tornado.web import HTTPError
+
+from .conftest import NAMESPACE_PATH
+from .localcloud import notebook_model
+
+PATH = NAMESPACE_PATH + "/nb.ipynb"
+
+
+def test_renamed_notebook_can_be_saved(cloud, make_manager):
+    cm = make_manager()
+    cm.save(notebook_model(2, 0, new=True), PATH)
+    cm.rename(PATH, NAMESPACE_PATH + "/renamed.ipynb")
+
+    cm.save(notebook_model(2, 1), NAMESPACE_PATH + "/renamed.ipynb")
+    names = [model["name"] for model in cm.get(NAMESPACE_PATH)["content"]]
+    assert names == ["renamed"]
+
+
+@pytest.mark.parametrize(
+    "new_path",
+    ["cloud", "cloud/owned", NAMESPACE_PATH, "cloud/owned/other/nb.ipynb", "nb.ipynb"],
+)
+def test_rename_to_other_than_an_array(cloud, make_manager, new_path):
+    cm = make_manager()
+    cm.save(notebook_model(2, 0, new=True), PATH)
+
+    with pytest.raises(HTTPError) as e:
+        cm.rename(PATH, new_path)
+    assert e.value.status_code == 400
+    assert cloud.calls["rename_notebook"] == 0
@@ -0,0 +1,82 @@
+"""
+    TileDB Cloud calls made per save: the saved model is built from the write, it is never fetched again
+"""
+
+import pytest
+import tiledb
+from tornado.web import HTTPError
+
+from .conftest import NAMESPACE_PATH
+from .localcloud import notebook_model
+
+# Profile for the s3 prefix, create, tag as a notebook, write
+NEW_NOTEBOOK_CALLS = {"user_profile": 1, "create": 1, "update_info": 1, "open": 1}
+NOTEBOOK_CALLS = {"open": 1}
+NEW_FILE_CALLS = dict(NEW_NOTEBOOK_CALLS, info=1)
+FILE_CALLS = {"info": 1, "open": 1}
+
+
+def _traced_save(cloud, cm, model, path):
+    cloud.reset()
+    saved = cm.save(model, path)
+    return saved, dict(cloud.calls)
+
+
+def test_notebook_save_calls(cloud, make_manager):
+    cm = make_manager()
+    for i in range(3):
+        path = "{}/nb{}.ipynb".format(NAMESPACE_PATH, i)
+        saved, calls = _traced_save(cloud, cm, notebook_model(5, i, new=True), path)
+        assert calls == NEW_NOTEBOOK_CALLS
+        # Like the models of listings, the name is the array name
+        assert saved["name"] == "nb{}".format(i)
+        assert saved["content"] is None
+
+    for i in range(3):
+        path = "{}/nb0.ipynb".format(NAMESPACE_PATH)
+        saved, calls = _traced_save(cloud, cm, notebook_model(5 + i, i), path)
+        assert calls == NOTEBOOK_CALLS
+        assert saved["type"] == "notebook"
+
+
+def test_incremented_notebook_name(cloud, make_manager):
+    cm = make_manager()
+    path = "{}/taken.ipynb".format(NAMESPACE_PATH)
+    cm.save(notebook_model(5, 0, new=True), path)
+
+    saved, calls = _traced_save(cloud, cm, notebook_model(5, 1, new=True), path)
+    assert saved["name"] == "taken-1"
+    # The taken name costs one more profile and create
+    assert calls == dict(NEW_NOTEBOOK_CALLS, user_profile=2, create=2)
+
+
+def test_file_save_calls(cloud, make_manager):
+    cm = make_manager()
+    path = "{}/notes.txt".format(NAMESPACE_PATH)
+    model = {"type": "file", "format": "text", "content": "first"}
+    saved, calls = _traced_save(cloud, cm, model, path)
+    assert calls == NEW_FILE_CALLS
+    assert saved["size"] == len("first")
+
+    for text in ("second", "third"):
+        model = {"type": "file", "format": "text", "content": text}
+        saved, calls = _traced_save(cloud, cm, model, path)
+        assert calls == FILE_CALLS
+        assert saved["size"] == len(text)
+
+
+def test_file_save_on_cloud_error(cloud, make_manager):
+    cm = make_manager()
+
+    def info(uri):
+        raise tiledb.cloud.tiledb_cloud_error.TileDBCloudError(503)
+
+    cloud._patch(tiledb.cloud.array, "info", info)
+    cloud.reset()
+    with pytest.raises(HTTPError) as e:
+        cm.save(
+            {"type": "file", "format": "text", "content": "first"},
+            "{}/notes.txt".format(NAMESPACE_PATH),
+        )
+    assert e.value.status_code == 500
+    assert cloud.calls["create"] == 0
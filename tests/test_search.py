@@ -0,0 +1,43 @@
+"""
+    Full-text search index of cloud notebooks
+"""
+
+import nbformat
+
+from tiledbcontents.search import SearchIndex
+
+
+def notebook(source):
+    return nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell(source)])
+
+
+def test_move_over_indexed_notebook(tmp_path):
+    index = SearchIndex(str(tmp_path / "index"))
+    index.update("tiledb://ns/a", "cloud/owned/ns/a", notebook("plot_histogram()"))
+    index.update("tiledb://ns/b", "cloud/owned/ns/b", notebook("plot_scatter()"))
+    index.move("tiledb://ns/a", "tiledb://ns/b", "cloud/owned/ns/b")
+    index.flush()
+
+    assert [result["path"] for result in index.search("plot")] == ["cloud/owned/ns/b"]
+    assert index.search("plot_scatter") == []
+    assert len(index.search("plot_histogram")) == 1
+
+
+def test_copy_and_move_to_same_array(tmp_path):
+    index = SearchIndex(str(tmp_path / "index"))
+    index.update("tiledb://ns/a", "cloud/owned/ns/a", notebook("plot_histogram()"))
+    index.move("tiledb://ns/a", "tiledb://ns/a-Copy", "cloud/owned/ns/a-Copy", True)
+    index.move("tiledb://ns/a", "tiledb://ns/a", "cloud/shared/ns/a")
+    index.flush()
+
+    paths = sorted(result["path"] for result in index.search("plot_histogram"))
+    assert paths == ["cloud/owned/ns/a-Copy", "cloud/shared/ns/a"]
+
+
+def test_negative_limit_returns_nothing(tmp_path):
+    index = SearchIndex(str(tmp_path / "index"))
+    index.update("tiledb://ns/a", "cloud/owned/ns/a", notebook("plot_histogram()"))
+    index.flush()
+
+    assert len(index.search("plot", limit=1)) == 1
+    assert index.search("plot", limit=-1) == []
@@ -0,0 +1,194 @@
+"""
+    Cache shared by the contents managers of a node, used from several processes at once
+"""
+
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+
+from tiledbcontents.cache import SharedCache, load_secret
+
+from .conftest import NAMESPACE_PATH, TileDBCloudContentsManager, TracingCloud
+from .localcloud import NAMESPACE, notebook_model
+
+WORKERS = 4
+KEYS_PER_WORKER = 200
+
+
+def _write_and_read(directory, worker, barrier, results):
+    cache = SharedCache(directory)
+    for i in range(KEYS_PER_WORKER):
+        cache.set(
+            "{}:{}".format(worker, i),
+            60,
+            value={"worker": worker, "i": i},
+            data=b"x" * i,
+        )
+    barrier.wait()
+
+    found = 0
+    for other in range(WORKERS):
+        for i in range(KEYS_PER_WORKER):
+            entry = cache.get("{}:{}".format(other, i))
+            if entry == ({"worker": other, "i": i}, b"x" * i):
+                found += 1
+    results.put(found)
+
+
+def _list_namespace(directory, cache_dir):
+    """
+    List a namespace with a manager of another process, filling the shared cache
+    """
+    cloud = TracingCloud(os.path.join(directory, "arrays"))
+    os.makedirs(cloud.root)
+    cloud.install()
+    try:
+        cm = TileDBCloudContentsManager(root_dir=directory, shared_cache_dir=cache_dir)
+        for i in range(3):
+            cm.save(
+                notebook_model(2, i, new=True),
+                "{}/nb{}.ipynb".format(NAMESPACE_PATH, i),
+            )
+        cm.get(NAMESPACE_PATH)
+    finally:
+        cloud.uninstall()
+
+
+def _run(target, *args):
+    process = multiprocessing.get_context("spawn").Process(target=target, args=args)
+    process.start()
+    process.join(60)
+    assert process.exitcode == 0
+
+
+def test_processes_share_entries(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(WORKERS)
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=_write_and_read, args=(str(tmp_path), worker, barrier, results)
+        )
+        for worker in range(WORKERS)
+    ]
+    for process in processes:
+        process.start()
+    found = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    assert found == [WORKERS * KEYS_PER_WORKER] * WORKERS
+
+
+def test_scopes_are_isolated(tmp_path):
+    cache = SharedCache(str(tmp_path))
+    cache.set("listing:a", 60, value=1, scope="alice")
+    cache.set("listing:a", 60, value=2, scope="bob")
+    cache.invalidate("listing:", scope="alice")
+
+    assert cache.get("listing:a", scope="alice") is None
+    assert cache.get("listing:a", scope="bob") == (2, None)
+    assert cache.get("listing:a") is None
+
+
+def test_listing_served_from_another_process(cloud, make_manager, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    other = tmp_path / "other"
+    other.mkdir()
+    _run(_list_namespace, str(other), cache_dir)
+
+    # The stand-in of this process has no arrays, the listing can only come from the cache
+    cm = make_manager(shared_cache_dir=cache_dir)
+    names = sorted(model["name"] for model in cm.get(NAMESPACE_PATH)["content"])
+    assert names == ["nb0", "nb1", "nb2"]
+    assert cloud.calls["list_arrays"] == 0
+
+
+def test_public_contents_are_cached(cloud, make_manager, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    make_manager().save(notebook_model(4, 0, new=True), NAMESPACE_PATH + "/nb")
+    path = "cloud/public/{}/nb".format(NAMESPACE)
+
+    expected = make_manager(shared_cache_dir=cache_dir).get(path, type="notebook")["content"]
+    cloud.reset()
+    cm = make_manager(shared_cache_dir=cache_dir)
+    assert cm.get(path, type="notebook")["content"] == expected
+    # Only the metadata is read, to check the cached contents against the content hash of the array
+    assert cloud.calls["open"] == 1
+
+
+def test_tampered_public_contents_are_not_served(cloud, make_manager, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    make_manager().save(notebook_model(4, 0, new=True), NAMESPACE_PATH + "/nb")
+    path = "cloud/public/{}/nb".format(NAMESPACE)
+    expected = make_manager(shared_cache_dir=cache_dir).get(path, type="notebook")["content"]
+
+    cache = SharedCache(cache_dir)
+    key = "array:tiledb://{}/nb".format(NAMESPACE)
+    meta, data = cache.get(key)
+    cache.set(key, 3600, value=meta, data=data.replace(b"print", b"PRINT"))
+
+    cloud.reset()
+    cm = make_manager(shared_cache_dir=cache_dir)
+    assert cm.get(path, type="notebook")["content"] == expected
+    assert cloud.calls["open"] == 1
+
+
+def test_unsigned_entries_of_user_scopes_are_ignored(tmp_path):
+    secret = load_secret(str(tmp_path / "secret"))
+    assert load_secret(str(tmp_path / "secret")) == secret
+    cache = SharedCache(str(tmp_path / "cache"), secret=secret)
+    cache.set("listing:a", 60, value=1, scope="alice")
+    assert cache.get("listing:a", scope="alice") == (1, None)
+
+    # Another user of the node can write to the database, but not sign entries
+    SharedCache(str(tmp_path / "cache")).set("listing:a", 60, value=2, scope="alice")
+    assert cache.get("listing:a", scope="alice") is None
+
+
+def test_tampered_listings_are_not_served(cloud, make_manager, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    cm = make_manager(shared_cache_dir=cache_dir)
+    cm.save(notebook_model(2, 0, new=True), NAMESPACE_PATH + "/nb")
+    cm.get(NAMESPACE_PATH)
+
+    cache = SharedCache(cache_dir)
+    key = "listing:{}".format(NAMESPACE_PATH)
+    listing, _ = cache.get(key, scope=cm.shared_cache_user)
+    cache.set(key, 3600, value=listing, scope=cm.shared_cache_user)
+
+    cloud.reset()
+    make_manager(shared_cache_dir=cache_dir).get(NAMESPACE_PATH)
+    assert cloud.calls["list_arrays"] >= 1
+
+
+def test_planted_public_contents_are_not_served(cloud, make_manager, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    make_manager().save(notebook_model(4, 0, new=True), NAMESPACE_PATH + "/nb")
+    path = "cloud/public/{}/nb".format(NAMESPACE)
+    expected = make_manager(shared_cache_dir=cache_dir).get(path, type="notebook")["content"]
+
+    # Another user writes contents which match the content hash they are cached with
+    cache = SharedCache(cache_dir)
+    key = "array:tiledb://{}/nb".format(NAMESPACE)
+    meta, data = cache.get(key)
+    data = data.replace(b"print", b"PRINT")
+    meta["content_hash"] = hashlib.sha256(data).hexdigest()
+    cache.set(key, 3600, value=meta, data=data)
+
+    cm = make_manager(shared_cache_dir=cache_dir)
+    assert cm.get(path, type="notebook")["content"] == expected
+
+
+def test_cache_errors_are_cache_misses(cloud, make_manager, tmp_path):
+    cm = make_manager(shared_cache_dir=str(tmp_path / "cache"))
+    cm.save(notebook_model(2, 0, new=True), NAMESPACE_PATH + "/nb")
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    cm._shared_cache.get = cm._shared_cache.set = locked
+    names = [model["name"] for model in cm.get(NAMESPACE_PATH)["content"]]
+    assert names == ["nb"]
@@ -0,0 +1,54 @@
+"""
+    Warm-start snapshot of the listings and metadata kept in memory
+"""
+
+from .conftest import NAMESPACE_PATH
+from .localcloud import notebook_model
+
+
+def test_save_without_snapshot_path(make_manager):
+    # Called at shutdown whatever the configuration
+    make_manager().save_snapshot()
+
+
+def test_listing_restored_from_snapshot(cloud, make_manager, tmp_path):
+    traits = dict(
+        snapshot_path=str(tmp_path / "snapshot.json"),
+        snapshot_interval=0,
+        listing_stale_while_revalidate=True,
+    )
+    cm = make_manager(**traits)
+    cm.save(notebook_model(2, 0, new=True), NAMESPACE_PATH + "/nb.ipynb")
+    cm.get(NAMESPACE_PATH)
+    cm.save_snapshot()
+
+    # The restored listing is served first, before it is refreshed without the deleted notebook
+    with cloud._lock:
+        cloud._arrays.clear()
+    cm = make_manager(**traits)
+    names = [model["name"] for model in cm.get(NAMESPACE_PATH)["content"]]
+    assert names == ["nb"]
+
+
+def test_listing_past_max_staleness_not_restored(cloud, make_manager, tmp_path):
+    traits = dict(
+        snapshot_path=str(tmp_path / "snapshot.json"),
+        snapshot_interval=0,
+        listing_stale_while_revalidate=True,
+        listing_refresh_interval=0,
+        listing_max_staleness=60,
+    )
+    cm = make_manager(**traits)
+    cm.save(notebook_model(2, 0, new=True), NAMESPACE_PATH + "/nb.ipynb")
+    cm.get(NAMESPACE_PATH)
+    # Saved as fetched longer than listing_max_staleness ago, e.g. by a server stopped for a few minutes
+    for entry in cm._listings.values():
+        entry.fetched -= 61
+    cm.save_snapshot()
+
+    # The listing is fetched again on the request path instead of being served as fresh
+    with cloud._lock:
+        cloud._arrays.clear()
+    cm = make_manager(**traits)
+    assert cm._listings == {}
+    assert cm.get(NAMESPACE_PATH)["content"] == []
@@ -8,3 +8,18 @@ except:
     pass
 
 from .tiledbcontents import TileDBCloudContentsManager
+
+
+def _jupyter_server_extension_paths():
+    return [{"module": "tiledbcontents"}]
+
+
+def load_jupyter_server_extension(nb_server_app):
+    """
+    Register the TileDB contents REST handlers
+    :param nb_server_app: notebook application
+    :return:
+    """
+    from .handlers import setup_handlers
+
+    setup_handlers(nb_server_app.web_app)
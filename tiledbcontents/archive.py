@@ -0,0 +1,138 @@
+"""
+    Local archive of the raw contents and metadata of cloud notebook arrays, for exports and imports of namespaces
+"""
+
+import json
+import os
+import threading
+import urllib.parse
+
+MANIFEST = "manifest.jsonl"
+IMPORTED = "imported.jsonl"
+DATA_DIR = "arrays"
+
+
+def _json_value(value):
+    # Metadata read from TileDB holds numpy scalars
+    return value.item() if hasattr(value, "item") else value
+
+
+def _read_records(path):
+    """
+    Read a JSON lines file, a line cut short by an interruption is ignored
+    :return: list of dicts
+    """
+    records = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+
+class NotebookArchive:
+    """
+    A directory holding one file of raw contents per array and a manifest of their paths and metadata.
+
+    The manifest and the log of imports are appended to once an array is completely written, so an interrupted
+    export or import is resumed by skipping the arrays they list.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: local directory of the archive, created if needed
+        """
+        self.directory = directory
+        os.makedirs(os.path.join(directory, DATA_DIR), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _append(self, name, record):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            with open(os.path.join(self.directory, name), "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def exported(self):
+        """
+        :return: dict of cloud path to manifest record, the latest record of a path wins
+        """
+        return {
+            record["path"]: record
+            for record in _read_records(os.path.join(self.directory, MANIFEST))
+        }
+
+    def write(self, path, contents, meta):
+        """
+        Store the contents of an array and add it to the manifest
+        :param path: cloud path of the array, cloud/<category>/<namespace>/<name>
+        :param contents: bytes-like contents, or None for an empty array
+        :param meta: array metadata
+        :return: manifest record
+        """
+        namespace, name = path.split("/")[-2:]
+        file = "/".join(
+            (
+                DATA_DIR,
+                urllib.parse.quote(namespace, safe=""),
+                urllib.parse.quote(name, safe=""),
+            )
+        )
+        target = os.path.join(self.directory, *file.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        size = 0
+        with open(target + ".tmp", "wb") as f:
+            if contents is not None:
+                f.write(contents)
+                size = len(contents)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(target + ".tmp", target)
+
+        record = {
+            "path": path,
+            "file": file,
+            "size": size,
+            "empty": contents is None,
+            "meta": {key: _json_value(value) for key, value in meta.items()},
+        }
+        self._append(MANIFEST, record)
+        return record
+
+    def read(self, record):
+        """
+        :param record: manifest record
+        :return: bytes of the array contents, None for an empty array
+        """
+        if record.get("empty"):
+            return None
+        with open(os.path.join(self.directory, *record["file"].split("/")), "rb") as f:
+            return f.read()
+
+    def imported(self, to_path):
+        """
+        :param to_path: directory the archive is imported to, None for the original namespaces
+        :return: dict of cloud path in the archive to its path once imported
+        """
+        return {
+            record["path"]: record["to"]
+            for record in _read_records(os.path.join(self.directory, IMPORTED))
+            if record.get("into") == to_path
+        }
+
+    def mark_imported(self, path, to_path, new_path):
+        """
+        Log the import of an array, so a resumed import skips it
+        :param path: cloud path in the archive
+        :param to_path: directory the archive is imported to, None for the original namespaces
+        :param new_path: cloud path of the imported array
+        :return:
+        """
+        self._append(IMPORTED, {"path": path, "into": to_path, "to": new_path})
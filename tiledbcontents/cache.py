@@ -0,0 +1,222 @@
+"""
+    Cross-process cache shared by the contents managers running on a node
+"""
+
+import datetime
+import hashlib
+import hmac
+import json
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+
+CACHE_FILE = "tiledbcontents-cache.sqlite"
+
+# Entries without a user scope are shared by everyone, for example public notebook contents
+SHARED_SCOPE = ""
+
+# Fraction of writes which also prune expired entries
+PRUNE_PROBABILITY = 0.01
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expires REAL NOT NULL,
+    value TEXT,
+    data BLOB,
+    mac TEXT,
+    PRIMARY KEY (scope, key)
+)
+"""
+
+
+def encode_json(value):
+    """
+    JSON encode a value, datetimes are tagged so they can be restored
+    """
+
+    def default(obj):
+        if isinstance(obj, datetime.datetime):
+            return {"__datetime__": obj.isoformat()}
+        raise TypeError("Cannot cache value of type {}".format(type(obj).__name__))
+
+    return json.dumps(value, default=default)
+
+
+def load_secret(path):
+    """
+    Read the secret of a user, or create it readable by the user only. Concurrent servers of the user all end up
+    with the secret of the first one
+    :param path: file holding the secret
+    :return: secret bytes
+    """
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(secrets.token_hex(32).encode("ascii"))
+    try:
+        # Linking never replaces a secret created by a concurrent server
+        os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp_path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def decode_json(text):
+    """
+    Decode a value encoded by encode_json
+    """
+
+    def object_hook(obj):
+        if len(obj) == 1 and "__datetime__" in obj:
+            return datetime.datetime.fromisoformat(obj["__datetime__"])
+        return obj
+
+    return json.loads(text, object_hook=object_hook)
+
+
+class SharedCache:
+    """
+    A SQLite backed cache in a local directory, shared by every process which opens the same directory.
+
+    Each entry holds a JSON value and optional raw bytes. Values are JSON and never pickled, so a process can not
+    execute code through the cache of another one. Entries are isolated per scope, which should be the user for
+    anything that depends on their permissions.
+
+    Every user of the node can write to the database, so with a secret the entries of user scopes are signed with
+    an HMAC and only served if it matches. Entries written or changed by anyone without the secret are ignored.
+    Shared entries can not be signed, their values must be checked by the caller.
+    """
+
+    def __init__(self, directory, timeout=5.0, secret=None):
+        """
+        :param directory: directory holding the cache database, created if missing
+        :param timeout: seconds to wait for a lock held by another process
+        :param secret: bytes only known to the user, signing the entries of user scopes
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, CACHE_FILE)
+        self.timeout = timeout
+        self.secret = secret
+        self._local = threading.local()
+
+        with self._connection() as conn:
+            conn.execute(SCHEMA)
+            try:
+                # Databases created before entries were signed
+                conn.execute("ALTER TABLE entries ADD COLUMN mac TEXT")
+            except sqlite3.OperationalError:
+                pass
+
+    def _mac(self, scope, key, expires, value, data):
+        """
+        :return: HMAC of an entry of a user scope, None if entries are not signed
+        """
+        if self.secret is None or scope == SHARED_SCOPE:
+            return None
+        mac = hmac.new(self.secret, digestmod=hashlib.sha256)
+        for part in (scope, key, repr(expires), value or ""):
+            part = part.encode("utf-8")
+            mac.update(b"%d:" % len(part))
+            mac.update(part)
+        mac.update(b"%d:" % (-1 if data is None else len(data)))
+        mac.update(data or b"")
+        return mac.hexdigest()
+
+    def _connection(self):
+        """
+        SQLite connections can not be shared between threads, so each thread opens its own
+        :return: connection of the current thread
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            # Readers do not block the writer, which matters with many servers polling the same listings
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, scope=SHARED_SCOPE):
+        """
+        Fetch an entry
+        :param key: key of the entry
+        :param scope: user scope of the entry
+        :return: tuple of value and bytes, or None if there is no live entry
+        """
+        row = (
+            self._connection()
+            .execute(
+                "SELECT expires, value, data, mac FROM entries WHERE scope = ? AND key = ? AND expires > ?",
+                (scope, key, time.time()),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+
+        expires, value, data, mac = row
+        expected = self._mac(scope, key, expires, value, data)
+        if expected is not None and not hmac.compare_digest(expected, mac or ""):
+            return None
+
+        value = decode_json(value) if value is not None else None
+        return value, data
+
+    def set(self, key, ttl, value=None, data=None, scope=SHARED_SCOPE):
+        """
+        Store an entry
+        :param key: key of the entry
+        :param ttl: seconds the entry stays valid
+        :param value: JSON serializable value, datetimes are supported
+        :param data: raw bytes
+        :param scope: user scope of the entry
+        :return:
+        """
+        now = time.time()
+        expires = now + ttl
+        value = encode_json(value) if value is not None else None
+        data = bytes(data) if data is not None else None
+        mac = self._mac(scope, key, expires, value, data)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (scope, key, expires, value, data, mac) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    scope,
+                    key,
+                    expires,
+                    value,
+                    sqlite3.Binary(data) if data is not None else None,
+                    mac,
+                ),
+            )
+            if random.random() < PRUNE_PROBABILITY:
+                conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+
+    def invalidate(self, prefix="", scope=SHARED_SCOPE):
+        """
+        Remove the entries of a scope whose key starts with prefix
+        :param prefix: key prefix, all entries of the scope if empty
+        :param scope: user scope of the entries
+        :return:
+        """
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM entries WHERE scope = ? AND key LIKE ? ESCAPE '\\'",
+                (scope, pattern + "%"),
+            )
@@ -0,0 +1,95 @@
+"""
+    Encoding of file contents for the contents API, from bounded-size slices
+"""
+
+import base64
+import codecs
+import mimetypes
+
+# Base64 output can only be concatenated when every slice but the last is a multiple of 3 bytes
+DEFAULT_CHUNK_SIZE = 3 * 1024 * 1024
+
+TEXT_MIMETYPES = ("application/json", "application/javascript", "application/xml")
+
+
+def guess_format(mimetype):
+    """
+    Guess the contents API format of a file from its mimetype
+    :param mimetype: mimetype or None
+    :return: "text", "base64" or None when it can not be told
+    """
+    if mimetype is None:
+        return None
+    if mimetype.startswith("text/") or mimetype in TEXT_MIMETYPES:
+        return "text"
+    return "base64"
+
+
+def guess_mimetype(name, format):
+    """
+    Mimetype of a file without stored mimetype, the same way the file contents manager does
+    :param name: file name
+    :param format: "text" or "base64"
+    :return: mimetype
+    """
+    mimetype = mimetypes.guess_type(name)[0]
+    if mimetype is not None:
+        return mimetype
+    return "text/plain" if format == "text" else "application/octet-stream"
+
+
+def encode_contents(read_slice, size, format=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encode file contents for the contents API, reading them in slices so only one slice of raw bytes is held at a
+    time next to the encoded output
+    :param read_slice: function(start, stop) returning the bytes in [start, stop)
+    :param size: size of the contents in bytes
+    :param format: "text", "base64" or None to try text and fall back to base64
+    :param chunk_size: maximum bytes read per slice, rounded down to a multiple of 3
+    :return: tuple of the encoded contents and their format
+    :raises UnicodeDecodeError: if the format is "text" and the contents are not UTF-8
+    """
+    chunk_size = max(3, chunk_size - chunk_size % 3)
+
+    if format in (None, "text"):
+        try:
+            return _encode_text(read_slice, size, chunk_size), "text"
+        except UnicodeDecodeError:
+            if format == "text":
+                raise
+
+    return _encode_base64(read_slice, size, chunk_size), "base64"
+
+
+def _encode_text(read_slice, size, chunk_size):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parts = []
+    for start in range(0, size, chunk_size):
+        stop = min(size, start + chunk_size)
+        parts.append(decoder.decode(bytes(read_slice(start, stop)), final=stop == size))
+    return "".join(parts)
+
+
+def _encode_base64(read_slice, size, chunk_size):
+    # The ASCII output is written into a buffer of its exact final size and decoded once, so it is never
+    # over-allocated while it grows
+    out = bytearray(4 * ((size + 2) // 3))
+    position = 0
+    for start in range(0, size, chunk_size):
+        stop = min(size, start + chunk_size)
+        encoded = base64.b64encode(bytes(read_slice(start, stop)))
+        out[position : position + len(encoded)] = encoded
+        position += len(encoded)
+    return out.decode("ascii")
+
+
+def decode_contents(content, format):
+    """
+    Decode the contents of a file model into bytes
+    :param content: str contents of the model
+    :param format: "text" or "base64"
+    :return: bytes
+    """
+    if format == "base64":
+        return base64.b64decode(content.encode("ascii"))
+    return content.encode("utf-8")
@@ -0,0 +1,315 @@
+"""
+    REST handlers for TileDB Cloud specific contents operations
+"""
+
+import functools
+import json
+import os
+
+from tornado import gen, web
+from tornado.ioloop import IOLoop
+
+from jupyter_client.jsonutil import date_default
+from notebook.base.handlers import APIHandler, path_regex
+from notebook.services.contents.handlers import validate_model
+from notebook.utils import url_path_join
+
+from .tiledbcontents import http_error
+
+BULK_ACTIONS = ("delete", "rename", "copy")
+
+ARCHIVE_ACTIONS = ("export", "import")
+
+# Profiler settings which can be changed at runtime, the profile directory is only set by configuration
+PROFILING_SETTINGS = ("sample_rate", "operations", "path_prefix", "max_files")
+
+
+class BulkContentsHandler(APIHandler):
+    """
+    Run a bulk delete, rename or copy over many paths.
+
+    Request body: {"action": "delete", "items": ["path", ...]} or
+    {"action": "rename" | "copy", "items": [{"from": "path", "to": "path"}, ...]}
+    """
+
+    @web.authenticated
+    @gen.coroutine
+    def post(self):
+        body = self.get_json_body() or {}
+        if not isinstance(body, dict):
+            raise http_error(400, "Bulk request must be a JSON object")
+        action = body.get("action")
+        items = body.get("items")
+
+        if action not in BULK_ACTIONS:
+            raise http_error(400, "Unknown bulk action: {}".format(action))
+        if not isinstance(items, list):
+            raise http_error(400, "Bulk request must contain a list of items")
+
+        cm = self.contents_manager
+        if not hasattr(cm, "bulk_delete"):
+            raise http_error(
+                400, "Bulk operations are not supported by this contents manager"
+            )
+
+        if action == "delete":
+            func, args = cm.bulk_delete, items
+        else:
+            try:
+                pairs = [(item["from"], item.get("to")) for item in items]
+            except (KeyError, TypeError):
+                raise http_error(
+                    400, "Each {} item must have a 'from' path".format(action)
+                )
+            func = cm.bulk_rename if action == "rename" else cm.bulk_copy
+            args = pairs
+
+        results = yield IOLoop.current().run_in_executor(None, func, args)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps({"action": action, "results": results}))
+
+
+class ArchiveHandler(APIHandler):
+    """
+    Export a cloud category or namespace to a local archive directory, or import an archive to a namespace.
+
+    Request body: {"action": "export", "path": "cloud/owned/<namespace>", "archive": "<directory>"} or
+    {"action": "import", "archive": "<directory>", "path": "cloud/owned/<namespace>" or null for the original
+    namespaces}. Archive directories are relative to the root directory of the server and must be inside it.
+    """
+
+    @web.authenticated
+    @gen.coroutine
+    def post(self):
+        body = self.get_json_body() or {}
+        if not isinstance(body, dict):
+            raise http_error(400, "Archive request must be a JSON object")
+        action = body.get("action")
+        archive = body.get("archive")
+
+        if action not in ARCHIVE_ACTIONS:
+            raise http_error(400, "Unknown archive action: {}".format(action))
+        if not archive:
+            raise http_error(400, "Archive request must contain an archive directory")
+        if action == "export" and not body.get("path"):
+            raise http_error(400, "Export request must contain the path to export")
+
+        cm = self.contents_manager
+        if not hasattr(cm, "export_archive"):
+            raise http_error(400, "Archives are not supported by this contents manager")
+
+        # Symlinks and .. are resolved first, so neither can point outside of the root directory
+        root_dir = os.path.realpath(cm.root_dir)
+        directory = os.path.realpath(os.path.join(root_dir, str(archive)))
+        if os.path.commonpath([root_dir, directory]) != root_dir:
+            raise http_error(
+                400, "Archive directory {} is outside of the root directory".format(archive)
+            )
+        if action == "export":
+            func = functools.partial(cm.export_archive, body["path"], directory)
+        else:
+            func = functools.partial(cm.import_archive, directory, body.get("path"))
+
+        stats = yield IOLoop.current().run_in_executor(None, func)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(dict(stats, action=action)))
+
+
+class SearchHandler(APIHandler):
+    """
+    Search the local full-text index of cloud notebooks: GET ?q=<query>&limit=<n>
+    """
+
+    @web.authenticated
+    @gen.coroutine
+    def get(self):
+        query = self.get_query_argument("q", "")
+        try:
+            limit = int(self.get_query_argument("limit", "50"))
+        except ValueError:
+            raise http_error(400, "limit must be an integer")
+        if limit < 0:
+            raise http_error(400, "limit must not be negative")
+
+        cm = self.contents_manager
+        if not hasattr(cm, "search"):
+            raise http_error(400, "Search is not supported by this contents manager")
+
+        results = yield IOLoop.current().run_in_executor(None, cm.search, query, limit)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps({"query": query, "results": results}))
+
+
+class ConditionalContentsHandler(APIHandler):
+    """
+    Get a contents model only if it changed. The hash of the client's copy is sent as If-None-Match header or hash
+    query argument, a 304 without contents is returned while it matches the current content hash. Otherwise the
+    model is returned like by the contents API, with its hash as ETag.
+    """
+
+    @web.authenticated
+    @gen.coroutine
+    def get(self, path=""):
+        cm = self.contents_manager
+        if not hasattr(cm, "current_hash"):
+            raise http_error(
+                400, "Conditional gets are not supported by this contents manager"
+            )
+
+        type = self.get_query_argument("type", default=None)
+        if type not in {None, "directory", "file", "notebook"}:
+            raise http_error(400, "Type {!r} is invalid".format(type))
+        format = self.get_query_argument("format", default=None)
+        if format not in {None, "text", "base64"}:
+            raise http_error(400, "Format {!r} is invalid".format(format))
+        content = self.get_query_argument("content", default="1")
+        if content not in {"0", "1"}:
+            raise http_error(400, "Content {!r} is invalid".format(content))
+        content = int(content)
+
+        known = self.request.headers.get("If-None-Match") or self.get_query_argument(
+            "hash", ""
+        )
+        known = known.strip()
+        if known.startswith("W/"):
+            known = known[2:]
+        known = known.strip('"')
+
+        executor = IOLoop.current().run_in_executor
+        if known and type != "directory":
+            current = yield executor(None, cm.current_hash, path)
+            if current is not None and current == known:
+                self.set_header("ETag", '"{}"'.format(current))
+                self.set_status(304)
+                self.finish()
+                return
+
+        # Local files only carry their hash when it is asked for
+        model = yield executor(
+            None,
+            functools.partial(
+                cm.get,
+                path=path,
+                type=type,
+                format=format,
+                content=content,
+                require_hash=True,
+            ),
+        )
+        validate_model(model, expect_content=content)
+        if model.get("hash"):
+            self.set_header("ETag", '"{}"'.format(model["hash"]))
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(model, default=date_default))
+
+
+class ListingHandler(APIHandler):
+    """
+    Get a directory model like the contents API, with the JSON of large cloud namespaces streamed a batch of entries
+    at a time instead of encoded at once
+    """
+
+    @web.authenticated
+    @gen.coroutine
+    def get(self, path=""):
+        cm = self.contents_manager
+        if not hasattr(cm, "get_listing"):
+            raise http_error(
+                400, "Streamed listings are not supported by this contents manager"
+            )
+
+        listing = yield IOLoop.current().run_in_executor(None, cm.get_listing, path)
+        self.set_header("Content-Type", "application/json")
+        if isinstance(listing, dict):
+            self.finish(json.dumps(listing, default=date_default))
+            return
+
+        for chunk in listing.iter_json(default=date_default):
+            self.write(chunk)
+            yield self.flush()
+        self.finish()
+
+
+class MetricsHandler(APIHandler):
+    """
+    Counters of the contents manager: remote call deadlines, hedges fired and won and latency percentiles
+    """
+
+    @web.authenticated
+    def get(self):
+        cm = self.contents_manager
+        if not hasattr(cm, "metrics"):
+            raise http_error(400, "Metrics are not supported by this contents manager")
+
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(cm.metrics()))
+
+
+class ProfilingHandler(APIHandler):
+    """
+    Sampling profiler of contents operations. GET returns its settings, counters and newest profile files, PATCH
+    changes the settings: {"sample_rate": 0.1, "operations": ["get"], "path_prefix": "cloud/owned/<namespace>"}
+    """
+
+    def _profiler(self):
+        profiler = getattr(self.contents_manager, "_profiler", None)
+        if profiler is None:
+            raise http_error(400, "Profiling is not supported by this contents manager")
+        return profiler
+
+    def _finish_settings(self, profiler):
+        settings = profiler.settings()
+        settings["profiles"] = profiler.profiles()
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(settings))
+
+    @web.authenticated
+    def get(self):
+        self._finish_settings(self._profiler())
+
+    @web.authenticated
+    def patch(self):
+        profiler = self._profiler()
+        body = self.get_json_body()
+        if body is None:
+            body = {}
+        if not isinstance(body, dict):
+            raise http_error(400, "Profiling settings must be a JSON object")
+        unknown = sorted(set(body) - set(PROFILING_SETTINGS))
+        if unknown:
+            raise http_error(
+                400, "Unknown profiling settings: {}".format(", ".join(unknown))
+            )
+        if isinstance(body.get("operations"), str):
+            raise http_error(400, "Profiled operations must be a list")
+
+        try:
+            profiler.configure(**body)
+        except (TypeError, ValueError) as e:
+            raise http_error(400, str(e))
+        self._finish_settings(profiler)
+
+
+def setup_handlers(web_app):
+    """
+    Register the TileDB contents handlers on the notebook web application
+    :param web_app: tornado web application
+    :return:
+    """
+    base_url = web_app.settings["base_url"]
+    handlers = [
+        (url_path_join(base_url, "api/tiledb/contents/bulk"), BulkContentsHandler),
+        (url_path_join(base_url, "api/tiledb/contents/archive"), ArchiveHandler),
+        (url_path_join(base_url, "api/tiledb/contents/search"), SearchHandler),
+        (url_path_join(base_url, "api/tiledb/contents/metrics"), MetricsHandler),
+        (url_path_join(base_url, "api/tiledb/contents/profiling"), ProfilingHandler),
+        (
+            url_path_join(base_url, r"api/tiledb/contents/conditional%s" % path_regex),
+            ConditionalContentsHandler,
+        ),
+        (
+            url_path_join(base_url, r"api/tiledb/contents/listing%s" % path_regex),
+            ListingHandler,
+        ),
+    ]
+    web_app.add_handlers(".*$", handlers)
@@ -18,9 +18,6 @@ from notebook.services.contents.checkpoints import (
 from notebook.services.contents.filemanager import FileContentsManager
 from notebook.services.contents.filecheckpoints import GenericFileCheckpoints
 from notebook.services.contents.manager import ContentsManager
-from notebook.services.contents.tests.test_manager import TestContentsManager
-from notebook.services.contents.tests.test_contents_api import APITest
-from notebook.tests.launchnotebook import assert_http_error
 from notebook.utils import to_os_path
 from nbformat import from_dict, reads, writes
 from nbformat.v4.nbbase import (
@@ -34,10 +31,13 @@ from traitlets import (
     Any,
     Bool,
     Dict,
+    Float,
     Instance,
     Integer,
     HasTraits,
+    List,
     Unicode,
+    default,
 )
 
 
@@ -51,13 +51,16 @@ __all__ = [
     "ContentsManager",
     "Dict",
     "FileContentsManager",
+    "Float",
     "GenericCheckpointsMixin",
     "GenericFileCheckpoints",
     "HasTraits",
     "Instance",
     "Integer",
+    "List",
     "TestContentsManager",
     "Unicode",
+    "default",
     "from_dict",
     "new_code_cell",
     "new_markdown_cell",
@@ -68,3 +71,18 @@ __all__ = [
     "to_os_path",
     "writes",
 ]
+
+# The notebook test modules are slow to import and only needed by test suites, so they are loaded on first access
+_TEST_IMPORTS = {
+    "APITest": "notebook.services.contents.tests.test_contents_api",
+    "TestContentsManager": "notebook.services.contents.tests.test_manager",
+    "assert_http_error": "notebook.tests.launchnotebook",
+}
+
+
+def __getattr__(name):
+    if name in _TEST_IMPORTS:
+        import importlib
+
+        return getattr(importlib.import_module(_TEST_IMPORTS[name]), name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,350 @@
+"""
+    Durable local write-ahead journal of cloud saves
+"""
+
+import json
+import os
+import threading
+import time
+
+ENTRY_SUFFIX = ".journal"
+FAILED_DIR = "failed"
+
+
+class JournalEntry:
+    """
+    A journaled write of the full contents of an array
+    """
+
+    __slots__ = (
+        "seq",
+        "tiledb_uri",
+        "meta",
+        "created",
+        "file_path",
+        "attempts",
+        "next_attempt",
+        "failed",
+    )
+
+    def __init__(self, seq, tiledb_uri, meta, created, file_path):
+        self.seq = seq
+        self.tiledb_uri = tiledb_uri
+        self.meta = meta
+        self.created = created
+        self.file_path = file_path
+        # Failed replays so far, and the time.monotonic() before which the entry is not retried
+        self.attempts = 0
+        self.next_attempt = 0.0
+        # Moved to the failed directory after max_attempts, still served and retried every max_delay
+        self.failed = False
+
+    def read(self):
+        """
+        :return: the journaled bytes
+        """
+        with open(self.file_path, "rb") as f:
+            f.readline()
+            return f.read()
+
+
+class SaveJournal:
+    """
+    Saves are appended durably to a local directory (written, fsynced and atomically renamed into place) and
+    acknowledged right away. A background thread replays them to TileDB in order, retrying failed writes with
+    backoff. Retries are scheduled per entry, the entries of other arrays are replayed while one waits for its next
+    attempt. Entries still in the directory at startup are recovered and replayed.
+
+    An entry which failed max_attempts times is moved to the failed directory, so it can be recovered by hand, but
+    it stays the newest contents of its array: it is still served by latest() and retried every max_delay seconds,
+    also after a restart, until it is replayed or superseded by a newer save. Failed entries are counted in
+    metrics().
+
+    Only the newest entry of an array matters since every entry holds the full contents, so older entries of an
+    array are dropped once a newer one is journaled.
+    """
+
+    def __init__(
+        self, directory, replay, log, max_attempts=10, retry_delay=0.5, max_delay=30.0
+    ):
+        """
+        :param directory: journal directory, created if missing
+        :param replay: function(tiledb_uri, data, meta) writing an entry to TileDB
+        :param log: logger
+        :param max_attempts: attempts before an entry is moved to the failed directory and retried every max_delay
+        :param retry_delay: delay before the first retry, doubled on each attempt
+        :param max_delay: maximum delay between retries
+        """
+        self.directory = directory
+        self.replay = replay
+        self.log = log
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+
+        os.makedirs(os.path.join(directory, FAILED_DIR), exist_ok=True)
+
+        self._cond = threading.Condition()
+        self._entries = {}
+        self._latest = {}
+        self._seq = 0
+        self._recover()
+
+        self._worker = threading.Thread(
+            target=self._replay_entries, name="tiledbcontents-journal", daemon=True
+        )
+        self._worker.start()
+
+    def _recover(self):
+        """
+        Load the entries left over by a previous server, pending and failed ones, in journal order, and remove the
+        temporary files of appends interrupted by a crash. Sequence numbers continue after the highest one in use,
+        including failed entries, so new entries never take the name of a kept one
+        :return:
+        """
+        failed_dir = os.path.join(self.directory, FAILED_DIR)
+        files = []
+        for directory, failed in ((self.directory, False), (failed_dir, True)):
+            for name in os.listdir(directory):
+                file_path = os.path.join(directory, name)
+                if name.endswith(ENTRY_SUFFIX + ".tmp"):
+                    self.log.info("Removing interrupted journal entry %s", file_path)
+                    try:
+                        os.remove(file_path)
+                    except FileNotFoundError:
+                        pass
+                    continue
+                if not name.endswith(ENTRY_SUFFIX):
+                    continue
+                try:
+                    seq = int(name[: -1 * len(ENTRY_SUFFIX)])
+                except ValueError:
+                    continue
+                self._seq = max(self._seq, seq)
+                files.append((seq, file_path, failed))
+
+        for seq, file_path, failed in sorted(files):
+            try:
+                with open(file_path, "rb") as f:
+                    header = json.loads(f.readline().decode("utf-8"))
+            except (OSError, ValueError) as e:
+                self.log.error("Skipping unreadable journal entry %s: %s", file_path, e)
+                continue
+
+            entry = JournalEntry(
+                seq, header["tiledb_uri"], header["meta"], header["created"], file_path
+            )
+            if failed:
+                entry.failed = True
+                entry.attempts = self.max_attempts
+            self._add(entry)
+
+        if self._entries:
+            self.log.info("Recovered %d journaled saves", len(self._entries))
+
+    def _add(self, entry):
+        superseded = self._latest.get(entry.tiledb_uri)
+        if superseded is not None and superseded > entry.seq:
+            # A newer entry was added first by a concurrent save
+            self._drop(entry)
+            return
+        if superseded is not None:
+            # Failed entries too, so a restart never replays them over the newer contents
+            self._drop(self._entries.pop(superseded))
+        self._entries[entry.seq] = entry
+        self._latest[entry.tiledb_uri] = entry.seq
+
+    def _drop(self, entry):
+        try:
+            os.remove(entry.file_path)
+        except FileNotFoundError:
+            pass
+
+    def _fsync_directory(self):
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def append(self, tiledb_uri, data, meta):
+        """
+        Durably journal a write, it is replayed to TileDB in the background
+        :param tiledb_uri: array to write
+        :param data: bytes to write
+        :param meta: metadata to write
+        :return: JournalEntry
+        """
+        with self._cond:
+            self._seq += 1
+            seq = self._seq
+
+        created = time.time()
+        header = dict(tiledb_uri=tiledb_uri, meta=meta, created=created)
+        file_path = os.path.join(self.directory, "{:020d}{}".format(seq, ENTRY_SUFFIX))
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8"))
+            f.write(b"\n")
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_path, file_path)
+        self._fsync_directory()
+
+        entry = JournalEntry(seq, tiledb_uri, meta, created, file_path)
+        with self._cond:
+            self._add(entry)
+            self._cond.notify_all()
+        return entry
+
+    def latest(self, tiledb_uri):
+        """
+        The newest journaled contents of an array which are not in TileDB yet
+        :param tiledb_uri: array
+        :return: tuple of bytes and metadata, or None
+        """
+        with self._cond:
+            seq = self._latest.get(tiledb_uri)
+            entry = self._entries.get(seq) if seq is not None else None
+        if entry is None:
+            return None
+
+        try:
+            return entry.read(), entry.meta
+        except FileNotFoundError:
+            pass
+        with self._cond:
+            if self._entries.get(seq) is not entry:
+                # Replayed in the meantime
+                return None
+            # Moved to the failed directory in the meantime
+            return entry.read(), entry.meta
+
+    def latest_meta(self, tiledb_uri):
+        """
+        The metadata of the newest journaled save of an array, without reading its contents
+        :param tiledb_uri: array
+        :return: metadata dict or None
+        """
+        with self._cond:
+            seq = self._latest.get(tiledb_uri)
+            entry = self._entries.get(seq) if seq is not None else None
+        return entry.meta if entry is not None else None
+
+    def discard(self, tiledb_uri):
+        """
+        Drop the pending entries of an array, for example when it is deleted
+        :param tiledb_uri: array
+        :return:
+        """
+        with self._cond:
+            seq = self._latest.pop(tiledb_uri, None)
+            if seq is not None:
+                self._drop(self._entries.pop(seq))
+
+    def wait(self, tiledb_uri, timeout=None):
+        """
+        Wait until the pending entries of an array are replayed, for example before it is renamed
+        :param tiledb_uri: array
+        :param timeout: seconds to wait at most
+        :return: True if nothing is pending anymore
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: tiledb_uri not in self._latest, timeout=timeout
+            )
+
+    def _next_entry(self):
+        """
+        Wait for the oldest entry which is due to be replayed
+        :return: JournalEntry
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                due = [
+                    entry
+                    for entry in self._entries.values()
+                    if entry.next_attempt <= now
+                ]
+                if due:
+                    return min(due, key=lambda entry: entry.seq)
+                timeout = None
+                if self._entries:
+                    timeout = (
+                        min(entry.next_attempt for entry in self._entries.values())
+                        - now
+                    )
+                self._cond.wait(timeout)
+
+    def _replay_entries(self):
+        while True:
+            entry = self._next_entry()
+
+            done = True
+            try:
+                self.replay(entry.tiledb_uri, entry.read(), entry.meta)
+            except FileNotFoundError:
+                # Discarded or superseded while it was being replayed
+                pass
+            except Exception as e:
+                entry.attempts += 1
+                self.log.warning(
+                    "Replaying journaled save of %s failed (attempt %d/%d): %s",
+                    entry.tiledb_uri,
+                    entry.attempts,
+                    self.max_attempts,
+                    e,
+                )
+                if entry.attempts >= self.max_attempts and not entry.failed:
+                    self._fail(entry)
+                delay = min(
+                    self.retry_delay * 2 ** (entry.attempts - 1), self.max_delay
+                )
+                entry.next_attempt = time.monotonic() + delay
+                done = False
+
+            with self._cond:
+                if done and self._entries.get(entry.seq) is entry:
+                    del self._entries[entry.seq]
+                    if self._latest.get(entry.tiledb_uri) == entry.seq:
+                        del self._latest[entry.tiledb_uri]
+                    self._drop(entry)
+                self._cond.notify_all()
+
+    def _fail(self, entry):
+        """
+        Move an entry which could not be replayed to the failed directory, so it can be recovered by hand. It is
+        still served and retried every max_delay
+        """
+        self.log.error(
+            "Journaled save of %s failed %d times, kept in %s and retried every %s seconds",
+            entry.tiledb_uri,
+            entry.attempts,
+            os.path.join(self.directory, FAILED_DIR),
+            self.max_delay,
+        )
+        failed_path = os.path.join(
+            self.directory, FAILED_DIR, os.path.basename(entry.file_path)
+        )
+        with self._cond:
+            try:
+                os.rename(entry.file_path, failed_path)
+            except FileNotFoundError:
+                # Discarded in the meantime
+                return
+            entry.file_path = failed_path
+            entry.failed = True
+
+    def metrics(self):
+        """
+        Counters of the journal
+        :return: dict with the number of pending entries and of failed ones among them
+        """
+        with self._cond:
+            return {
+                "pending": len(self._entries),
+                "failed": sum(1 for entry in self._entries.values() if entry.failed),
+            }
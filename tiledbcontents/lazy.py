@@ -0,0 +1,53 @@
+"""
+    Lazily imported modules
+
+    TileDB, TileDB Cloud and numpy are only needed once a cloud path is accessed, so they are loaded on first
+    use instead of when the notebook server imports the contents manager.
+"""
+
+import importlib
+
+# Modules which must only be loaded on the first cloud operation or by test suites, checked by
+# benchmarks/import_time.py and tests/test_imports.py
+LAZY_MODULES = (
+    "tiledb",
+    "numpy",
+    "notebook.services.contents.tests.test_manager",
+    "notebook.services.contents.tests.test_contents_api",
+    "notebook.tests.launchnotebook",
+)
+
+
+class LazyModule:
+    """
+    Proxy for a module which is imported the first time one of its attributes is accessed
+    """
+
+    def __init__(self, name, submodules=()):
+        """
+        :param name: name of the module to import
+        :param submodules: submodules which must be imported along with the module
+        """
+        self._name = name
+        self._submodules = submodules
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            module = importlib.import_module(self._name)
+            for submodule in self._submodules:
+                importlib.import_module("{}.{}".format(self._name, submodule))
+            self._module = module
+
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return "<lazy module '{}' ({})>".format(self._name, state)
+
+
+tiledb = LazyModule("tiledb", submodules=("cloud",))
+numpy = LazyModule("numpy")
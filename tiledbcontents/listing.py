@@ -0,0 +1,235 @@
+"""
+    Compact records of cloud directory listings, materialized as contents API models only when they are served
+"""
+
+import json
+
+from .paths import NOTEBOOK_EXT
+
+# Algorithm of the content hash stored in array metadata, named like the hash_algorithm of Jupyter models
+HASH_ALGORITHM = "sha256"
+
+# Array metadata surfaced in directory listings
+LISTING_META_KEYS = ("file_size", "content_hash", "kernel_name", "nbformat")
+
+# Listing metadata holding integers, TileDB Cloud returns the metadata of listed arrays as strings
+INTEGER_META_KEYS = ("file_size", "nbformat")
+
+# Entries encoded per chunk when a listing is streamed
+STREAM_BATCH_SIZE = 1000
+
+
+def python_meta(meta):
+    """
+    Convert the numpy scalars of metadata read from TileDB to Python values, so the metadata can be encoded as JSON
+    :param meta: array metadata
+    :return: metadata dict
+    """
+    return {
+        key: value.item() if hasattr(value, "item") else value
+        for key, value in meta.items()
+    }
+
+
+def add_listing_meta(model, meta):
+    """
+    Add the size, content hash, kernel name and nbformat version stored in array metadata to a model
+    :param model: model of a notebook or file
+    :param meta: array metadata
+    :return: model
+    """
+    # Metadata read from TileDB holds numpy integers, which the JSON encoder does not accept
+    if "file_size" in meta:
+        model["size"] = int(meta["file_size"])
+    if "content_hash" in meta:
+        model["hash"] = meta["content_hash"]
+        model["hash_algorithm"] = HASH_ALGORITHM
+    if "kernel_name" in meta:
+        model["kernel_name"] = meta["kernel_name"]
+    if "nbformat" in meta:
+        model["nbformat"] = int(meta["nbformat"])
+    return model
+
+
+def listing_meta_from_info(metadata):
+    """
+    Read the listing metadata of an array from the stringified array metadata returned by TileDB Cloud listings
+    made with with_metadata
+    :param metadata: list of entries with a key and a string value, or None
+    :return: listing metadata dict, or None if the array has none
+    """
+    meta = {}
+    for entry in metadata or ():
+        if isinstance(entry, dict):
+            key, value = entry.get("key"), entry.get("value")
+        else:
+            key, value = entry.key, entry.value
+        if key not in LISTING_META_KEYS or value is None:
+            continue
+        if key in INTEGER_META_KEYS:
+            try:
+                value = int(float(value))
+            except ValueError:
+                continue
+        meta[key] = value
+    return meta or None
+
+
+def dump_listing(listing):
+    """
+    :param listing: directory model or DirectoryListing
+    :return: JSON serializable value, namespace listings are stored as columns rather than one dict per entry
+    """
+    if isinstance(listing, DirectoryListing):
+        return {"listing": listing.to_cache()}
+    return listing
+
+
+def load_listing(value, created):
+    """
+    :param value: value returned by dump_listing
+    :param created: creation date of the entry models of namespace listings
+    :return: directory model or DirectoryListing
+    """
+    if "listing" in value:
+        return DirectoryListing.from_cache(value["listing"], created)
+    return value
+
+
+class ListingEntry:
+    """
+    A notebook of a namespace listing
+    """
+
+    __slots__ = ("name", "last_modified", "meta")
+
+    def __init__(self, name, last_modified, meta=None):
+        """
+        :param name: array name
+        :param last_modified: last access time of the array
+        :param meta: listing metadata of the array (see LISTING_META_KEYS), or None
+        """
+        self.name = name
+        self.last_modified = last_modified
+        self.meta = meta
+
+
+class DirectoryListing:
+    """
+    A namespace listing: the directory model without its content and one compact entry per notebook
+    """
+
+    __slots__ = ("model", "entries", "created")
+
+    def __init__(self, model, entries, created):
+        """
+        :param model: directory model, its content is built from the entries
+        :param entries: list of ListingEntry
+        :param created: creation date of the entry models
+        """
+        self.model = model
+        self.entries = entries
+        self.created = created
+
+    def entry_model(self, entry):
+        """
+        Build the contents API model of an entry
+        :param entry: ListingEntry
+        :return: notebook model
+        """
+        model = {
+            "name": entry.name,
+            # Add notebook extension to path, so jupyterlab will open with as a notebook
+            "path": "{}/{}{}".format(self.model["path"], entry.name, NOTEBOOK_EXT),
+            "writable": True,
+            "last_modified": entry.last_modified,
+            "created": self.created,
+            "content": None,
+            "format": None,
+            "mimetype": None,
+            "type": "notebook",
+        }
+        if entry.meta is not None:
+            add_listing_meta(model, entry.meta)
+        return model
+
+    def to_model(self):
+        """
+        :return: the directory model with its content
+        """
+        model = dict(self.model)
+        model["format"] = "json"
+        model["content"] = [self.entry_model(entry) for entry in self.entries]
+        return model
+
+    def iter_json(self, default=None, batch_size=STREAM_BATCH_SIZE):
+        """
+        Encode the directory model as JSON in chunks, only batch_size entry models exist at a time
+        :param default: function encoding values json can not, e.g. datetimes
+        :param batch_size: entries per chunk
+        :return: iterator of str
+        """
+        model = dict(self.model)
+        model["format"] = "json"
+        # The content must be the last key, its list is written after the rest of the model
+        model.pop("content", None)
+        model["content"] = []
+        head = json.dumps(model, default=default)
+        yield head[: -len("[]}")] + "["
+
+        for start in range(0, len(self.entries), batch_size):
+            batch = [
+                self.entry_model(entry)
+                for entry in self.entries[start : start + batch_size]
+            ]
+            # Drop the brackets of the batch list, the entries join the content list
+            chunk = json.dumps(batch, default=default)[1:-1]
+            yield chunk if start == 0 else ", " + chunk
+
+        yield "]}"
+
+    def to_cache(self):
+        """
+        :return: JSON serializable columns of the listing
+        """
+        return {
+            "model": self.model,
+            "names": [entry.name for entry in self.entries],
+            "last_modified": [entry.last_modified for entry in self.entries],
+            "meta": [entry.meta for entry in self.entries],
+        }
+
+    @classmethod
+    def from_cache(cls, value, created):
+        """
+        :param value: columns returned by to_cache
+        :param created: creation date of the entry models
+        :return: DirectoryListing
+        """
+        entries = [
+            ListingEntry(name, last_modified, meta)
+            for name, last_modified, meta in zip(
+                value["names"], value["last_modified"], value["meta"]
+            )
+        ]
+        return cls(value["model"], entries, created)
+
+
+class CachedListing:
+    """
+    A directory listing kept in memory to be served while it is refreshed in the background
+    """
+
+    __slots__ = ("listing", "list_directory", "fetched", "requested", "refreshing")
+
+    def __init__(self, listing, list_directory, fetched):
+        """
+        :param listing: directory model or DirectoryListing
+        :param list_directory: function listing the directory again
+        :param fetched: monotonic time the listing was fetched at
+        """
+        self.listing = listing
+        self.list_directory = list_directory
+        self.fetched = fetched
+        self.requested = fetched
+        self.refreshing = False
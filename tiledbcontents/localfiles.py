@@ -0,0 +1,148 @@
+"""
+    Copies of local files sharing their data where the filesystem allows it, for checkpoints of local notebooks
+"""
+
+import contextlib
+import errno
+import io
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl cloning a whole file, from linux/fs.h. Supported by btrfs, xfs with reflink, overlayfs over them and others
+FICLONE = 0x40049409
+
+REFLINK = "reflink"
+HARDLINK = "hardlink"
+COPY = "copy"
+
+# Errors of filesystems or devices which can not share data between files
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.EPERM,
+    getattr(errno, "EOPNOTSUPP", errno.EINVAL),
+    getattr(errno, "ENOTSUP", errno.EINVAL),
+    getattr(errno, "ENOSYS", errno.EINVAL),
+}
+
+
+def _intermediate_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, ".~" + name + ".tmp")
+
+
+def _reflink(src, dst):
+    """
+    :return: True if dst was created as a reflink of src
+    """
+    if fcntl is None:
+        return False
+    with open(src, "rb") as source, open(dst, "wb") as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            return True
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            return False
+
+
+def _hardlink(src, dst):
+    """
+    :return: True if dst was created as a hardlink of src
+    """
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+        return True
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED_ERRNOS:
+            raise
+        return False
+
+
+def clone_file(src, dst, hardlink=False):
+    """
+    Copy a file, atomically replacing dst. The copy is a reflink sharing the data of src until either file is
+    changed when the filesystem supports it, else a hardlink if allowed, else a streamed copy of the bytes.
+
+    A hardlink shares the file itself, so it must only be used when neither file is ever written in place, see
+    replacing_writing.
+    :param src: path of the file
+    :param dst: path of the copy
+    :param hardlink: allow a hardlink
+    :return: how the file was copied, REFLINK, HARDLINK or COPY
+    """
+    # Renaming a hardlink over another link of the same file does nothing, the copy is already there
+    if hardlink and os.path.exists(dst) and os.path.samefile(src, dst):
+        return HARDLINK
+
+    intermediate = _intermediate_path(dst)
+    try:
+        if _reflink(src, intermediate):
+            method = REFLINK
+        elif hardlink and _hardlink(src, intermediate):
+            method = HARDLINK
+        else:
+            shutil.copyfile(src, intermediate)
+            method = COPY
+
+        if method != HARDLINK:
+            # Like copy2_safe of the notebook server, a copy is still valid without the times or mode
+            with contextlib.suppress(OSError):
+                shutil.copystat(src, intermediate)
+        os.replace(intermediate, dst)
+        return method
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(intermediate)
+        raise
+
+
+def is_linked(path):
+    """
+    :param path: local file path
+    :return: True if the file has other hardlinks, e.g. a checkpoint
+    """
+    try:
+        return os.stat(path).st_nlink > 1
+    except FileNotFoundError:
+        return False
+
+
+@contextlib.contextmanager
+def replacing_writing(path, text=True, encoding="utf-8", **kwargs):
+    """
+    Write a file by writing a new file and renaming it over path, so other hardlinks of path keep the old contents
+    :param path: local file path
+    :param text: open in text mode
+    :param encoding: encoding of text mode
+    :param kwargs: passed to io.open
+    :return: context manager yielding the file object
+    """
+    intermediate = _intermediate_path(path)
+    if text:
+        kwargs.setdefault("newline", "\n")
+        fileobj = io.open(intermediate, "w", encoding=encoding, **kwargs)
+    else:
+        fileobj = io.open(intermediate, "wb", **kwargs)
+
+    try:
+        with fileobj:
+            yield fileobj
+            fileobj.flush()
+            os.fsync(fileobj.fileno())
+        with contextlib.suppress(OSError):
+            shutil.copymode(path, intermediate)
+        os.replace(intermediate, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(intermediate)
+        raise
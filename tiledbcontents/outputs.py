@@ -0,0 +1,201 @@
+"""
+    Content-addressed storage of large cell outputs, so identical outputs are stored once per namespace
+"""
+
+import collections
+import hashlib
+import json
+import threading
+
+# Output payloads are stored in an array of each namespace, under this name. It is not tagged as a notebook, so it
+# is not listed
+OUTPUT_STORE_NAME = "__jupyter-outputs"
+
+# Key of the reference which replaces an output in the stored notebook
+OUTPUT_REF = "tiledb_output_ref"
+
+PAYLOAD_HASH_ALGORITHM = "sha256"
+
+# Payloads remembered as written to an output store, the least recently used are forgotten and checked again
+MAX_STORED_PAYLOADS = 65536
+
+# Shown instead of an output whose store the reader can not read
+UNAVAILABLE_OUTPUT = (
+    "This output is stored in {}, which is not shared with you. It is shown once the owner of the notebook opens "
+    "or saves it again."
+)
+
+
+def _output_data(notebook):
+    """
+    :param notebook: notebook dict
+    :return: generator of the data dicts of the outputs of code cells
+    """
+    for cell in notebook.get("cells", []):
+        for output in cell.get("outputs") or []:
+            data = output.get("data")
+            if isinstance(data, dict):
+                yield data
+
+
+def _ref(value):
+    if isinstance(value, dict) and len(value) == 1 and OUTPUT_REF in value:
+        return value[OUTPUT_REF]
+    return None
+
+
+def extract_outputs(notebook, min_size, store_uri):
+    """
+    Replace the output values of at least min_size bytes by references to their payload in the output store. The
+    cells holding them are copied, the notebook passed in is left unchanged
+    :param notebook: notebook dict
+    :param min_size: smallest JSON encoded output value in bytes which is extracted
+    :param store_uri: tiledb:// URI of the output store the payloads are written to
+    :return: tuple of the notebook dict to store and a dict of payload hash to payload bytes
+    """
+    payloads = {}
+    cells = []
+    for cell in notebook.get("cells", []):
+        outputs = cell.get("outputs") or []
+        new_outputs = []
+        for output in outputs:
+            data = output.get("data")
+            if isinstance(data, dict):
+                new_data = {}
+                for mimetype, value in data.items():
+                    payload = json.dumps(value).encode("utf-8")
+                    if len(payload) < min_size:
+                        new_data[mimetype] = value
+                        continue
+                    digest = hashlib.new(PAYLOAD_HASH_ALGORITHM, payload).hexdigest()
+                    payloads[digest] = payload
+                    new_data[mimetype] = {
+                        OUTPUT_REF: {
+                            "store": store_uri,
+                            "hash": digest,
+                            "size": len(payload),
+                        }
+                    }
+                output = dict(output, data=new_data)
+            new_outputs.append(output)
+        if outputs:
+            cell = dict(cell, outputs=new_outputs)
+        cells.append(cell)
+
+    if not payloads:
+        return notebook, payloads
+    return dict(notebook, cells=cells), payloads
+
+
+def output_refs(notebook):
+    """
+    :param notebook: stored notebook dict
+    :return: dict of output store URI to the set of payload hashes referenced from it
+    """
+    refs = collections.defaultdict(set)
+    for data in _output_data(notebook):
+        for value in data.values():
+            ref = _ref(value)
+            if ref is not None:
+                refs[ref["store"]].add(ref["hash"])
+    return refs
+
+
+def resolve_outputs(notebook, payloads, unreadable=()):
+    """
+    Replace the references of a stored notebook by their outputs, in place
+    :param notebook: stored notebook dict
+    :param payloads: dict of payload hash to payload bytes, holding every referenced payload of readable stores
+    :param unreadable: output stores the reader can not read, the outputs referencing them are replaced by a note
+    :return: the notebook dict
+    """
+    for data in _output_data(notebook):
+        refs = [(mimetype, _ref(value)) for mimetype, value in data.items()]
+        stores = [ref["store"] for _, ref in refs if ref is not None]
+        unavailable = [store for store in stores if store in unreadable]
+        if unavailable:
+            # The other representations of the output could not be shown alone, e.g. an image without its text
+            data.clear()
+            data["text/plain"] = UNAVAILABLE_OUTPUT.format(unavailable[0])
+            continue
+        for mimetype, ref in refs:
+            if ref is not None:
+                data[mimetype] = json.loads(payloads[ref["hash"]])
+    return notebook
+
+
+class OutputCache:
+    """
+    Payloads known to be in the output stores, bounded by their number, and the least recently used of them kept
+    in memory, bounded by their total size
+    """
+
+    def __init__(self, max_bytes, max_stored=MAX_STORED_PAYLOADS):
+        """
+        :param max_bytes: total size of the payloads kept in memory, 0 to keep none
+        :param max_stored: payloads remembered as stored, forgotten ones are checked in the store again
+        """
+        self.max_bytes = max_bytes
+        self.max_stored = max_stored
+        self._payloads = collections.OrderedDict()
+        self._bytes = 0
+        self._stored = collections.OrderedDict()
+        self._stores = set()
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        """
+        :param digest: payload hash
+        :return: payload bytes or None
+        """
+        with self._lock:
+            payload = self._payloads.get(digest)
+            if payload is not None:
+                self._payloads.move_to_end(digest)
+            return payload
+
+    def add(self, store_uri, digest, payload):
+        """
+        Keep a payload read from or written to an output store
+        :param store_uri: tiledb:// URI of the output store
+        :param digest: payload hash
+        :param payload: payload bytes
+        :return:
+        """
+        with self._lock:
+            self._stores.add(store_uri)
+            self._stored[(store_uri, digest)] = None
+            self._stored.move_to_end((store_uri, digest))
+            while len(self._stored) > self.max_stored:
+                self._stored.popitem(last=False)
+            if digest in self._payloads:
+                self._payloads.move_to_end(digest)
+                return
+            if len(payload) > self.max_bytes:
+                return
+            self._payloads[digest] = payload
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._payloads.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stored(self, store_uri, digest):
+        """
+        :return: True if the payload is known to be in the output store
+        """
+        with self._lock:
+            if (store_uri, digest) not in self._stored:
+                return False
+            self._stored.move_to_end((store_uri, digest))
+            return True
+
+    def has_store(self, store_uri):
+        """
+        :return: True if the output store is known to exist
+        """
+        with self._lock:
+            return store_uri in self._stores
+
+    def add_store(self, store_uri):
+        with self._lock:
+            self._stores.add(store_uri)
@@ -0,0 +1,86 @@
+"""
+    Parsing of contents API paths into cloud paths
+"""
+
+import collections
+import functools
+import os
+
+CLOUD_ROOT = "cloud"
+
+CATEGORIES = ("owned", "public", "shared")
+
+NOTEBOOK_EXT = ".ipynb"
+
+PARSE_CACHE_SIZE = 16384
+
+
+class CloudPath(
+    collections.namedtuple(
+        "CloudPath",
+        [
+            "path",
+            "extension",
+            "is_remote",
+            "is_dir",
+            "category",
+            "namespace",
+            "name",
+            "tiledb_uri",
+        ],
+    )
+):
+    """
+    An immutable, parsed contents API path.
+
+    path: the stripped API path, without the notebook extension
+    extension: the notebook extension if the API path had one, otherwise an empty string
+    is_remote: whether the path is under the cloud folder
+    is_dir: whether the path is the cloud folder, a category or a namespace
+    category: owned, public or shared, None for the cloud folder or local paths
+    namespace: namespace of the path, None above the namespace level or for local paths
+    name: array name, None for directories or local paths
+    tiledb_uri: tiledb:// URI built from the last two path parts, None for single part paths
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    @functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+    def parse(path):
+        """
+        Parse an API path, results are memoized so repeated lookups of the same path are free
+        :param path: API path, may contain leading or trailing slashes and the notebook extension
+        :return: CloudPath
+        """
+        path = path.strip("/")
+        # Remoteness and directories are decided on the path as given, so a local cloud.ipynb stays local and
+        # cloud/owned.ipynb is not the owned folder
+        raw_parts = path.replace(os.sep, "/").split("/")
+        extension = ""
+        if path.endswith(NOTEBOOK_EXT):
+            path = path[: -1 * len(NOTEBOOK_EXT)]
+            extension = NOTEBOOK_EXT
+
+        parts = path.replace(os.sep, "/").split("/")
+        length = len(parts)
+
+        is_remote = raw_parts[0] == CLOUD_ROOT
+        is_dir = is_remote and (
+            length == 1 or (length in (2, 3) and raw_parts[1] in CATEGORIES)
+        )
+
+        tiledb_uri = None
+        if length > 1:
+            tiledb_uri = "tiledb://{}/{}".format(parts[length - 2], parts[length - 1])
+
+        return CloudPath(
+            path=path,
+            extension=extension,
+            is_remote=is_remote,
+            is_dir=is_dir,
+            category=parts[1] if is_remote and length > 1 else None,
+            namespace=parts[2] if is_remote and length > 2 else None,
+            name=parts[length - 1] if is_remote and length > 3 else None,
+            tiledb_uri=tiledb_uri,
+        )
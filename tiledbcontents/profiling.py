@@ -0,0 +1,296 @@
+"""
+    Sampled cProfile profiles of contents operations, written as pstats files for flamegraph tools
+"""
+
+import contextlib
+import cProfile
+import datetime
+import functools
+import inspect
+import os
+import pstats
+import random
+import re
+import threading
+import time
+
+PROFILE_EXT = ".pstats"
+
+# Characters of a path kept in profile file names
+_UNSAFE_CHARACTERS = re.compile(r"[^A-Za-z0-9._-]+")
+
+_local = threading.local()
+
+
+class ProfileSession:
+    """
+    The profiles of one sampled operation: its own thread and the worker threads making its remote calls
+    """
+
+    __slots__ = ("thread_profiles", "lock", "closed")
+
+    def __init__(self):
+        self.thread_profiles = []
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def add(self, profile):
+        with self.lock:
+            if not self.closed:
+                self.thread_profiles.append(profile)
+
+
+def current_session():
+    """
+    :return: ProfileSession of the operation the current thread is running, or None
+    """
+    return getattr(_local, "session", None)
+
+
+@contextlib.contextmanager
+def profile_thread(session):
+    """
+    Profile work done by a worker thread on behalf of a sampled operation, e.g. a TileDB Cloud call
+    :param session: ProfileSession returned by current_session in the calling thread, or None
+    :return: context manager
+    """
+    # The thread of the operation is already profiled, a second profiler would replace its own
+    if session is None or session.closed or current_session() is session:
+        yield
+        return
+
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12 and later only allow one active profiler, the one of the operation. The worker is then left
+        # out of the profile rather than failing the call
+        profile = None
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.disable()
+            session.add(profile)
+
+
+def profiled(operation, path_arg="path"):
+    """
+    Decorate a contents manager method so its calls can be sampled by the manager's _profiler
+    :param operation: operation name used to filter and name the profiles
+    :param path_arg: name of the method argument holding the path
+    :return: decorator
+    """
+
+    def decorator(method):
+        position = list(inspect.signature(method).parameters).index(path_arg) - 1
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self._profiler
+            if profiler is None or not profiler.enabled:
+                return method(self, *args, **kwargs)
+
+            path = args[position] if len(args) > position else kwargs.get(path_arg)
+            with profiler.profile(operation, path or ""):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class OperationProfiler:
+    """
+    Profiles a fraction of contents operations with cProfile, optionally only some operations or paths under a
+    prefix. Work done on other threads for an operation is included when they run it in profile_thread.
+
+    Only one operation is profiled at a time and the number of profile files is bounded, so the overhead stays
+    bounded with any sample rate. Operations started while another one is profiled are not sampled.
+    """
+
+    def __init__(
+        self,
+        directory,
+        sample_rate=0.0,
+        operations=None,
+        path_prefix="",
+        max_files=200,
+        log=None,
+    ):
+        """
+        :param directory: local directory the profiles are written to
+        :param sample_rate: fraction of operations profiled, 0 disables profiling
+        :param operations: operation names profiled, all when empty
+        :param path_prefix: only profile operations on paths under this prefix
+        :param max_files: profiles kept in the directory, the oldest are removed
+        :param log: logger
+        """
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+        self._counters = {"profiled": 0, "skipped_busy": 0, "write_errors": 0}
+        self.log = log
+        self.configure(
+            directory=directory,
+            sample_rate=sample_rate,
+            operations=operations or (),
+            path_prefix=path_prefix,
+            max_files=max_files,
+        )
+
+    def configure(
+        self,
+        directory=None,
+        sample_rate=None,
+        operations=None,
+        path_prefix=None,
+        max_files=None,
+    ):
+        """
+        Change the settings, those left to None are kept
+        :raises ValueError: if a setting is invalid
+        """
+        if sample_rate is not None and not 0.0 <= float(sample_rate) <= 1.0:
+            raise ValueError("The sample rate must be between 0 and 1")
+        if max_files is not None and int(max_files) < 1:
+            raise ValueError("At least one profile file must be kept")
+
+        with self._lock:
+            if directory is not None:
+                self.directory = directory
+            if sample_rate is not None:
+                self.sample_rate = float(sample_rate)
+            if operations is not None:
+                self.operations = frozenset(operations)
+            if path_prefix is not None:
+                self.path_prefix = path_prefix.strip("/")
+            if max_files is not None:
+                self.max_files = int(max_files)
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0.0
+
+    def settings(self):
+        """
+        :return: dict of the settings and counters
+        """
+        with self._lock:
+            return dict(
+                self._counters,
+                directory=self.directory,
+                sample_rate=self.sample_rate,
+                operations=sorted(self.operations),
+                path_prefix=self.path_prefix,
+                max_files=self.max_files,
+            )
+
+    def _sampled(self, operation, path):
+        if self.operations and operation not in self.operations:
+            return False
+        if self.path_prefix:
+            path = path.strip("/")
+            if path != self.path_prefix and not path.startswith(self.path_prefix + "/"):
+                return False
+        return random.random() < self.sample_rate
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    @contextlib.contextmanager
+    def profile(self, operation, path):
+        """
+        Profile an operation if it is sampled
+        :param operation: operation name
+        :param path: path the operation is made on
+        :return: context manager
+        """
+        # Operations made by a profiled operation, e.g. the get of a save, are part of its profile
+        if current_session() is not None or not self._sampled(operation, path):
+            yield
+            return
+        if not self._active.acquire(blocking=False):
+            self._count("skipped_busy")
+            yield
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            profile = None
+        if profile is None:
+            # Another profiler or debugger is active, profiling must never fail the operation
+            self._active.release()
+            self._count("skipped_busy")
+            yield
+            return
+
+        session = ProfileSession()
+        _local.session = session
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            _local.session = None
+            with session.lock:
+                session.closed = True
+            try:
+                self._write(operation, path, elapsed, profile, session.thread_profiles)
+            finally:
+                self._active.release()
+
+    def _write(self, operation, path, elapsed, profile, thread_profiles):
+        """
+        Write the merged profiles of an operation, then remove the oldest files over max_files
+        """
+        name = "{:%Y%m%dT%H%M%S%f}-{}-{}ms-{}{}".format(
+            datetime.datetime.now(),
+            operation,
+            int(elapsed * 1000),
+            _UNSAFE_CHARACTERS.sub("_", path.strip("/"))[:80] or "root",
+            PROFILE_EXT,
+        )
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stats = pstats.Stats(profile)
+            for thread_profile in thread_profiles:
+                stats.add(thread_profile)
+            target = os.path.join(self.directory, name)
+            stats.dump_stats(target + ".tmp")
+            os.replace(target + ".tmp", target)
+            self._count("profiled")
+            self._prune()
+        except Exception as e:
+            # Profiling must never fail the operation
+            self._count("write_errors")
+            if self.log is not None:
+                self.log.warning("Error writing profile %s: %s", name, e)
+
+    def _prune(self):
+        profiles = sorted(
+            entry.path
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(PROFILE_EXT)
+        )
+        # File names start with the time they were written, so they sort oldest first
+        for path in profiles[: max(0, len(profiles) - self.max_files)]:
+            os.remove(path)
+
+    def profiles(self, limit=50):
+        """
+        :param limit: maximum number of profiles returned
+        :return: names of the newest profile files, newest first
+        """
+        try:
+            names = [
+                name
+                for name in os.listdir(self.directory)
+                if name.endswith(PROFILE_EXT)
+            ]
+        except FileNotFoundError:
+            return []
+        return sorted(names, reverse=True)[:limit]
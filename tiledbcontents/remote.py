@@ -0,0 +1,242 @@
+"""
+    Deadline bounded, hedged and coalesced TileDB Cloud calls
+"""
+
+import collections
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .profiling import current_session, profile_thread
+from .scheduler import PRIORITIES, current_priority
+
+# Latencies kept per operation kind to compute the hedging percentile
+LATENCY_WINDOW = 200
+
+# Hedging only starts once enough latencies of an operation kind are known
+MIN_HEDGE_SAMPLES = 20
+
+
+class DeadlineExceeded(Exception):
+    """
+    A remote call did not finish before its deadline
+    """
+
+    def __init__(self, kind, deadline):
+        super().__init__(
+            "TileDB Cloud {} call did not finish within {}s".format(kind, deadline)
+        )
+        self.kind = kind
+        self.deadline = deadline
+
+
+class _Flight:
+    """
+    A call in flight, shared by the callers asking for the same resource
+    """
+
+    __slots__ = ("args", "done", "result", "error")
+
+    def __init__(self, args):
+        self.args = args
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RemoteCalls:
+    """
+    Runs remote calls with a per operation kind deadline and optional hedging: when the first attempt takes longer
+    than a percentile of the recent latencies of its kind, a second attempt is started and whichever finishes first
+    is used. Only idempotent reads should be hedged.
+
+    Identical concurrent calls are coalesced: a caller asking for a resource which is already being fetched waits
+    for that call and shares its result or error. Callers only join calls of their own or a more urgent priority
+    class, so an interactive caller never waits for a call queued behind listings and background work. After a write, detach the calls reading the written resource so
+    later callers do not share a result fetched before the write.
+
+    Python threads can not be cancelled, so a call which missed its deadline keeps its worker thread until it
+    returns; the caller gets an error right away.
+
+    With a scheduler, every attempt waits for its admission with the priority class of the calling thread, the
+    deadline includes that wait. Attempts made on worker threads for a profiled operation are added to its profile.
+    """
+
+    def __init__(
+        self, deadlines=None, hedge_percentiles=None, max_workers=32, scheduler=None
+    ):
+        """
+        :param deadlines: dict of operation kind to deadline in seconds, kinds without one are not bounded
+        :param hedge_percentiles: dict of operation kind to latency percentile after which a hedge is started
+        :param max_workers: threads available to run remote calls
+        :param scheduler: CallScheduler admitting the calls, or None
+        """
+        self.deadlines = dict(deadlines or {})
+        self.hedge_percentiles = dict(hedge_percentiles or {})
+        self.scheduler = scheduler
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tiledbcontents-remote"
+        )
+        self._lock = threading.Lock()
+        self._latencies = collections.defaultdict(
+            lambda: collections.deque(maxlen=LATENCY_WINDOW)
+        )
+        self._counters = collections.defaultdict(collections.Counter)
+        self._flights = {}
+
+    def _count(self, kind, counter, value=1):
+        with self._lock:
+            self._counters[kind][counter] += value
+
+    def _record(self, kind, seconds):
+        with self._lock:
+            self._latencies[kind].append(seconds)
+
+    def hedge_delay(self, kind):
+        """
+        :param kind: operation kind
+        :return: seconds after which a hedge is started, None if the kind is not hedged
+        """
+        percentile = self.hedge_percentiles.get(kind)
+        if percentile is None:
+            return None
+
+        with self._lock:
+            latencies = sorted(self._latencies[kind])
+        if len(latencies) < MIN_HEDGE_SAMPLES:
+            return None
+
+        index = min(len(latencies) - 1, int(len(latencies) * percentile / 100.0))
+        return latencies[index]
+
+    def call(self, kind, func, *args, **kwargs):
+        """
+        Run a remote call, or wait for an identical one which is in flight
+        :param kind: operation kind, selects the deadline and hedging settings
+        :param func: function making the remote call
+        :return: result of func
+        :raises DeadlineExceeded: if no attempt finished before the deadline
+        """
+        name = current_priority()
+        call_key = (kind, func, repr(args), repr(sorted(kwargs.items())))
+        key = call_key + (name,)
+        with self._lock:
+            flight = None
+            for joined in PRIORITIES[: PRIORITIES.index(name) + 1]:
+                flight = self._flights.get(call_key + (joined,))
+                if flight is not None:
+                    break
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(args + tuple(kwargs.values()))
+            else:
+                self._counters[kind]["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._call(
+                kind, name, current_session(), func, args, kwargs
+            )
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def detach(self, kind=None, arg=None):
+        """
+        Stop sharing calls in flight with new callers, for example after a write of the resource they read. Callers
+        already waiting still get their result
+        :param kind: only detach calls of this operation kind
+        :param arg: only detach calls made with this argument, e.g. the URI of a written array
+        :return:
+        """
+        with self._lock:
+            for key, flight in list(self._flights.items()):
+                if (kind is None or key[0] == kind) and (
+                    arg is None or arg in flight.args
+                ):
+                    del self._flights[key]
+
+    def _attempt(self, name, session, func, args, kwargs):
+        """
+        Make one attempt of a remote call once the scheduler admits it
+        :param name: priority class
+        :param session: ProfileSession of the caller, or None
+        """
+        with profile_thread(session):
+            if self.scheduler is None:
+                return func(*args, **kwargs)
+            with self.scheduler.admit(name):
+                return func(*args, **kwargs)
+
+    def _call(self, kind, name, session, func, args, kwargs):
+        """
+        Run a remote call with the deadline and hedging settings of its kind
+        :param name: priority class of the caller
+        :param session: ProfileSession of the caller, or None
+        """
+        deadline = self.deadlines.get(kind) or None
+        hedge_delay = self.hedge_delay(kind)
+        self._count(kind, "calls")
+
+        start = time.monotonic()
+        if deadline is None and hedge_delay is None:
+            try:
+                return self._attempt(name, session, func, args, kwargs)
+            finally:
+                self._record(kind, time.monotonic() - start)
+
+        first = self._executor.submit(self._attempt, name, session, func, args, kwargs)
+        attempts = [first]
+        if hedge_delay is not None and (deadline is None or hedge_delay < deadline):
+            done, _ = wait(attempts, timeout=hedge_delay)
+            if not done:
+                attempts.append(
+                    self._executor.submit(
+                        self._attempt, name, session, func, args, kwargs
+                    )
+                )
+                self._count(kind, "hedges_fired")
+
+        timeout = None
+        if deadline is not None:
+            timeout = max(0.0, deadline - (time.monotonic() - start))
+        done, _ = wait(attempts, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            self._count(kind, "deadlines_exceeded")
+            raise DeadlineExceeded(kind, deadline)
+
+        winner = done.pop()
+        if winner is not first:
+            self._count(kind, "hedges_won")
+        self._record(kind, time.monotonic() - start)
+        return winner.result()
+
+    def metrics(self):
+        """
+        :return: dict of operation kind to counters and latency percentiles in seconds
+        """
+        with self._lock:
+            kinds = set(self._counters) | set(self._latencies)
+            metrics = {}
+            for kind in kinds:
+                latencies = sorted(self._latencies[kind])
+                kind_metrics = dict(self._counters[kind])
+                for percentile in (50, 95, 99):
+                    if latencies:
+                        index = min(
+                            len(latencies) - 1, int(len(latencies) * percentile / 100.0)
+                        )
+                        kind_metrics["p{}".format(percentile)] = latencies[index]
+                metrics[kind] = kind_metrics
+            return metrics
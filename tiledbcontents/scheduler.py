@@ -0,0 +1,168 @@
+"""
+    Admission control of TileDB Cloud calls by priority class, with a concurrency limit and a token bucket
+"""
+
+import collections
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+
+# Priority classes, most urgent first
+INTERACTIVE = "interactive"
+LISTING = "listing"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, LISTING, BACKGROUND)
+
+# Concurrency slots only interactive calls can use, so saves and opens never wait for a full set of slots held by
+# listings or background work
+INTERACTIVE_RESERVED_SLOTS = 1
+
+_local = threading.local()
+
+
+def current_priority():
+    """
+    :return: priority class of the calls made by the current thread
+    """
+    return getattr(_local, "priority", INTERACTIVE)
+
+
+@contextlib.contextmanager
+def priority(name):
+    """
+    Set the priority class of the calls made by the current thread
+    :param name: interactive, listing or background
+    :return: context manager
+    """
+    if name not in PRIORITIES:
+        raise ValueError("Unknown priority class: {}".format(name))
+    previous = current_priority()
+    _local.priority = name
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+class TokenBucket:
+    """
+    Token bucket rate limit, not thread safe on its own
+    """
+
+    def __init__(self, rate, burst):
+        """
+        :param rate: tokens added per second
+        :param burst: maximum number of tokens
+        """
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def take(self):
+        """
+        Take a token if one is available
+        :return: 0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return 0.0
+        return (1.0 - self._tokens) / self.rate
+
+
+class CallScheduler:
+    """
+    Admits TileDB Cloud calls in priority order: a call only starts when no call of a higher class, or an earlier
+    call of its class, is waiting, a concurrency slot is free and the token bucket has a token.
+    """
+
+    def __init__(self, max_concurrent=16, rate=0.0, burst=20):
+        """
+        :param max_concurrent: calls running at the same time, 0 for no limit
+        :param rate: calls started per second, 0 for no limit
+        :param burst: calls which can be started at once when the rate limit was not reached for a while
+        """
+        self.max_concurrent = max_concurrent
+        self._bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self._cond = threading.Condition()
+        self._queue = []
+        self._order = itertools.count()
+        self._running = 0
+        self._depth = collections.Counter()
+        self._counters = collections.defaultdict(collections.Counter)
+        self._waited = collections.defaultdict(float)
+
+    def _has_slot(self, rank):
+        if not self.max_concurrent:
+            return True
+        limit = self.max_concurrent
+        if rank > 0 and limit > INTERACTIVE_RESERVED_SLOTS:
+            limit -= INTERACTIVE_RESERVED_SLOTS
+        return self._running < limit
+
+    @contextlib.contextmanager
+    def admit(self, name=None):
+        """
+        Wait for the turn of a call and hold its slot while it runs
+        :param name: priority class, the one of the current thread if None
+        :return: context manager
+        """
+        name = name or current_priority()
+        rank = PRIORITIES.index(name)
+        ticket = (rank, next(self._order))
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            self._depth[name] += 1
+            counters = self._counters[name]
+            counters["max_queued"] = max(counters["max_queued"], self._depth[name])
+            try:
+                while True:
+                    timeout = None
+                    if self._queue[0] == ticket and self._has_slot(rank):
+                        wait = self._bucket.take() if self._bucket is not None else 0.0
+                        if wait == 0.0:
+                            break
+                        counters["rate_limited"] += 1
+                        timeout = wait
+                    self._cond.wait(timeout)
+            except BaseException:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._depth[name] -= 1
+                self._cond.notify_all()
+                raise
+
+            heapq.heappop(self._queue)
+            self._depth[name] -= 1
+            self._running += 1
+            counters["admitted"] += 1
+            self._waited[name] += time.monotonic() - start
+            # The next call in the queue may be able to start too
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+    def metrics(self):
+        """
+        :return: dict with the running calls and, per priority class, the queue depth, maximum queue depth, calls
+            admitted, admissions delayed by the rate limit and total seconds waited
+        """
+        with self._cond:
+            metrics = {"running": self._running}
+            for name in PRIORITIES:
+                class_metrics = dict(self._counters[name])
+                class_metrics["queued"] = self._depth[name]
+                class_metrics["waited"] = self._waited[name]
+                metrics[name] = class_metrics
+            return metrics
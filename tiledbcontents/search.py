@@ -0,0 +1,248 @@
+"""
+    Local full-text search index over cloud notebooks
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+INDEX_FILE = "tiledbcontents-search.sqlite"
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS notebooks (
+        tiledb_uri TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        kernel_name TEXT,
+        indexed_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS notebooks_fts USING fts5(
+        tiledb_uri UNINDEXED,
+        name,
+        source,
+        markdown,
+        kernel_name,
+        tokenize = 'unicode61'
+    )
+    """,
+)
+
+
+def extract_text(nb):
+    """
+    Extract the searchable text of a notebook
+    :param nb: notebook as a dict
+    :return: tuple of code and raw cell sources, markdown sources and kernel name
+    """
+    source = []
+    markdown = []
+    for cell in nb.get("cells", []):
+        text = cell.get("source", "")
+        if isinstance(text, list):
+            text = "".join(text)
+        if cell.get("cell_type") == "markdown":
+            markdown.append(text)
+        else:
+            source.append(text)
+
+    kernelspec = nb.get("metadata", {}).get("kernelspec") or {}
+    return "\n".join(source), "\n".join(markdown), kernelspec.get("name", "")
+
+
+def match_expression(query):
+    """
+    Build an FTS5 match expression where every word of the query must prefix match, user input is quoted so it can
+    not be interpreted as FTS5 syntax
+    :param query: free text query
+    :return: match expression or None if the query is empty
+    """
+    terms = ['"{}"*'.format(term.replace('"', '""')) for term in query.split()]
+    if not terms:
+        return None
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    An incrementally maintained SQLite FTS5 index of notebook cell sources, markdown and kernel names.
+
+    Updates are applied by a single background writer so saves and reads never wait on the index, searches read
+    the index directly from the calling thread.
+    """
+
+    def __init__(self, directory, log=None):
+        """
+        :param directory: directory holding the index database, created if missing
+        :param log: logger for indexing errors
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, INDEX_FILE)
+        self.log = log
+        self._local = threading.local()
+        self._updates = queue.Queue()
+
+        conn = self._connection()
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+
+        self._writer = threading.Thread(
+            target=self._write_updates, name="tiledbcontents-search-index", daemon=True
+        )
+        self._writer.start()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _write_updates(self):
+        while True:
+            func, args = self._updates.get()
+            try:
+                conn = self._connection()
+                with conn:
+                    func(conn, *args)
+            except Exception as e:
+                if self.log is not None:
+                    self.log.warning("Error updating the search index: %s", e)
+            finally:
+                self._updates.task_done()
+
+    def flush(self):
+        """
+        Wait until all submitted updates are applied
+        :return:
+        """
+        self._updates.join()
+
+    def update(self, tiledb_uri, path, nb):
+        """
+        Index a notebook
+        :param tiledb_uri: URI of the notebook array, the index holds one entry per array
+        :param path: cloud path of the notebook, without extension
+        :param nb: notebook as a dict, or its JSON bytes
+        :return:
+        """
+        self._updates.put((self._update, (tiledb_uri, path, nb, time.time())))
+
+    def _update(self, conn, tiledb_uri, path, nb, indexed_at):
+        if isinstance(nb, (bytes, bytearray, memoryview)):
+            nb = json.loads(bytes(nb).decode("utf-8"))
+        source, markdown, kernel_name = extract_text(nb)
+        name = path.rsplit("/", 1)[-1]
+
+        conn.execute("DELETE FROM notebooks_fts WHERE tiledb_uri = ?", (tiledb_uri,))
+        conn.execute(
+            "INSERT INTO notebooks_fts (tiledb_uri, name, source, markdown, kernel_name) VALUES (?, ?, ?, ?, ?)",
+            (tiledb_uri, name, source, markdown, kernel_name),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO notebooks (tiledb_uri, path, kernel_name, indexed_at) VALUES (?, ?, ?, ?)",
+            (tiledb_uri, path, kernel_name, indexed_at),
+        )
+
+    def remove(self, tiledb_uri):
+        """
+        Remove a notebook from the index
+        :param tiledb_uri: URI of the notebook array
+        :return:
+        """
+        self._updates.put((self._remove, (tiledb_uri,)))
+
+    def _remove(self, conn, tiledb_uri):
+        conn.execute("DELETE FROM notebooks_fts WHERE tiledb_uri = ?", (tiledb_uri,))
+        conn.execute("DELETE FROM notebooks WHERE tiledb_uri = ?", (tiledb_uri,))
+
+    def move(self, tiledb_uri, new_tiledb_uri, new_path, keep=False):
+        """
+        Move or copy the entry of a notebook, without reading the notebook again
+        :param tiledb_uri: URI of the indexed array
+        :param new_tiledb_uri: URI of the renamed or copied array
+        :param new_path: cloud path of the renamed or copied notebook, without extension
+        :param keep: keep the original entry, for copies
+        :return:
+        """
+        self._updates.put((self._move, (tiledb_uri, new_tiledb_uri, new_path, keep)))
+
+    def _move(self, conn, tiledb_uri, new_tiledb_uri, new_path, keep):
+        name = new_path.rsplit("/", 1)[-1]
+        if new_tiledb_uri == tiledb_uri:
+            # Same array under another path, e.g. another category
+            conn.execute(
+                "UPDATE notebooks_fts SET name = ? WHERE tiledb_uri = ?",
+                (name, tiledb_uri),
+            )
+            conn.execute(
+                "UPDATE notebooks SET path = ? WHERE tiledb_uri = ?",
+                (new_path, tiledb_uri),
+            )
+            return
+
+        # Full-text rows have no primary key, rows still indexed under the destination would be duplicated
+        conn.execute(
+            "DELETE FROM notebooks_fts WHERE tiledb_uri = ?", (new_tiledb_uri,)
+        )
+        conn.execute(
+            "INSERT INTO notebooks_fts (tiledb_uri, name, source, markdown, kernel_name) "
+            "SELECT ?, ?, source, markdown, kernel_name FROM notebooks_fts WHERE tiledb_uri = ?",
+            (new_tiledb_uri, name, tiledb_uri),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO notebooks (tiledb_uri, path, kernel_name, indexed_at) "
+            "SELECT ?, ?, kernel_name, indexed_at FROM notebooks WHERE tiledb_uri = ?",
+            (new_tiledb_uri, new_path, tiledb_uri),
+        )
+        if not keep:
+            self._remove(conn, tiledb_uri)
+
+    def indexed_at(self):
+        """
+        :return: dict of tiledb URI to the time it was last indexed
+        """
+        rows = self._connection().execute(
+            "SELECT tiledb_uri, indexed_at FROM notebooks"
+        )
+        return dict(rows.fetchall())
+
+    def search(self, query, limit=50):
+        """
+        Search the index
+        :param query: free text query, every word must match as a prefix
+        :param limit: maximum number of results
+        :return: list of results, best match first
+        """
+        expression = match_expression(query)
+        if expression is None or limit <= 0:
+            # SQLite treats a negative LIMIT as no limit
+            return []
+
+        rows = self._connection().execute(
+            """
+            SELECT n.path, n.kernel_name, n.indexed_at,
+                   snippet(notebooks_fts, -1, '[', ']', '...', 16)
+            FROM notebooks_fts JOIN notebooks n ON n.tiledb_uri = notebooks_fts.tiledb_uri
+            WHERE notebooks_fts MATCH ?
+            ORDER BY bm25(notebooks_fts, 0.0, 10.0, 1.0, 2.0, 5.0)
+            LIMIT ?
+            """,
+            (expression, limit),
+        )
+        return [
+            dict(
+                path=path,
+                name=path.rsplit("/", 1)[-1],
+                kernel_name=kernel_name,
+                indexed_at=indexed_at,
+                snippet=snippet,
+            )
+            for path, kernel_name, indexed_at, snippet in rows.fetchall()
+        ]
@@ -0,0 +1,62 @@
+"""
+    Local snapshot of the state kept in memory by the contents manager, to start warm after a restart
+"""
+
+import os
+import time
+
+from .cache import decode_json, encode_json
+
+SNAPSHOT_VERSION = 2
+
+
+class StateSnapshot:
+    """
+    A JSON file holding the state of a contents manager. It is replaced atomically, so a server stopped while
+    writing it leaves the previous snapshot.
+    """
+
+    def __init__(self, path, log=None):
+        """
+        :param path: local file path of the snapshot
+        :param log: logger
+        """
+        self.path = path
+        self.log = log
+
+    def save(self, state):
+        """
+        :param state: JSON serializable dict, datetimes are allowed
+        :return:
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        text = encode_json(
+            {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "state": state}
+        )
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+
+    def load(self, max_age):
+        """
+        :param max_age: seconds after which a snapshot is too old to be used
+        :return: tuple of the state and the time it was saved at, or None if there is no usable snapshot
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                snapshot = decode_json(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            if self.log is not None:
+                self.log.warning("Ignoring unreadable snapshot %s: %s", self.path, e)
+            return None
+
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return None
+        if time.time() - snapshot["saved_at"] > max_age:
+            return None
+        return snapshot["state"], snapshot["saved_at"]
@@ -1,28 +1,101 @@
-import os
+import re
+import atexit
 import json
+import collections
+import contextlib
 import datetime
+import functools
+import getpass
+import hashlib
+import inspect
+import os
+import sqlite3
+import tempfile
+import threading
 import time
-import tiledb
-import tiledb.cloud
-import numpy
+from concurrent.futures import ThreadPoolExecutor
 from notebook.services.contents.checkpoints import Checkpoints
 from notebook.services.contents.filemanager import FileContentsManager
 
 from tornado.web import HTTPError
 
 from .ipycompat import ContentsManager
-from .ipycompat import HasTraits, Unicode
+from .ipycompat import Bool, Dict, Float, HasTraits, Integer, List, Unicode, default
 from .ipycompat import reads, from_dict, GenericFileCheckpoints
+from .archive import NotebookArchive
+from .cache import SharedCache, load_secret
+from .encoding import (
+    DEFAULT_CHUNK_SIZE,
+    decode_contents,
+    encode_contents,
+    guess_format,
+    guess_mimetype,
+)
+from .journal import SaveJournal
+from .listing import (
+    HASH_ALGORITHM,
+    LISTING_META_KEYS,
+    CachedListing,
+    DirectoryListing,
+    ListingEntry,
+    add_listing_meta,
+    dump_listing,
+    listing_meta_from_info,
+    load_listing,
+    python_meta,
+)
+from .localfiles import clone_file, is_linked, replacing_writing
+from .outputs import (
+    OUTPUT_STORE_NAME,
+    OutputCache,
+    extract_outputs,
+    output_refs,
+    resolve_outputs,
+)
+from .lazy import numpy, tiledb
+from .paths import CATEGORIES, CloudPath, NOTEBOOK_EXT
+from .profiling import OperationProfiler, current_session, profile_thread, profiled
+from .remote import DeadlineExceeded, RemoteCalls
+from .scheduler import BACKGROUND, LISTING, CallScheduler, current_priority, priority
+from .search import SearchIndex
+from .snapshot import StateSnapshot
 
 DUMMY_CREATED_DATE = datetime.datetime.fromtimestamp(86400)
 NBFORMAT_VERSION = 4
 
 NOTEBOOK_MIME = "application/x-ipynb+json"
 
-NOTEBOOK_EXT = ".ipynb"
-
 TAG_JUPYTER_NOTEBOOK = "__jupyter-notebook"
 
+COPY_INSERT = "-Copy"
+
+COPY_PATTERN = re.compile(r"-Copy\d*$")
+
+# Newly created arrays take a moment to be registered, tags are set with an increasing delay between attempts
+REGISTRATION_RETRIES = 6
+REGISTRATION_RETRY_DELAY = 0.05
+
+# Seconds since a folder was last listed during which it is considered open and refreshed ahead of its next listing
+OPEN_LISTING_WINDOW = 60
+
+
+class WriteResult(
+    collections.namedtuple(
+        "WriteResult", ["array_name", "tiledb_uri", "size", "last_modified", "meta"]
+    )
+):
+    """
+    Outcome of writing bytes to an array.
+
+    array_name: final name of a newly created array (it may have been incremented), None for existing arrays
+    tiledb_uri: URI of the written array
+    size: number of bytes written
+    last_modified: time of the write
+    meta: metadata written with the contents
+    """
+
+    __slots__ = ()
+
 
 def get_cloud_enabled():
     """
@@ -44,7 +117,19 @@ def get_cloud_enabled():
 
 
 def http_error(code, message):
-    return HTTPError(code=code, message=message, reason=message)
+    # The log message is a format string of HTTPError, so % in paths must be escaped
+    return HTTPError(code, message.replace("%", "%%"), reason=message)
+
+
+def is_not_found(error):
+    """
+    :param error: TileDBCloudError
+    :return: True if TileDB Cloud answered that the array or namespace does not exist
+    """
+    return (
+        getattr(error, "http_status", None) == 404
+        or "not found" in str(error).lower()
+    )
 
 
 def get_s3_prefix(namespace):
@@ -122,28 +207,193 @@ def remove_path_prefix(path_prefix, path):
     return ret
 
 
+class PathLocks:
+    """
+    Locks per path, created on demand and dropped once nobody holds or waits for them. Saves of the same path are
+    serialized while saves of different paths run in parallel
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+
+    @contextlib.contextmanager
+    def hold(self, key):
+        """
+        Hold the lock of a path
+        :param key: path or URI to lock
+        :return: context manager
+        """
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+
 class TileDBContents(ContentsManager):
     """
     A general class for TileDB Contents, parent of the actual contents class and checkpoints
     """
 
-    def _save_notebook_tiledb(self, model, uri):
+    # Cross-process cache, only set up by the contents manager when shared_cache_dir is configured
+    _shared_cache = None
+
+    # Full-text search index, only set up by the contents manager when search_index_dir is configured
+    _search_index = None
+
+    # Write-ahead journal of saves, only set up by the contents manager when journal_dir is configured
+    _journal = None
+
+    # Deadline bounded and hedged remote calls, only set up by the contents manager
+    _remote_calls = None
+
+    # Admission control of TileDB Cloud calls, only set up by the contents manager when cloud_max_concurrency or
+    # cloud_rate_limit is configured
+    _scheduler = None
+
+    # Sampling profiler of contents operations, only set up by the contents manager
+    _profiler = None
+
+    # Payloads of deduplicated outputs, only set up by the contents manager
+    _output_cache = None
+
+    # Warm-start snapshot, only set up by the contents manager when snapshot_path is configured
+    _snapshot = None
+
+    download_chunk_size = Integer(
+        DEFAULT_CHUNK_SIZE,
+        config=True,
+        help="Bytes of a cloud file read and encoded at a time when it is downloaded",
+    )
+
+    max_download_size = Integer(
+        1024 ** 3,
+        config=True,
+        help="Largest cloud file in bytes which can be downloaded through the contents API, 0 for no limit",
+    )
+
+    dedup_outputs = Bool(
+        False,
+        config=True,
+        help="""Store large cell outputs of cloud notebooks once per namespace, in an array keyed by their hash, and
+        keep references to them in the notebooks""",
+    )
+
+    dedup_min_output_size = Integer(
+        64 * 1024,
+        config=True,
+        help="Smallest JSON encoded output value in bytes which is stored apart from the notebook",
+    )
+
+    output_cache_size = Integer(
+        256 * 1024 ** 2,
+        config=True,
+        help="Bytes of deduplicated outputs kept in memory, so each one is read once from TileDB Cloud",
+    )
+
+    def _remote(self, kind, func, *args, **kwargs):
+        """
+        Make a remote read with the deadline and hedging settings of its kind, identical concurrent reads are
+        coalesced into one call
+        :param kind: operation kind: info, read, meta or list
+        :param func: function making the call
+        :return: result of func
+        """
+        if self._remote_calls is None:
+            return func(*args, **kwargs)
+
+        try:
+            return self._remote_calls.call(kind, func, *args, **kwargs)
+        except DeadlineExceeded as e:
+            raise http_error(504, str(e))
+
+    def _admission(self):
+        """
+        Wait for the scheduler to admit a TileDB Cloud call made outside of _remote, with the priority class of the
+        current thread
+        :return: context manager held while the call runs
+        """
+        if self._scheduler is None:
+            return contextlib.nullcontext()
+        return self._scheduler.admit(current_priority())
+
+    def _save_notebook_tiledb(self, model, uri, is_new=False):
         """
         Save a notebook to tiledb array
         :param model: model notebook
         :param uri: URI of notebook
+        :param is_new: create a new array for the notebook
         :return: any messages
         """
         nb_contents = from_dict(model["content"])
         self.check_and_sign(nb_contents, uri)
-        file_contents = numpy.array(bytearray(json.dumps(model["content"]), "utf-8"))
 
-        final_name = self._write_bytes_to_array(
-            uri, file_contents, model.get("mimetype"), model.get("format"), "notebook"
+        # Kept in the array metadata so listings can show them without reading the notebook
+        meta = {"nbformat": model["content"].get("nbformat", NBFORMAT_VERSION)}
+        kernelspec = model["content"].get("metadata", {}).get("kernelspec") or {}
+        if kernelspec.get("name"):
+            meta["kernel_name"] = kernelspec["name"]
+
+        content = model["content"]
+        if self.dedup_outputs:
+            payloads = {}
+            if self.__dedup_allowed(uri, is_new):
+                store_uri = self._output_store_uri(self.tiledb_uri_from_path(uri))
+                content, payloads = extract_outputs(
+                    content, self.dedup_min_output_size, store_uri
+                )
+                # Payloads are written before the notebook, so a stored notebook never references a missing payload
+                self._write_payloads(store_uri, payloads)
+            # Array metadata is only ever added to, the count of an earlier save is overwritten
+            meta["output_refs"] = len(payloads)
+        file_contents = numpy.array(bytearray(json.dumps(content), "utf-8"))
+
+        result = self._write_bytes_to_array(
+            uri,
+            file_contents,
+            model.get("mimetype"),
+            model.get("format"),
+            "notebook",
+            is_new,
+            meta,
         )
 
         self.validate_notebook_model(model)
-        return final_name, model.get("message")
+        return result, model.get("message")
+
+    def __dedup_allowed(self, uri, is_new):
+        """
+        Outputs are only deduplicated in notebooks which are neither shared nor public. The output store of the
+        namespace is not shared with them, so their readers could not read the outputs. Notebooks shared later from
+        TileDB Cloud get their outputs inline when the owner opens them, until then readers see a note instead
+        :param uri: cloud path of the notebook
+        :param is_new: the notebook is saved to a new array, which is not shared yet
+        :return: True if the outputs of the notebook can be deduplicated
+        """
+        if CloudPath.parse(uri).category != "owned":
+            return False
+        if is_new:
+            return True
+
+        try:
+            info = self._remote(
+                "info", tiledb.cloud.array.info, self.tiledb_uri_from_path(uri)
+            )
+        except tiledb.cloud.tiledb_cloud_error.TileDBCloudError:
+            return False
+        return not getattr(info, "share_count", 0) and not getattr(
+            info, "public_share", False
+        )
 
     def _increment_filename(self, filename, insert="-"):
         """Increment a filename until it is unique.
@@ -188,12 +438,13 @@ class TileDBContents(ContentsManager):
         )
         return name
 
-    def _create_array(self, uri, retry=0):
+    def _create_array(self, uri, retry=0, insert="-"):
         """
         Create a new array for storing notebook file
         :param uri: location to create array
         :param name: name to register under
         :param retry: number of times to retry request
+        :param insert: characters inserted before the counter when the name is taken
         :return:
         """
         try:
@@ -227,7 +478,8 @@ class TileDBContents(ContentsManager):
             namespace = parts[parts_len - 2]
             array_name = parts[parts_len - 1]
 
-            s3_prefix = get_s3_prefix(namespace)
+            with self._admission():
+                s3_prefix = get_s3_prefix(namespace)
             if s3_prefix is None:
                 raise http_error(
                     400,
@@ -239,13 +491,11 @@ class TileDBContents(ContentsManager):
             tiledb_uri_s3 = "tiledb://{}/{}".format(namespace, s3_prefix + array_name)
 
             # Create the (empty) array on disk.
-            tiledb.SparseArray.create(tiledb_uri_s3, schema)
+            with self._admission():
+                tiledb.SparseArray.create(tiledb_uri_s3, schema)
 
             tiledb_uri = "tiledb://{}/{}".format(namespace, array_name)
-            time.sleep(0.25)
-            tiledb.cloud.array.update_info(
-                uri=tiledb_uri, array_name=array_name, tags=[TAG_JUPYTER_NOTEBOOK]
-            )
+            self._tag_new_array(tiledb_uri, array_name)
 
             return tiledb_uri, array_name
         except tiledb.TileDBError as e:
@@ -254,15 +504,15 @@ class TileDBContents(ContentsManager):
                 parts_length = len(parts)
                 array_name = parts[parts_length - 1]
 
-                array_name = self._increment_filename(array_name)
+                array_name = self._increment_filename(array_name, insert)
 
                 parts[parts_length - 1] = array_name
                 uri = "/".join(parts)
 
-                return self._create_array(uri, retry)
+                return self._create_array(uri, retry, insert)
             elif retry:
                 retry -= 1
-                return self._create_array(uri, retry)
+                return self._create_array(uri, retry, insert)
         except HTTPError as e:
             raise e
         except Exception as e:
@@ -270,6 +520,29 @@ class TileDBContents(ContentsManager):
 
         return None
 
+    def _tag_new_array(self, tiledb_uri, array_name):
+        """
+        Tag a newly created array as a notebook. The array is registered shortly after its creation, so the
+        update is retried with an increasing delay instead of always waiting up front
+        :param tiledb_uri: URI of the new array
+        :param array_name: name of the new array
+        :return:
+        """
+        delay = REGISTRATION_RETRY_DELAY
+        for attempt in range(REGISTRATION_RETRIES):
+            try:
+                with self._admission():
+                    return tiledb.cloud.array.update_info(
+                        uri=tiledb_uri,
+                        array_name=array_name,
+                        tags=[TAG_JUPYTER_NOTEBOOK],
+                    )
+            except tiledb.cloud.tiledb_cloud_error.TileDBCloudError:
+                if attempt == REGISTRATION_RETRIES - 1:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
     def _array_exists(self, path):
         """
         Check if an array exists in TileDB Cloud
@@ -278,54 +551,591 @@ class TileDBContents(ContentsManager):
         """
         tiledb_uri = self.tiledb_uri_from_path(path)
         try:
-            tiledb.cloud.array.info(tiledb_uri)
+            self._remote("info", tiledb.cloud.array.info, tiledb_uri)
             return True
         except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
-            if str(e) == "Array or Namespace Not found":
+            # Any other error must not make a save create a new array over an existing one
+            if is_not_found(e):
                 return False
-
-        return False
+            raise http_error(
+                500, "Error checking for {}: {}".format(tiledb_uri, str(e))
+            )
 
     def _write_bytes_to_array(
-        self, uri, contents, mimetype=None, format=None, type=None
+        self,
+        uri,
+        contents,
+        mimetype=None,
+        format=None,
+        type=None,
+        is_new=False,
+        extra_meta=None,
     ):
         """
-        Write given bytes to the array. Will create the array if it does not exist
+        Write given bytes to the array
         :param uri: array to write to
         :param contents: bytes to write
         :param mimetype: mimetype to set in metadata
         :param format: format to set in metadata
         :param type: type to set in metadata
-        :return:
+        :param is_new: create the array first, its name is incremented if it is taken
+        :param extra_meta: additional metadata to set
+        :return: WriteResult
         """
         tiledb_uri = self.tiledb_uri_from_path(uri)
         final_array_name = None
-        if self._is_new:
-            # if not self._array_exists(uri):
+
+        meta = dict(extra_meta or {})
+        meta["file_size"] = len(contents)
+        meta["content_hash"] = hashlib.new(HASH_ALGORITHM, contents).hexdigest()
+        if mimetype is not None:
+            meta["mimetype"] = mimetype
+        if format is not None:
+            meta["format"] = format
+        if type is not None:
+            meta["type"] = type
+
+        if is_new:
             tiledb_uri, final_array_name = self._create_array(tiledb_uri, 5)
+            self._write_contents(tiledb_uri, contents, meta)
+        elif self._journal is not None:
+            # Existing arrays are written by the journal in the background, the save is acknowledged once the
+            # journal entry is on disk
+            self._journal.append(tiledb_uri, contents.tobytes(), meta)
+        else:
+            self._write_contents(tiledb_uri, contents, meta)
+
+        return WriteResult(
+            array_name=final_array_name,
+            tiledb_uri=tiledb_uri,
+            size=len(contents),
+            last_modified=datetime.datetime.now(datetime.timezone.utc),
+            meta=meta,
+        )
+
+    def _write_contents(self, tiledb_uri, contents, meta):
+        """
+        Write the full contents and metadata of an existing array
+        :param tiledb_uri: array to write to
+        :param contents: numpy uint8 array of bytes to write
+        :param meta: metadata dict to set
+        :return:
+        """
+        with self._admission():
+            with tiledb.open(tiledb_uri, mode="w", ctx=tiledb.cloud.Ctx()) as A:
+                if contents is not None:
+                    A[range(len(contents))] = {"contents": contents}
+                for key, value in meta.items():
+                    A.meta[key] = value
+
+        if self._remote_calls is not None:
+            # Reads which started before the write must not be shared with later readers
+            self._remote_calls.detach(arg=tiledb_uri)
+
+    @staticmethod
+    def _output_store_uri(tiledb_uri):
+        """
+        :param tiledb_uri: tiledb:// URI of a notebook
+        :return: tiledb:// URI of the output store of its namespace
+        """
+        namespace = tiledb_uri[len("tiledb://") :].split("/", 1)[0]
+        return "tiledb://{}/{}".format(namespace, OUTPUT_STORE_NAME)
+
+    def _create_output_store(self, store_uri):
+        """
+        Create the output store of a namespace, a sparse array of payloads indexed by their hash
+        :param store_uri: tiledb:// URI of the output store
+        :return:
+        """
+        namespace, name = store_uri[len("tiledb://") :].split("/", 1)
+        with self._admission():
+            s3_prefix = get_s3_prefix(namespace)
+        if s3_prefix is None:
+            raise http_error(
+                400,
+                "You must set the default s3 prefix path for notebooks in {} profile settings".format(
+                    namespace
+                ),
+            )
+
+        dom = tiledb.Domain(
+            tiledb.Dim(
+                name="hash",
+                domain=(None, None),
+                tile=None,
+                dtype="ascii",
+                ctx=tiledb.cloud.Ctx(),
+            ),
+            ctx=tiledb.cloud.Ctx(),
+        )
+        schema = tiledb.ArraySchema(
+            domain=dom,
+            sparse=True,
+            attrs=[
+                tiledb.Attr(
+                    name="payload",
+                    dtype=bytes,
+                    var=True,
+                    filters=tiledb.FilterList([tiledb.ZstdFilter()]),
+                )
+            ],
+            ctx=tiledb.cloud.Ctx(),
+        )
+        try:
+            with self._admission():
+                tiledb.SparseArray.create(
+                    "tiledb://{}/{}".format(namespace, s3_prefix + name), schema
+                )
+        except tiledb.TileDBError as e:
+            # Created by another server in the meantime
+            if "already exists" not in str(e):
+                raise
+
+    def _write_payloads(self, store_uri, payloads):
+        """
+        Write the payloads which are not in an output store yet, the store is created if needed
+        :param store_uri: tiledb:// URI of the output store
+        :param payloads: dict of payload hash to payload bytes
+        :return:
+        """
+        cache = self._output_cache
+        if cache is not None:
+            payloads = {
+                digest: payload
+                for digest, payload in payloads.items()
+                if not cache.stored(store_uri, digest)
+            }
+        if not payloads:
+            return
+
+        try:
+            if cache is None or not cache.has_store(store_uri):
+                try:
+                    self._remote("info", tiledb.cloud.array.info, store_uri)
+                except tiledb.cloud.tiledb_cloud_error.TileDBCloudError:
+                    self._create_output_store(store_uri)
+                if cache is not None:
+                    cache.add_store(store_uri)
+
+            existing = self._remote(
+                "read",
+                self._read_payloads_from_tiledb,
+                store_uri,
+                tuple(sorted(payloads)),
+                False,
+            )
+            missing = [digest for digest in payloads if digest not in existing]
+            if missing:
+                with self._admission():
+                    with tiledb.open(store_uri, mode="w", ctx=tiledb.cloud.Ctx()) as A:
+                        A[numpy.array(missing)] = {
+                            "payload": numpy.array(
+                                [payloads[digest] for digest in missing], dtype=object
+                            )
+                        }
+        except tiledb.TileDBError as e:
+            raise http_error(
+                500, "Error writing outputs to {}: {}".format(store_uri, str(e))
+            )
+
+        if cache is not None:
+            for digest, payload in payloads.items():
+                cache.add(store_uri, digest, payload)
+
+    def _read_payloads(self, store_uri, digests):
+        """
+        Read payloads from an output store, payloads kept in memory are not read again
+        :param store_uri: tiledb:// URI of the output store
+        :param digests: payload hashes
+        :return: dict of payload hash to payload bytes
+        """
+        cache = self._output_cache
+        payloads = {}
+        missing = []
+        for digest in digests:
+            payload = cache.get(digest) if cache is not None else None
+            if payload is None:
+                missing.append(digest)
+            else:
+                payloads[digest] = payload
+        if not missing:
+            return payloads
+
+        try:
+            fetched = self._remote(
+                "read",
+                self._read_payloads_from_tiledb,
+                store_uri,
+                tuple(sorted(missing)),
+                True,
+            )
+        except (
+            tiledb.TileDBError,
+            tiledb.cloud.tiledb_cloud_error.TileDBCloudError,
+        ) as e:
+            if not self.__can_read(store_uri):
+                raise http_error(
+                    403,
+                    "The outputs of this notebook are stored in {}, which is not shared with you. Ask the owner "
+                    "of the notebook to share it, or to save the notebook with dedup_outputs disabled".format(
+                        store_uri
+                    ),
+                )
+            raise http_error(
+                500, "Error reading outputs from {}: {}".format(store_uri, str(e))
+            )
+        for digest in missing:
+            if digest not in fetched:
+                raise http_error(
+                    500, "Output {} is missing from {}".format(digest, store_uri)
+                )
+            payloads[digest] = fetched[digest]
+            if cache is not None:
+                cache.add(store_uri, digest, fetched[digest])
+        return payloads
+
+    def __can_read(self, tiledb_uri):
+        """
+        :param tiledb_uri: array
+        :return: True if the user is allowed to read the array
+        """
+        try:
+            info = self._remote("info", tiledb.cloud.array.info, tiledb_uri)
+        except tiledb.cloud.tiledb_cloud_error.TileDBCloudError:
+            return False
+        return "read" in (info.allowed_actions or [])
+
+    @staticmethod
+    def _read_payloads_from_tiledb(store_uri, digests, with_payloads):
+        """
+        :param store_uri: tiledb:// URI of the output store
+        :param digests: tuple of payload hashes
+        :param with_payloads: read the payloads, else only check which hashes are stored
+        :return: dict of stored payload hash to payload bytes, or None without payloads
+        """
+        with tiledb.open(store_uri, ctx=tiledb.cloud.Ctx()) as A:
+            query = A.query(attrs=["payload"] if with_payloads else [])
+            result = query.multi_index[list(digests)]
+
+        digests = [
+            digest.decode("ascii") if isinstance(digest, bytes) else digest
+            for digest in result["hash"]
+        ]
+        if not with_payloads:
+            return dict.fromkeys(digests)
+        return dict(zip(digests, result["payload"]))
+
+    def _inline_outputs(self, data, meta, for_reader=False):
+        """
+        Replace the references to deduplicated outputs of a stored notebook by the outputs
+        :param data: bytes of the stored notebook
+        :param meta: array metadata
+        :param for_reader: the notebook is shown to the user, outputs whose store the user can not read, e.g. of a
+            notebook shared after it was saved, are replaced by a note instead of failing
+        :return: bytes of the notebook with its outputs
+        """
+        if not meta.get("output_refs"):
+            return data
+
+        notebook = json.loads(data)
+        payloads = {}
+        unreadable = set()
+        for store_uri, digests in output_refs(notebook).items():
+            try:
+                payloads.update(self._read_payloads(store_uri, digests))
+            except HTTPError as e:
+                if not for_reader or e.status_code != 403:
+                    raise
+                self.log.info("Not showing outputs stored in %s: %s", store_uri, e)
+                unreadable.add(store_uri)
+        return json.dumps(resolve_outputs(notebook, payloads, unreadable)).encode(
+            "utf-8"
+        )
+
+    def __inline_shared_outputs(self, tiledb_uri, contents, meta):
+        """
+        Rewrite a notebook which was shared after its outputs were deduplicated with its outputs inline, so its
+        readers do not need the output store. Called when the owner reads it
+        :param tiledb_uri: array of the notebook
+        :param contents: numpy uint8 array of the stored notebook
+        :param meta: array metadata
+        :return:
+        """
+        try:
+            contents, meta = self._self_contained(contents, meta)
+            if self._journal is not None:
+                self._journal.append(tiledb_uri, contents.tobytes(), meta)
+            else:
+                self._write_contents(tiledb_uri, contents, meta)
+        except (
+            tiledb.TileDBError,
+            tiledb.cloud.tiledb_cloud_error.TileDBCloudError,
+            HTTPError,
+        ) as e:
+            self.log.warning("Error inlining the outputs of %s: %s", tiledb_uri, e)
+            return
+        self._remember_listing_meta(tiledb_uri, meta)
+
+    def _self_contained(self, contents, meta):
+        """
+        Inline the deduplicated outputs of a stored notebook, for copies whose readers may not be able to read the
+        output store of its namespace
+        :param contents: numpy uint8 array of the stored notebook, or None if empty
+        :param meta: array metadata
+        :return: tuple of contents and metadata of the notebook with its outputs
+        """
+        if contents is None or not meta.get("output_refs"):
+            return contents, meta
+
+        data = self._inline_outputs(contents.tobytes(), meta)
+        # Array metadata is only ever added to, so the count is overwritten instead of removed
+        meta = dict(
+            meta,
+            output_refs=0,
+            file_size=len(data),
+            content_hash=hashlib.new(HASH_ALGORITHM, data).hexdigest(),
+        )
+        return numpy.frombuffer(data, dtype=numpy.uint8), meta
+
+    def _read_array(self, tiledb_uri):
+        """
+        Read the raw contents and metadata of an array, without decoding the contents. Saves which are still in
+        the journal are read from it, so users always read their own writes
+        :param tiledb_uri: array to read
+        :return: tuple of contents (numpy uint8 array or None if empty) and metadata dict
+        """
+        if self._journal is not None:
+            pending = self._journal.latest(tiledb_uri)
+            if pending is not None:
+                data, meta = pending
+                return numpy.frombuffer(data, dtype=numpy.uint8), dict(meta)
+
+        return self._remote("read", self._read_array_from_tiledb, tiledb_uri)
+
+    def _read_array_from_tiledb(self, tiledb_uri):
+        """
+        Read the raw contents and metadata of an array from TileDB
+        :param tiledb_uri: array to read
+        :return: tuple of contents (numpy uint8 array or None if empty) and metadata dict
+        """
+        with tiledb.open(tiledb_uri, ctx=tiledb.cloud.Ctx()) as A:
+            meta = {key: A.meta[key] for key in A.meta.keys()}
+            contents = None
+            if "file_size" in meta:
+                # Only the contents attribute is read, the coordinates would take 8 bytes per byte of contents
+                query = A.query(attrs=["contents"], coords=False)
+                contents = query[slice(0, meta["file_size"])]["contents"]
+
+        return contents, meta
+
+    def _read_file_array(self, tiledb_uri, name, format=None):
+        """
+        Read a file array and encode its contents for the contents API, one slice at a time
+        :param tiledb_uri: array to read
+        :param name: file name, used to guess the mimetype
+        :param format: requested format, "text", "base64" or None for the stored or guessed one
+        :return: tuple of metadata, raw contents of arrays holding a notebook and the encoded contents of others
+        """
+        if self._journal is not None:
+            pending = self._journal.latest(tiledb_uri)
+            if pending is not None:
+                data, meta = pending
+                if meta.get("type") == "notebook":
+                    return dict(meta), numpy.frombuffer(data, dtype=numpy.uint8), None
+                view = memoryview(data)
+                encoded = self._encode_file(
+                    tiledb_uri, name, meta, format, lambda start, stop: view[start:stop]
+                )
+                return dict(meta), None, encoded
+
+        return self._remote(
+            "read", self._read_file_from_tiledb, tiledb_uri, name, format
+        )
+
+    def _read_file_from_tiledb(self, tiledb_uri, name, format=None):
+        """
+        Read a file array from TileDB, see _read_file_array
+        """
+        with tiledb.open(tiledb_uri, ctx=tiledb.cloud.Ctx()) as A:
+            meta = {key: A.meta[key] for key in A.meta.keys()}
+            query = A.query(attrs=["contents"], coords=False)
+            if meta.get("type") == "notebook":
+                contents = None
+                if "file_size" in meta:
+                    contents = query[slice(0, meta["file_size"])]["contents"]
+                return meta, contents, None
+
+            encoded = self._encode_file(
+                tiledb_uri,
+                name,
+                meta,
+                format,
+                lambda start, stop: query[slice(start, stop)]["contents"],
+            )
+            return meta, None, encoded
+
+    def _encode_file(self, tiledb_uri, name, meta, format, read_slice):
+        """
+        Encode file contents as text or base64, chosen by the requested format, then the stored format and mimetype
+        :param tiledb_uri: array being read
+        :param name: file name, used to guess the mimetype
+        :param meta: metadata of the array
+        :param format: requested format or None
+        :param read_slice: function(start, stop) returning the bytes in [start, stop)
+        :return: tuple of encoded contents, format and mimetype
+        """
+        size = meta.get("file_size", 0)
+        if self.max_download_size and size > self.max_download_size:
+            raise http_error(
+                413,
+                "{} is {} bytes, larger than the {} bytes download limit".format(
+                    tiledb_uri, size, self.max_download_size
+                ),
+            )
+
+        if format is None:
+            format = meta.get("format") or guess_format(meta.get("mimetype"))
+        try:
+            content, format = encode_contents(
+                read_slice, size, format, self.download_chunk_size
+            )
+        except UnicodeDecodeError:
+            raise http_error(400, "{} is not UTF-8 text".format(tiledb_uri))
+
+        mimetype = meta.get("mimetype") or guess_mimetype(name, format)
+        return content, format, mimetype
+
+    def _read_public_array(self, tiledb_uri):
+        """
+        Read the raw contents and metadata of a public array through the shared cache. Public notebooks are
+        treated as immutable for public_notebook_cache_ttl seconds and shared between all users of the node.
+
+        Every user of the node can write to the cache, so cached contents are only served if they match the
+        content hash of the array known from a listing of the user, or else read from the array metadata, which
+        is much smaller than the contents. Arrays saved without a content hash are not cached.
+        :param tiledb_uri: array to read
+        :return: tuple of contents (numpy uint8 array or None if empty) and metadata dict
+        """
+        if self._shared_cache is None:
+            return self._read_array(tiledb_uri)
+
+        key = "array:{}".format(tiledb_uri)
+        try:
+            entry = self._shared_cache.get(key)
+        except sqlite3.Error as e:
+            self.log.warning("Error reading the shared cache: %s", e)
+            entry = None
+        if entry is not None:
+            meta, data = entry
+            content_hash = meta.get("content_hash") if isinstance(meta, dict) else None
+            if (
+                content_hash is not None
+                and hashlib.new(HASH_ALGORITHM, data or b"").hexdigest() == content_hash
+                and self.__trusted_content_hash(tiledb_uri) == content_hash
+            ):
+                contents = None
+                if data is not None:
+                    contents = numpy.frombuffer(data, dtype=numpy.uint8)
+                return contents, meta
+            self.log.warning(
+                "Ignoring cached contents of %s which do not match their hash",
+                tiledb_uri,
+            )
+
+        contents, meta = self._read_array(tiledb_uri)
+        meta = python_meta(meta)
+        self._remember_listing_meta(tiledb_uri, meta)
+        if "content_hash" in meta:
+            try:
+                self._shared_cache.set(
+                    key,
+                    self.public_notebook_cache_ttl,
+                    value=meta,
+                    data=contents.tobytes() if contents is not None else None,
+                )
+            except (TypeError, sqlite3.Error) as e:
+                self.log.warning("Not caching %s: %s", tiledb_uri, e)
+
+        return contents, meta
+
+    def __trusted_content_hash(self, tiledb_uri):
+        """
+        The content hash of an array from a source other users can not write to: the listing metadata of the user,
+        or else the array metadata in TileDB
+        :param tiledb_uri: array
+        :return: content hash, None if it is not known
+        """
+        with self._listing_meta_lock:
+            known = self._listing_meta.get(tiledb_uri)
+        if known is not None and known[1].get("content_hash") is not None:
+            return known[1]["content_hash"]
+
+        try:
+            meta = self._remote("meta", self._read_meta, tiledb_uri)
+        except (
+            tiledb.TileDBError,
+            tiledb.cloud.tiledb_cloud_error.TileDBCloudError,
+            HTTPError,
+        ) as e:
+            self.log.debug("Error reading metadata of %s: %s", tiledb_uri, e)
+            return None
+        meta = self._remember_listing_meta(tiledb_uri, meta)
+        return meta.get("content_hash")
+
+    def _copy_array(self, source_uri, destination_uri):
+        """
+        Copy the contents and metadata of an array to a newly created array
+        :param source_uri: tiledb:// URI of the array to copy
+        :param destination_uri: tiledb:// URI of the copy, incremented if it is taken
+        :return: tuple of final array name and metadata of the copy
+        """
+        try:
+            contents, meta = self._read_array(source_uri)
+        except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
+            raise http_error(400, "Error reading {}: {}".format(source_uri, str(e)))
+        except tiledb.TileDBError as e:
+            raise http_error(
+                500, str(e),
+            )
 
-        with tiledb.open(tiledb_uri, mode="w", ctx=tiledb.cloud.Ctx()) as A:
-            A[range(len(contents))] = {"contents": contents}
-            A.meta["file_size"] = len(contents)
-            if mimetype is not None:
-                A.meta["mimetype"] = mimetype
-            if format is not None:
-                A.meta["format"] = format
-            if type is not None:
-                A.meta["type"] = type
+        if self._output_store_uri(source_uri) != self._output_store_uri(
+            destination_uri
+        ):
+            # Copies in the same namespace share its output store, others get their outputs inline
+            contents, meta = self._self_contained(contents, meta)
+
+        created = self._create_array(destination_uri, 5, COPY_INSERT)
+        if created is None:
+            raise http_error(500, "Error creating copy of {}".format(source_uri))
+        tiledb_uri, array_name = created
+
+        try:
+            self._write_contents(tiledb_uri, contents, meta)
+        except tiledb.TileDBError as e:
+            raise http_error(
+                500, str(e),
+            )
 
-        return final_array_name
+        return array_name, meta
 
-    def _save_file_tiledb(self, model, uri):
+    def _save_file_tiledb(self, model, uri, is_new=False):
         """
         Wrapper function for saving a file as a tiledb array
         :param model: notebook model to write
         :param uri: array URI to write
-        :return:
+        :param is_new: create a new array for the file
+        :return: WriteResult
         """
-        file_contents = model["content"]
+        file_contents = numpy.frombuffer(
+            decode_contents(model["content"], model.get("format")), dtype=numpy.uint8
+        )
         return self._write_bytes_to_array(
-            uri, file_contents, model.get("mimetype"), model.get("format"), "file"
+            uri,
+            file_contents,
+            model.get("mimetype"),
+            model.get("format"),
+            "file",
+            is_new,
         )
 
     def tiledb_uri_from_path(self, path):
@@ -334,13 +1144,7 @@ class TileDBContents(ContentsManager):
         :param path:
         :return: tiledb uri
         """
-
-        parts = path.split(os.sep)
-        if len(parts) == 1:
-            parts = path.split("/")
-
-        length = len(parts)
-        return "tiledb://{}/{}".format(parts[length - 2], parts[length - 1])
+        return CloudPath.parse(path).tiledb_uri
 
     def _notebook_from_array(self, uri, content=True):
         """
@@ -350,25 +1154,43 @@ class TileDBContents(ContentsManager):
 
         model["type"] = "notebook"
         if content:
-            tiledb_uri = self.tiledb_uri_from_path(uri)
+            cloud_path = CloudPath.parse(uri)
+            tiledb_uri = cloud_path.tiledb_uri
             try:
-                info = tiledb.cloud.array.info(tiledb_uri)
+                info = self._remote("info", tiledb.cloud.array.info, tiledb_uri)
                 model["last_modified"] = info.last_accessed
                 if "write" not in info.allowed_actions:
                     model["writable"] = False
-                with tiledb.open(tiledb_uri, ctx=tiledb.cloud.Ctx()) as A:
-                    meta = A.meta
-                    nb_content = []
-                    if "file_size" in meta:
-                        file_content = A[slice(0, meta["file_size"])]
-                        nb_content = reads(
-                            file_content["contents"].tostring().decode("utf-8"),
-                            as_version=NBFORMAT_VERSION,
+                if cloud_path.category == "public":
+                    contents, meta = self._read_public_array(tiledb_uri)
+                else:
+                    contents, meta = self._read_array(tiledb_uri)
+                add_listing_meta(model, meta)
+                nb_content = []
+                if contents is not None:
+                    if (
+                        meta.get("output_refs")
+                        and "write" in info.allowed_actions
+                        and (
+                            getattr(info, "share_count", 0)
+                            or getattr(info, "public_share", False)
                         )
-                        self.mark_trusted_cells(nb_content, uri)
-                    model["format"] = "json"
-                    model["content"] = nb_content
-                    self.validate_notebook_model(model)
+                    ):
+                        # Shared from TileDB Cloud after it was saved, readers can not read the output store
+                        self.__inline_shared_outputs(tiledb_uri, contents, meta)
+                    data = contents.tobytes()
+                    nb_content = reads(
+                        self._inline_outputs(data, meta, for_reader=True).decode(
+                            "utf-8"
+                        ),
+                        as_version=NBFORMAT_VERSION,
+                    )
+                    self.mark_trusted_cells(nb_content, uri)
+                    if self._search_index is not None:
+                        self._search_index.update(tiledb_uri, cloud_path.path, data)
+                model["format"] = "json"
+                model["content"] = nb_content
+                self.validate_notebook_model(model)
             except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
                 raise http_error(400, "Error fetching notebook info: {}".format(str(e)))
             except tiledb.TileDBError as e:
@@ -388,44 +1210,38 @@ class TileDBContents(ContentsManager):
         if content:
             tiledb_uri = self.tiledb_uri_from_path(uri)
             try:
-                info = tiledb.cloud.array.info(tiledb_uri)
+                info = self._remote("info", tiledb.cloud.array.info, tiledb_uri)
                 model["last_modified"] = info.last_accessed
                 if "write" not in info.allowed_actions:
                     model["writable"] = False
-                with tiledb.open(tiledb_uri, ctx=tiledb.cloud.Ctx()) as A:
-                    meta = A.meta
-                    # Get metadata information
-                    if "mimetype" in meta:
-                        model["mimetype"] = meta["mimetype"]
-                    if "format" in meta:
-                        model["format"] = meta["format"]
-                    else:
-                        model["format"] = format
-
-                    if "type" in meta:
-                        model["type"] = meta["type"]
-
-                    file_content = None
-                    if "file_size" in meta:
-                        file_content = A[slice(0, meta["file_size"])]
-                        nb_content = file_content["contents"]
-                        model["content"] = nb_content
-                    else:
-                        model["content"] = []
+                meta, contents, encoded = self._read_file_array(
+                    tiledb_uri, model["name"], format
+                )
+                add_listing_meta(model, meta)
 
-                    if (
-                        "type" in meta
-                        and meta["type"] == "notebook"
-                        and file_content is not None
-                    ):
-                        nb_content = reads(
-                            file_content["contents"].tostring().decode("utf-8"),
-                            as_version=NBFORMAT_VERSION,
-                        )
-                        self.mark_trusted_cells(nb_content, uri)
-                        model["format"] = "json"
-                        model["content"] = nb_content
-                        self.validate_notebook_model(model)
+                if "type" in meta:
+                    model["type"] = meta["type"]
+
+                if encoded is not None:
+                    model["content"], model["format"], model["mimetype"] = encoded
+                elif contents is None:
+                    model["content"] = []
+
+                if (
+                    "type" in meta
+                    and meta["type"] == "notebook"
+                    and contents is not None
+                ):
+                    nb_content = reads(
+                        self._inline_outputs(
+                            contents.tobytes(), meta, for_reader=True
+                        ).decode("utf-8"),
+                        as_version=NBFORMAT_VERSION,
+                    )
+                    self.mark_trusted_cells(nb_content, uri)
+                    model["format"] = "json"
+                    model["content"] = nb_content
+                    self.validate_notebook_model(model)
             except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
                 raise http_error(500, "Error fetching file info: {}".format(str(e)))
             except tiledb.TileDBError as e:
@@ -441,9 +1257,7 @@ class TileDBContents(ContentsManager):
         :param path:
         :return:
         """
-        if path.split(os.sep)[0] == "cloud" or path.split("/")[0] == "cloud":
-            return True
-        return False
+        return CloudPath.parse(path).is_remote
 
     def _is_remote_dir(self, path):
         """
@@ -451,22 +1265,7 @@ class TileDBContents(ContentsManager):
         :param path:
         :return:
         """
-        for sep in [os.sep, "/"]:
-            splits = path.split(sep)
-            if len(splits) == 1 and splits[0] == "cloud":
-                return True
-            if (
-                (len(splits) == 2 or len(splits) == 3)
-                and splits[0] == "cloud"
-                and (
-                    splits[1] == "owned"
-                    or splits[1] == "public"
-                    or splits[1] == "shared"
-                )
-            ):
-                return True
-
-        return False
+        return CloudPath.parse(path).is_dir
 
     def guess_type(self, path, allow_directory=True):
         """
@@ -480,19 +1279,14 @@ class TileDBContents(ContentsManager):
         ----------
             obj: s3.Object or string
         """
-        path_fixed = path.strip("/")
-        if self._is_remote_path(path_fixed):
-            if self._is_remote_dir(path_fixed):
+        cloud_path = CloudPath.parse(path)
+        if cloud_path.is_remote:
+            if cloud_path.is_dir:
+                return "directory"
+            try:
+                return self._get_type(cloud_path.tiledb_uri)
+            except Exception as e:
                 return "directory"
-            else:
-                if path_fixed.endswith(NOTEBOOK_EXT):
-                    path_fixed = path_fixed[: -1 * len(NOTEBOOK_EXT)]
-                try:
-                    tiledb_uri = self.tiledb_uri_from_path(path_fixed)
-                    return self._get_type(tiledb_uri)
-                except Exception as e:
-                    return "directory"
-            return "file"
 
         if path.endswith(".ipynb"):
             return "notebook"
@@ -501,6 +1295,15 @@ class TileDBContents(ContentsManager):
         else:
             return "file"
 
+    def _read_meta(self, uri):
+        """
+        Read the metadata of an array, without its contents
+        :param uri: of array
+        :return: metadata dict
+        """
+        with tiledb.open(uri, ctx=tiledb.cloud.Ctx()) as A:
+            return {key: A.meta[key] for key in A.meta.keys()}
+
     def _get_mimetype(self, uri):
         """
         Fetch mimetype from array metadata
@@ -508,10 +1311,9 @@ class TileDBContents(ContentsManager):
         :return:
         """
         try:
-            with tiledb.open(uri, ctx=tiledb.cloud.Ctx()) as A:
-                meta = A.meta
-                if "mimetype" in meta:
-                    return meta["mimetype"]
+            meta = self._remote("meta", self._read_meta, uri)
+            if "mimetype" in meta:
+                return meta["mimetype"]
         except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
             raise http_error(500, "Error getting mimetype: {}".format(str(e)))
         except tiledb.TileDBError as e:
@@ -528,10 +1330,9 @@ class TileDBContents(ContentsManager):
         :return:
         """
         try:
-            with tiledb.open(uri, ctx=tiledb.cloud.Ctx()) as A:
-                meta = A.meta
-                if "type" in meta:
-                    return meta["type"]
+            meta = self._remote("meta", self._read_meta, uri)
+            if "type" in meta:
+                return meta["type"]
         except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
             raise http_error(500, "Error getting type: {}".format(str(e)))
         except tiledb.TileDBError as e:
@@ -545,17 +1346,63 @@ class TileDBContents(ContentsManager):
 class TileDBCheckpoints(GenericFileCheckpoints, TileDBContents, Checkpoints):
     """
     A wrapper of a class which will in the future support checkpoints by time traveling.
-    It inherits from GenericFileCheckpoints for local notebooks
+    It inherits from GenericFileCheckpoints for local notebooks, whose checkpoints are created and restored as
+    file copies instead of being read and written again as models
     """
 
+    hardlink_checkpoints = Bool(
+        False,
+        config=True,
+        help="""Create checkpoints of local files as hardlinks when the filesystem does not support reflinks. Only
+        enable it when local files are not written in place by other programs, the contents manager replaces files
+        which have a hardlinked checkpoint when it saves them""",
+    )
+
     def _tiledb_checkpoint_model(self):
         return dict(id="checkpoints-not-supported", last_modified=DUMMY_CREATED_DATE,)
 
-    def create_file_checkpoint(self, content, format, path):
-        """ -> checkpoint model"""
+    def create_checkpoint(self, contents_mgr, path):
+        """
+        Create a checkpoint of a local file as a reflink, hardlink or streamed copy of the file
+        :param contents_mgr: contents manager
+        :param path: path of the file
+        :return: checkpoint model
+        """
         path_fixed = path.strip("/")
-        if not self._is_remote_path(path_fixed):
-            return super().create_file_checkpoint(content, format, path)
+        if self._is_remote_path(path_fixed):
+            return super().create_checkpoint(contents_mgr, path)
+
+        checkpoint_id = "checkpoint"
+        src_path = contents_mgr._get_os_path(path)
+        dest_path = self.checkpoint_path(checkpoint_id, path)
+        with self.perm_to_403(dest_path):
+            clone_file(src_path, dest_path, hardlink=self.hardlink_checkpoints)
+        return self.checkpoint_model(checkpoint_id, dest_path)
+
+    def restore_checkpoint(self, contents_mgr, checkpoint_id, path):
+        """
+        Restore a checkpoint of a local file by copying it over the file
+        :param contents_mgr: contents manager
+        :param checkpoint_id: checkpoint
+        :param path: path of the file
+        :return:
+        """
+        path_fixed = path.strip("/")
+        if self._is_remote_path(path_fixed):
+            return super().restore_checkpoint(contents_mgr, checkpoint_id, path)
+
+        src_path = self.checkpoint_path(checkpoint_id, path)
+        if not os.path.isfile(src_path):
+            self.no_such_checkpoint(path, checkpoint_id)
+        dest_path = contents_mgr._get_os_path(path)
+        with self.perm_to_403(dest_path):
+            clone_file(src_path, dest_path, hardlink=self.hardlink_checkpoints)
+
+    def create_file_checkpoint(self, content, format, path):
+        """ -> checkpoint model"""
+        path_fixed = path.strip("/")
+        if not self._is_remote_path(path_fixed):
+            return super().create_file_checkpoint(content, format, path)
 
         return self._tiledb_checkpoint_model()
 
@@ -605,8 +1452,293 @@ class TileDBCloudContentsManager(TileDBContents, FileContentsManager, HasTraits)
     # This makes the checkpoints get saved on this directory
     root_dir = Unicode("./", config=True)
 
+    bulk_concurrency = Integer(
+        8,
+        config=True,
+        help="Maximum number of concurrent TileDB Cloud calls made by bulk operations",
+    )
+
+    cloud_enabled_ttl = Integer(
+        300,
+        config=True,
+        help="Seconds for which the notebook sharing feature check of the user profile is cached",
+    )
+
+    shared_cache_dir = Unicode(
+        "",
+        config=True,
+        help="""Directory of a cache shared by the contents managers of a node, for cloud listings and public
+        notebook contents. It must only be writable by the notebook servers. Disabled when empty""",
+    )
+
+    shared_cache_user = Unicode(
+        config=True,
+        help="User the shared cache entries which depend on permissions are isolated by",
+    )
+
+    shared_cache_secret_file = Unicode(
+        config=True,
+        help="""File holding the secret the shared cache entries of the user are signed with, created readable by
+        the user only. Entries of the user which were not signed with it, e.g. written by another user, are ignored""",
+    )
+
+    listing_cache_ttl = Integer(
+        30,
+        config=True,
+        help="Seconds a cloud listing stays in the shared cache",
+    )
+
+    public_notebook_cache_ttl = Integer(
+        600,
+        config=True,
+        help="Seconds the contents of a public notebook stay in the shared cache",
+    )
+
+    search_index_dir = Unicode(
+        "",
+        config=True,
+        help="Directory of the local full-text search index over cloud notebooks. Disabled when empty",
+    )
+
+    search_crawl_interval = Integer(
+        600,
+        config=True,
+        help="Seconds between background crawls adding notebooks changed since they were indexed, 0 disables it",
+    )
+
+    search_crawl_public = Bool(
+        False, config=True, help="Also crawl public notebooks into the search index",
+    )
+
+    remote_deadlines = Dict(
+        {},
+        config=True,
+        help="""Deadline in seconds of TileDB Cloud reads per operation kind (info: array info, read: contents,
+        meta: metadata only, list: array listings), e.g. {"info": 30, "read": 120}. Kinds without a deadline are
+        not bounded and run on the calling thread""",
+    )
+
+    hedge_percentiles = Dict(
+        {},
+        config=True,
+        help="""Latency percentile per operation kind after which a second, hedged, attempt of a read is started,
+        e.g. {"info": 95}. Kinds without a percentile are not hedged""",
+    )
+
+    remote_workers = Integer(
+        32, config=True, help="Threads available to run deadline bounded reads",
+    )
+
+    journal_dir = Unicode(
+        "",
+        config=True,
+        help="""Directory of the write-ahead journal of saves. Saves to existing cloud notebooks are acknowledged
+        once journaled and written to TileDB Cloud in the background. Disabled when empty""",
+    )
+
+    journal_max_attempts = Integer(
+        10,
+        config=True,
+        help="""Attempts to write a journaled save before it is moved to the failed folder of the journal. Failed saves
+        are still served and retried every 30 seconds, they are counted in the metrics""",
+    )
+
+    journal_wait_timeout = Integer(
+        30,
+        config=True,
+        help="Seconds a rename waits for the journaled saves of the notebook to be written",
+    )
+
+    listing_metadata = Bool(
+        False,
+        config=True,
+        help="""With TileDB Cloud clients which can not return the array metadata with listings, read the metadata of
+        listed cloud notebooks, one read per notebook, to show their size, content hash, kernel name and nbformat
+        version""",
+    )
+
+    listing_metadata_ttl = Integer(
+        300,
+        config=True,
+        help="""Seconds the array metadata shown in listings is kept in memory. Saves, copies, renames and
+        deletes made through this server update it right away""",
+    )
+
+    cloud_max_concurrency = Integer(
+        0,
+        config=True,
+        help="""TileDB Cloud calls and array opens running at the same time, 0 for no limit. One slot is kept for
+        interactive calls (opens, saves, renames, deletes, copies). Calls are only scheduled when this or
+        cloud_rate_limit is set""",
+    )
+
+    cloud_rate_limit = Float(
+        0.0,
+        config=True,
+        help="TileDB Cloud calls started per second, 0 for no limit",
+    )
+
+    cloud_rate_burst = Integer(
+        20,
+        config=True,
+        help="TileDB Cloud calls which can be started at once when the rate limit was not reached for a while",
+    )
+
+    listing_stale_while_revalidate = Bool(
+        False,
+        config=True,
+        help="""Serve the last known cloud directory listings right away and refresh them in the background.
+        Folders listed in the last minute are refreshed ahead of their next listing""",
+    )
+
+    listing_refresh_interval = Integer(
+        10,
+        config=True,
+        help="Seconds after which a stale-while-revalidate listing is refreshed in the background",
+    )
+
+    listing_max_staleness = Integer(
+        120,
+        config=True,
+        help="""Seconds after which a stale-while-revalidate listing is not served anymore and the listing is
+        fetched again on the request path""",
+    )
+
+    profile_sample_rate = Float(
+        0.0,
+        config=True,
+        help="""Fraction of contents operations profiled with cProfile, 0 disables profiling. It can also be changed
+        at runtime through /api/tiledb/contents/profiling""",
+    )
+
+    profile_operations = List(
+        Unicode(),
+        config=True,
+        help="Operations profiled: get, save, delete, rename or copy. All of them when empty",
+    )
+
+    profile_path_prefix = Unicode(
+        "",
+        config=True,
+        help="Only profile operations on paths under this prefix, e.g. cloud/owned/<namespace>",
+    )
+
+    profile_dir = Unicode(
+        config=True,
+        help="Local directory the profiles are written to as pstats files",
+    )
+
+    profile_max_files = Integer(
+        200,
+        config=True,
+        help="Profiles kept in profile_dir, the oldest are removed",
+    )
+
+    snapshot_path = Unicode(
+        "",
+        config=True,
+        help="""Local file the user profile check, cloud listings and listing metadata kept in memory are saved to
+        at shutdown and every snapshot_interval seconds, and restored from at startup. Disabled when empty""",
+    )
+
+    snapshot_interval = Integer(
+        300, config=True, help="Seconds between saves of the snapshot, 0 to only save it at shutdown",
+    )
+
+    snapshot_max_age = Integer(
+        86400,
+        config=True,
+        help="""Seconds after which a snapshot is not restored. Restored listings need
+        listing_stale_while_revalidate, they are served once and refreshed in the background right away""",
+    )
+
+    @default("profile_dir")
+    def _profile_dir_default(self):
+        return os.path.join(tempfile.gettempdir(), "tiledbcontents-profiles")
+
+    @default("shared_cache_user")
+    def _shared_cache_user_default(self):
+        return os.environ.get("JUPYTERHUB_USER") or getpass.getuser()
+
+    @default("shared_cache_secret_file")
+    def _shared_cache_secret_file_default(self):
+        from jupyter_core.paths import jupyter_runtime_dir
+
+        return os.path.join(jupyter_runtime_dir(), "tiledbcontents-cache-secret")
+
     def __init__(self, **kwargs):
         super(FileContentsManager, self).__init__(**kwargs)
+        self._cloud_enabled = None
+        self._bulk_local = threading.local()
+        self._path_locks = PathLocks()
+        self._listing_meta = {}
+        self._listing_meta_lock = threading.Lock()
+        # Listing function to whether it takes with_metadata
+        self._list_with_metadata = {}
+        self._listings = {}
+        self._listings_lock = threading.Lock()
+        self._listings_generation = 0
+        self._cloud_enabled_restored = False
+        if self.cloud_max_concurrency or self.cloud_rate_limit:
+            self._scheduler = CallScheduler(
+                max_concurrent=self.cloud_max_concurrency,
+                rate=self.cloud_rate_limit,
+                burst=self.cloud_rate_burst,
+            )
+        self._remote_calls = RemoteCalls(
+            deadlines=self.remote_deadlines,
+            hedge_percentiles=self.hedge_percentiles,
+            max_workers=self.remote_workers,
+            scheduler=self._scheduler,
+        )
+        self._profiler = OperationProfiler(
+            self.profile_dir,
+            sample_rate=self.profile_sample_rate,
+            operations=self.profile_operations,
+            path_prefix=self.profile_path_prefix,
+            max_files=self.profile_max_files,
+            log=self.log,
+        )
+        self._output_cache = OutputCache(self.output_cache_size)
+        if self.shared_cache_dir:
+            self._shared_cache = SharedCache(
+                self.shared_cache_dir,
+                secret=load_secret(self.shared_cache_secret_file),
+            )
+        if self.journal_dir:
+            self._journal = SaveJournal(
+                self.journal_dir,
+                self.__replay_journal_entry,
+                self.log,
+                max_attempts=self.journal_max_attempts,
+            )
+        if self.listing_stale_while_revalidate:
+            self._refresh_executor = ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="tiledbcontents-refresh"
+            )
+            threading.Thread(
+                target=self.__refresh_open_listings,
+                name="tiledbcontents-listing-refresher",
+                daemon=True,
+            ).start()
+        if self.snapshot_path:
+            self._snapshot = StateSnapshot(self.snapshot_path, log=self.log)
+            self.__restore_snapshot()
+            atexit.register(self.save_snapshot)
+            if self.snapshot_interval > 0:
+                threading.Thread(
+                    target=self.__save_snapshots,
+                    name="tiledbcontents-snapshot",
+                    daemon=True,
+                ).start()
+        if self.search_index_dir:
+            self._search_index = SearchIndex(self.search_index_dir, log=self.log)
+            if self.search_crawl_interval > 0:
+                threading.Thread(
+                    target=self.__crawl_search_index,
+                    name="tiledbcontents-search-crawler",
+                    daemon=True,
+                ).start()
 
     def _checkpoints_class_default(self):
         """
@@ -615,29 +1747,51 @@ class TileDBCloudContentsManager(TileDBContents, FileContentsManager, HasTraits)
         """
         return TileDBCheckpoints
 
+    @contextlib.contextmanager
+    def atomic_writing(self, os_path, *args, **kwargs):
+        """
+        Write a local file. With hardlink_checkpoints, a file sharing its inode with a hardlinked checkpoint is
+        replaced by a new file instead of written in place, so the checkpoint keeps its contents
+        :param os_path: local file path
+        :return: context manager yielding the file object
+        """
+        hardlinks = getattr(self.checkpoints, "hardlink_checkpoints", False)
+        if not hardlinks or not is_linked(os_path):
+            with super().atomic_writing(os_path, *args, **kwargs) as f:
+                yield f
+            return
+
+        with self.perm_to_403(os_path):
+            with replacing_writing(os_path, *args, **kwargs) as f:
+                yield f
+
     def __list_namespace(self, category, namespace, content=False):
         """
         List all notebook arrays in a namespace, this is setup to mimic a "ls" of a directory
         :param category: category to list, shared, owned or public
         :param namespace: namespace to list
         :param content: should contents be included
-        :return: model of namespace
+        :return: DirectoryListing of the namespace, or its model without content
         """
+        model = base_directory_model(namespace)
+        model["path"] = "cloud/{}/{}".format(category, namespace)
+        if not content:
+            # Listing the namespace is only needed for its content
+            model["format"] = None
+            return model
+
         arrays = []
+        list_func = None
+        if category == "owned":
+            list_func = tiledb.cloud.client.list_arrays
+        elif category == "shared":
+            list_func = tiledb.cloud.client.list_shared_arrays
+        elif category == "public":
+            list_func = tiledb.cloud.client.list_public_arrays
         try:
             # fetch arrays from the category
-            if category == "owned":
-                arrays = tiledb.cloud.client.list_arrays(
-                    tag=[TAG_JUPYTER_NOTEBOOK], namespace=namespace
-                )
-            elif category == "shared":
-                arrays = tiledb.cloud.client.list_shared_arrays(
-                    tag=[TAG_JUPYTER_NOTEBOOK], namespace=namespace
-                )
-            elif category == "public":
-                arrays = tiledb.cloud.client.list_public_arrays(
-                    tag=[TAG_JUPYTER_NOTEBOOK], namespace=namespace
-                )
+            if list_func is not None:
+                arrays = self.__list_arrays(list_func, namespace)
         except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
             raise http_error(
                 500, "Error listing notebooks in {}: ".format(namespace, str(e))
@@ -647,29 +1801,42 @@ class TileDBCloudContentsManager(TileDBContents, FileContentsManager, HasTraits)
                 500, str(e),
             )
 
-        model = base_directory_model(namespace)
-        model["path"] = "cloud/{}/{}".format(category, namespace)
-        if content:
-            # Build model content if asked for
-            model["format"] = "json"
-            model["content"] = []
-            if arrays is not None:
-                for notebook in arrays:
-                    nbmodel = base_model(notebook.name)
-
-                    # Add notebook extension to name, so jupyterlab will open with as a notebook
-                    # It seems to check the extension even though we set the "type" parameter
-                    nbmodel["path"] = "cloud/{}/{}/{}{}".format(
-                        category, namespace, nbmodel["path"], NOTEBOOK_EXT
+        # Entries are kept compact, their models are only built when the listing is served
+        entries = []
+        if arrays is not None:
+            # TileDB Cloud returns the metadata with the listing, arrays without it are looked up in memory. Clients
+            # which can not list metadata have no batched alternative, the arrays are only read one by one with
+            # listing_metadata. With clients which can, arrays listed without metadata have none to read
+            fetch = self.listing_metadata and not self.__lists_with_metadata(list_func)
+            listing_meta = {}
+            missing = []
+            for notebook in arrays:
+                tiledb_uri = "tiledb://{}/{}".format(namespace, notebook.name)
+                meta = listing_meta_from_info(getattr(notebook, "metadata", None))
+                if meta is None:
+                    missing.append(tiledb_uri)
+                else:
+                    listing_meta[tiledb_uri] = meta
+            if missing:
+                listing_meta.update(
+                    self.__listing_meta(missing, fetch=fetch)
+                )
+
+            for notebook in arrays:
+                entries.append(
+                    ListingEntry(
+                        notebook.name,
+                        notebook.last_accessed,
+                        listing_meta.get(
+                            "tiledb://{}/{}".format(namespace, notebook.name)
+                        ),
                     )
-                    nbmodel["last_modified"] = notebook.last_accessed
-                    nbmodel["type"] = "notebook"
+                )
 
-                    if "write" not in notebook.allowed_actions:
-                        model["writable"] = False
-                    model["content"].append(nbmodel)
+                if "write" not in notebook.allowed_actions:
+                    model["writable"] = False
 
-        return model
+        return DirectoryListing(model, entries, DUMMY_CREATED_DATE)
 
     def __list_category(self, category, content=True):
         """
@@ -678,15 +1845,26 @@ class TileDBCloudContentsManager(TileDBContents, FileContentsManager, HasTraits)
         :param content:
         :return:
         """
+        model = base_directory_model(category)
+        model["path"] = "cloud/{}".format(category)
+        if not content:
+            # Listing the category is only needed for its content
+            model["format"] = None
+            return model
+
         arrays = []
         try:
             if category == "shared":
-                arrays = tiledb.cloud.client.list_shared_arrays(
-                    tag=[TAG_JUPYTER_NOTEBOOK]
+                arrays = self._remote(
+                    "list",
+                    tiledb.cloud.client.list_shared_arrays,
+                    tag=[TAG_JUPYTER_NOTEBOOK],
                 )
             elif category == "public":
-                arrays = tiledb.cloud.client.list_public_arrays(
-                    tag=[TAG_JUPYTER_NOTEBOOK]
+                arrays = self._remote(
+                    "list",
+                    tiledb.cloud.client.list_public_arrays,
+                    tag=[TAG_JUPYTER_NOTEBOOK],
                 )
         except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
             raise http_error(
@@ -697,191 +1875,614 @@ class TileDBCloudContentsManager(TileDBContents, FileContentsManager, HasTraits)
                 500, str(e),
             )
 
-        model = base_directory_model(category)
-        model["path"] = "cloud/{}".format(category)
-        if content:
-            model["format"] = "json"
-            model["content"] = []
-            namespaces = {}
-            if (arrays is None or len(arrays) == 0) and category == "owned":
-                # If the arrays are empty, and the category is for owned, we should list the user and their
-                # organizations so they can create new notebooks
-                try:
+        model["format"] = "json"
+        model["content"] = []
+        namespaces = {}
+        if (arrays is None or len(arrays) == 0) and category == "owned":
+            # If the arrays are empty, and the category is for owned, we should list the user and their
+            # organizations so they can create new notebooks
+            try:
+                with self._admission():
                     profile = tiledb.cloud.client.user_profile()
-                    namespace_model = base_directory_model(profile.username)
-                    namespace_model["path"] = "cloud/{}/{}".format(
-                        category, profile.username
-                    )
-                    namespaces[profile.username] = namespace_model
-
-                    for org in profile.organizations:
-                        # Don't list public for owned
-                        if org.organization_name == "public":
-                            continue
+                namespace_model = base_directory_model(profile.username)
+                namespace_model["path"] = "cloud/{}/{}".format(
+                    category, profile.username
+                )
+                namespaces[profile.username] = namespace_model
 
-                        namespace_model = base_directory_model(org.organization_name)
-                        namespace_model["path"] = "cloud/{}/{}".format(
-                            category, org.organization_name
-                        )
-                        namespaces[org.organization_name] = namespace_model
-                except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
-                    raise http_error(
-                        500,
-                        "Error listing notebooks in {}: {}".format(category, str(e)),
-                    )
-                except tiledb.TileDBError as e:
-                    raise http_error(
-                        500, str(e),
-                    )
+                for org in profile.organizations:
+                    # Don't list public for owned
+                    if org.organization_name == "public":
+                        continue
 
-            else:
-                for notebook in arrays:
-                    namespace_model = base_directory_model(notebook.namespace)
-                    namespace_model["writable"] = False
+                    namespace_model = base_directory_model(org.organization_name)
                     namespace_model["path"] = "cloud/{}/{}".format(
-                        category, notebook.namespace
+                        category, org.organization_name
                     )
-                    namespaces[notebook.namespace] = namespace_model
+                    namespaces[org.organization_name] = namespace_model
+            except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
+                raise http_error(
+                    500,
+                    "Error listing notebooks in {}: {}".format(category, str(e)),
+                )
+            except tiledb.TileDBError as e:
+                raise http_error(
+                    500, str(e),
+                )
+
+        else:
+            for notebook in arrays:
+                namespace_model = base_directory_model(notebook.namespace)
+                namespace_model["writable"] = False
+                namespace_model["path"] = "cloud/{}/{}".format(
+                    category, notebook.namespace
+                )
+                namespaces[notebook.namespace] = namespace_model
 
-            model["content"] = list(namespaces.values())
+        model["content"] = list(namespaces.values())
 
         return model
 
-    def __build_cloud_notebook_lists(self):
+    def __list_arrays(self, list_func, namespace):
+        """
+        List the notebook arrays of a namespace with their metadata
+        :param list_func: TileDB Cloud listing function of the category
+        :param namespace: namespace to list
+        :return: list of array infos
+        """
+        if self.__lists_with_metadata(list_func):
+            return self._remote(
+                "list",
+                list_func,
+                tag=[TAG_JUPYTER_NOTEBOOK],
+                namespace=namespace,
+                with_metadata=True,
+            )
+
+        # TileDB Cloud clients before with_metadata, listings then only show what is in memory
+        return self._remote(
+            "list", list_func, tag=[TAG_JUPYTER_NOTEBOOK], namespace=namespace
+        )
+
+    def __lists_with_metadata(self, list_func):
+        """
+        :param list_func: TileDB Cloud listing function
+        :return: True if the function can return the array metadata with the listing
+        """
+        supported = self._list_with_metadata.get(list_func)
+        if supported is None:
+            try:
+                supported = "with_metadata" in inspect.signature(list_func).parameters
+            except (TypeError, ValueError):
+                supported = False
+            self._list_with_metadata[list_func] = supported
+        return supported
+
+    def __listing_meta(self, tiledb_uris, fetch=True):
         """
-        Build a list of all notebooks across all categories
+        Get the listing metadata of arrays of a directory from memory. TileDB Cloud has no batch metadata call, so
+        with fetch the arrays which are not in memory yet are read in one batch with bulk_concurrency parallel reads
+        :param tiledb_uris: arrays of the directory
+        :param fetch: read the metadata of the arrays which are not in memory
+        :return: dict of URI to metadata, arrays whose metadata could not be read are left out
+        """
+        now = time.monotonic()
+        found = {}
+        missing = []
+        with self._listing_meta_lock:
+            for tiledb_uri in tiledb_uris:
+                entry = self._listing_meta.get(tiledb_uri)
+                if entry is not None and now - entry[0] <= self.listing_metadata_ttl:
+                    found[tiledb_uri] = entry[1]
+                else:
+                    missing.append(tiledb_uri)
+
+        if len(missing) == 0 or not fetch:
+            return found
+
+        # The reads are made with the priority class of the listing, and profiled with it
+        name = current_priority()
+        session = current_session()
+
+        def fetch(tiledb_uri):
+            try:
+                with priority(name), profile_thread(session):
+                    return self._remote("meta", self._read_meta, tiledb_uri)
+            except Exception as e:
+                # A listing is still useful without the metadata of some arrays
+                self.log.debug("Error reading metadata of %s: %s", tiledb_uri, e)
+                return None
+
+        workers = max(1, min(self.bulk_concurrency, len(missing)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            fetched = list(executor.map(fetch, missing))
+
+        for tiledb_uri, meta in zip(missing, fetched):
+            if meta is not None:
+                found[tiledb_uri] = self._remember_listing_meta(tiledb_uri, meta)
+
+        return found
+
+    def _remember_listing_meta(self, tiledb_uri, meta):
+        """
+        Keep the listing metadata of an array in memory
+        :param tiledb_uri: array
+        :param meta: array metadata, None to forget the array
+        :return: the kept metadata
+        """
+        with self._listing_meta_lock:
+            if meta is None:
+                self._listing_meta.pop(tiledb_uri, None)
+                return None
+
+            # Numpy scalars read from TileDB are stored as Python values so listings can be cached as JSON
+            meta = python_meta(
+                {key: meta[key] for key in LISTING_META_KEYS if key in meta}
+            )
+            self._listing_meta[tiledb_uri] = (time.monotonic(), meta)
+            return meta
+
+    def __cloud_category_models(self):
+        """
+        Build the directory stubs of the categories shown in the cloud folder, their notebooks are only listed when
+        a category is opened
         :return:
         """
+        models = []
+        for category in CATEGORIES:
+            model = base_directory_model(category)
+            model["path"] = "cloud/{}".format(category)
+            model["format"] = None
+            models.append(model)
 
-        ret = {
-            "owned": base_directory_model("owned"),
-            "public": base_directory_model("public"),
-            "shared": base_directory_model("shared"),
+        return models
+
+    def __cloud_enabled(self):
+        """
+        Check if notebook sharing is enabled for the user, the answer is cached for cloud_enabled_ttl seconds. An
+        expired answer restored from the snapshot is used once more while it is checked again in the background
+        :return:
+        """
+        now = time.time()
+        if self._cloud_enabled_restored:
+            self._cloud_enabled_restored = False
+            if now - self._cloud_enabled[1] > self.cloud_enabled_ttl:
+                threading.Thread(
+                    target=self.__refresh_cloud_enabled,
+                    name="tiledbcontents-profile-refresh",
+                    daemon=True,
+                ).start()
+                return self._cloud_enabled[0]
+
+        if (
+            self._cloud_enabled is None
+            or now - self._cloud_enabled[1] > self.cloud_enabled_ttl
+        ):
+            with self._admission():
+                self._cloud_enabled = (get_cloud_enabled(), now)
+
+        return self._cloud_enabled[0]
+
+    def __refresh_cloud_enabled(self):
+        try:
+            with priority(BACKGROUND), self._admission():
+                self._cloud_enabled = (get_cloud_enabled(), time.time())
+        except Exception as e:
+            # The next check is made on the request path
+            self.log.debug("Error checking the user profile: %s", e)
+            self._cloud_enabled = None
+
+    def save_snapshot(self):
+        """
+        Save the user profile check, the listings and the listing metadata kept in memory to snapshot_path, if
+        it is configured
+        :return:
+        """
+        if self._snapshot is None:
+            return
+
+        now, monotonic_now = time.time(), time.monotonic()
+        # Monotonic times do not survive a restart, they are saved as wall clock times
+        with self._listings_lock:
+            listings = {
+                path: [
+                    now - (monotonic_now - entry.fetched),
+                    dump_listing(entry.listing),
+                ]
+                for path, entry in self._listings.items()
+            }
+        with self._listing_meta_lock:
+            listing_meta = {
+                tiledb_uri: [now - (monotonic_now - fetched), meta]
+                for tiledb_uri, (fetched, meta) in self._listing_meta.items()
+            }
+
+        state = {
+            "user": self.shared_cache_user,
+            "cloud_enabled": self._cloud_enabled,
+            "listings": listings,
+            "listing_meta": listing_meta,
         }
         try:
-            owned_notebooks = tiledb.cloud.client.list_arrays(tag=[TAG_JUPYTER_NOTEBOOK])
-            shared_notebooks = tiledb.cloud.client.list_shared_arrays(
-                tag=[TAG_JUPYTER_NOTEBOOK]
-            )
-            public_notebooks = tiledb.cloud.client.list_public_arrays(
-                tag=[TAG_JUPYTER_NOTEBOOK]
+            self._snapshot.save(state)
+        except (OSError, TypeError) as e:
+            self.log.warning("Error saving snapshot %s: %s", self.snapshot_path, e)
+
+    def __save_snapshots(self):
+        while True:
+            time.sleep(self.snapshot_interval)
+            self.save_snapshot()
+
+    def __restore_snapshot(self):
+        """
+        Restore the state saved by save_snapshot, if it was saved for the same user less than snapshot_max_age
+        seconds ago. Listing metadata and listings keep their age. Listings older than listing_max_staleness are
+        not restored, the others are restored as stale so they are refreshed in the background once served
+        :return:
+        """
+        loaded = self._snapshot.load(self.snapshot_max_age)
+        if loaded is None:
+            return
+        state, saved_at = loaded
+        if state.get("user") != self.shared_cache_user:
+            return
+
+        if state.get("cloud_enabled") is not None:
+            self._cloud_enabled = tuple(state["cloud_enabled"])
+            self._cloud_enabled_restored = True
+
+        now, monotonic_now = time.time(), time.monotonic()
+        with self._listing_meta_lock:
+            for tiledb_uri, (fetched, meta) in state.get("listing_meta", {}).items():
+                age = now - fetched
+                if age <= self.listing_metadata_ttl:
+                    self._listing_meta[tiledb_uri] = (monotonic_now - age, meta)
+
+        if not self.listing_stale_while_revalidate:
+            return
+        restored = 0
+        with self._listings_lock:
+            for path, (fetched, value) in state.get("listings", {}).items():
+                age = now - fetched
+                if age > self.listing_max_staleness:
+                    continue
+                age = max(age, self.listing_refresh_interval + 1)
+                self._listings[path] = CachedListing(
+                    load_listing(value, DUMMY_CREATED_DATE),
+                    self.__list_directory(CloudPath.parse(path), True),
+                    monotonic_now - age,
+                )
+                restored += 1
+        self.log.info(
+            "Restored %d listings from the snapshot saved %.0fs ago",
+            restored,
+            now - saved_at,
+        )
+
+    def __replay_journal_entry(self, tiledb_uri, data, meta):
+        """
+        Write a journaled save to TileDB Cloud
+        :param tiledb_uri: array to write to
+        :param data: journaled bytes
+        :param meta: journaled metadata
+        :return:
+        """
+        with priority(BACKGROUND):
+            self._write_contents(
+                tiledb_uri, numpy.frombuffer(data, dtype=numpy.uint8), meta
             )
 
-            ret["owned"]["path"] = "cloud/owned"
-            ret["public"]["path"] = "cloud/public"
-            ret["shared"]["path"] = "cloud/shared"
-
-            if owned_notebooks is not None:
-                if len(owned_notebooks) > 0:
-                    ret["owned"]["format"] = "json"
-                    ret["owned"]["content"] = []
-                    for notebook in owned_notebooks:
-                        model = base_model(notebook.name)
-                        model["type"] = "notebook"
-                        model["last_modified"] = notebook.last_accessed
-                        # Add notebook extension to path, so jupyterlab will open with as a notebook
-                        # It seems to check the extension even though we set the "type" parameter
-                        model["path"] = "cloud/{}/{}{}".format(
-                            "owned", model["path"], NOTEBOOK_EXT
-                        )
-                        ret["owned"]["content"].append(model)
-
-            if shared_notebooks is not None:
-                if len(shared_notebooks) > 0:
-                    ret["shared"]["format"] = "json"
-                    ret["shared"]["content"] = []
-                    for notebook in shared_notebooks:
-                        model = base_model(notebook.name)
-                        model["type"] = "notebook"
-                        model["last_modified"] = notebook.last_accessed
-                        # Add notebook extension to path, so jupyterlab will open with as a notebook
-                        # It seems to check the extension even though we set the "type" parameter
-                        model["path"] = "cloud/{}/{}{}".format(
-                            "shared", model["path"], NOTEBOOK_EXT
-                        )
-                        ret["shared"]["content"].append(model)
-
-            if public_notebooks is not None:
-                if len(public_notebooks) > 0:
-                    ret["public"]["format"] = "json"
-                    ret["public"]["content"] = []
-                    for notebook in public_notebooks:
-                        model = base_model(notebook.name)
-                        model["type"] = "notebook"
-                        model["last_modified"] = notebook.last_accessed
-                        # Add notebook extension to path, so jupyterlab will open with as a notebook
-                        # It seems to check the extension even though we set the "type" parameter
-                        model["path"] = "cloud/{}/{}{}".format(
-                            "public", model["path"], NOTEBOOK_EXT
-                        )
-                        ret["public"]["content"].append(model)
-        except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
-            raise http_error(
-                500, "Error building cloud notebook info: {}".format(str(e))
+    def __crawl_search_index(self):
+        """
+        Periodically index the notebooks which were accessed since they were last indexed
+        :return:
+        """
+        categories = ["owned", "shared"]
+        if self.search_crawl_public:
+            categories.append("public")
+
+        with priority(BACKGROUND):
+            while True:
+                # The first crawl waits too, so it does not compete with the server startup
+                time.sleep(self.search_crawl_interval)
+                for category in categories:
+                    try:
+                        self.__crawl_category(category)
+                    except Exception as e:
+                        self.log.warning("Error crawling %s notebooks: %s", category, e)
+
+    def __crawl_category(self, category):
+        """
+        Index the notebooks of a category which changed since they were indexed
+        :param category: owned, shared or public
+        :return:
+        """
+        if category == "owned":
+            arrays = self._remote(
+                "list", tiledb.cloud.client.list_arrays, tag=[TAG_JUPYTER_NOTEBOOK]
             )
-        except tiledb.TileDBError as e:
-            raise http_error(
-                500, str(e),
+        elif category == "shared":
+            arrays = self._remote(
+                "list",
+                tiledb.cloud.client.list_shared_arrays,
+                tag=[TAG_JUPYTER_NOTEBOOK],
+            )
+        else:
+            arrays = self._remote(
+                "list",
+                tiledb.cloud.client.list_public_arrays,
+                tag=[TAG_JUPYTER_NOTEBOOK],
             )
 
-        return list(ret.values())
+        indexed_at = self._search_index.indexed_at()
+        for notebook in arrays or []:
+            tiledb_uri = "tiledb://{}/{}".format(notebook.namespace, notebook.name)
+            # Reading an array updates last_accessed, so it is compared with the time the array was indexed at
+            if (
+                notebook.last_accessed is not None
+                and tiledb_uri in indexed_at
+                and notebook.last_accessed.timestamp() <= indexed_at[tiledb_uri]
+            ):
+                continue
+
+            try:
+                contents, meta = self._read_array(tiledb_uri)
+            except (
+                tiledb.TileDBError,
+                tiledb.cloud.tiledb_cloud_error.TileDBCloudError,
+                HTTPError,
+            ) as e:
+                # One unreadable notebook, e.g. no longer shared or timed out, does not stop the crawl
+                self.log.debug("Not indexing %s: %s", tiledb_uri, e)
+                continue
+            if contents is not None:
+                path = "cloud/{}/{}/{}".format(
+                    category, notebook.namespace, notebook.name
+                )
+                self._search_index.update(tiledb_uri, path, contents.tobytes())
 
-    def __category_from_path(self, path):
+    def metrics(self):
         """
-        Get the category from a cloud path
-        :param path:
+        Counters of the contents manager, exposed by the metrics endpoint
+        :return: dict
+        """
+        scheduler = {}
+        if self._scheduler is not None:
+            scheduler = self._scheduler.metrics()
+        journal = {}
+        if self._journal is not None:
+            journal = self._journal.metrics()
+        return {
+            "remote": self._remote_calls.metrics(),
+            "scheduler": scheduler,
+            "journal": journal,
+        }
+
+    def search(self, query, limit=50):
+        """
+        Search the local index of cloud notebooks, no TileDB Cloud request is made
+        :param query: free text query, every word must match cell sources, markdown, kernel name or notebook name
+        :param limit: maximum number of results
+        :return: list of results, best match first
+        """
+        if self._search_index is None:
+            raise http_error(400, "The search index is not enabled")
+        if limit < 0:
+            raise http_error(400, "limit must not be negative")
+
+        results = self._search_index.search(query, limit)
+        for result in results:
+            # Add notebook extension to path, so jupyterlab will open with as a notebook
+            result["path"] += NOTEBOOK_EXT
+        return results
+
+    def __revalidated_listing(self, path, list_directory):
+        """
+        List a cloud directory, with stale-while-revalidate the last known listing is served while it is younger
+        than listing_max_staleness and refreshed in the background once it is older than listing_refresh_interval
+        :param path: cloud path of the directory
+        :param list_directory: function building the directory model or DirectoryListing
+        :return: directory model or DirectoryListing
+        """
+        if not self.listing_stale_while_revalidate:
+            return self.__cached_listing(path, list_directory)
+
+        now = time.monotonic()
+        with self._listings_lock:
+            entry = self._listings.get(path)
+            if entry is not None and now - entry.fetched <= self.listing_max_staleness:
+                entry.requested = now
+                if now - entry.fetched > self.listing_refresh_interval:
+                    self.__schedule_refresh(path, entry, LISTING)
+                return entry.listing
+            generation = self._listings_generation
+
+        listing = self.__cached_listing(path, list_directory)
+        self.__keep_listing(path, listing, list_directory, generation)
+        return listing
+
+    def __keep_listing(self, path, listing, list_directory, generation):
+        """
+        Keep a fetched listing in memory, unless the listings changed since the fetch started
+        :param generation: listings generation when the fetch started
         :return:
         """
-        parts = path.split(os.sep)
-        if len(parts) == 0:
-            parts = path.split("/")
+        with self._listings_lock:
+            if generation != self._listings_generation:
+                return
+            entry = self._listings.get(path)
+            if entry is None:
+                self._listings[path] = CachedListing(
+                    listing, list_directory, time.monotonic()
+                )
+            else:
+                entry.listing = listing
+                entry.fetched = time.monotonic()
 
-        if parts[0] == "cloud" and len(parts) > 1:
-            return parts[1]
+    def __schedule_refresh(self, path, entry, name):
+        """
+        Refresh a listing in the background, must be called with the listings lock held
+        :param path: cloud path of the directory
+        :param entry: CachedListing
+        :param name: priority class of the refresh
+        :return:
+        """
+        if entry.refreshing:
+            return
+        entry.refreshing = True
+        self._refresh_executor.submit(
+            self.__refresh_listing, path, entry, self._listings_generation, name
+        )
 
-        return None
+    def __refresh_listing(self, path, entry, generation, name):
+        try:
+            with priority(name):
+                listing = self.__cached_listing(
+                    path, entry.list_directory, refresh=True
+                )
+            self.__keep_listing(path, listing, entry.list_directory, generation)
+        except Exception as e:
+            # The stale listing is served until listing_max_staleness, then fetched on the request path
+            self.log.debug("Error refreshing listing of %s: %s", path, e)
+        finally:
+            with self._listings_lock:
+                entry.refreshing = False
 
-    def __namespace_from_path(self, path):
+    def __refresh_open_listings(self):
         """
-        Get the namespace from a cloud path
-        :param path:
+        Refresh the listings of the folders users have open before they are listed again, and forget the others
         :return:
         """
-        parts = path.split(os.sep)
-        if len(parts) == 1:
-            parts = path.split("/")
+        while True:
+            time.sleep(max(1, self.listing_refresh_interval / 2.0))
+            now = time.monotonic()
+            with self._listings_lock:
+                for path, entry in list(self._listings.items()):
+                    if now - entry.requested > self.listing_max_staleness:
+                        del self._listings[path]
+                    elif (
+                        now - entry.requested <= OPEN_LISTING_WINDOW
+                        and now - entry.fetched >= self.listing_refresh_interval
+                    ):
+                        self.__schedule_refresh(path, entry, BACKGROUND)
 
-        if parts[0] == "cloud" and len(parts) > 2:
-            return parts[2]
+    def __cached_listing(self, path, list_directory, refresh=False):
+        """
+        List a cloud directory through the shared cache, entries are isolated per user and signed with their secret
+        :param path: cloud path of the directory
+        :param list_directory: function building the directory model or DirectoryListing
+        :param refresh: list the directory even if the shared cache has it, and update the cache
+        :return: directory model or DirectoryListing
+        """
+        if self._shared_cache is None:
+            return list_directory()
 
-        return None
+        key = "listing:{}".format(path)
+        entry = None
+        if not refresh:
+            try:
+                entry = self._shared_cache.get(key, scope=self.shared_cache_user)
+            except sqlite3.Error as e:
+                # A locked or broken cache is a cache miss
+                self.log.warning("Error reading the shared cache: %s", e)
+        if entry is not None:
+            return load_listing(entry[0], DUMMY_CREATED_DATE)
+
+        listing = list_directory()
+        try:
+            self._shared_cache.set(
+                key,
+                self.listing_cache_ttl,
+                value=dump_listing(listing),
+                scope=self.shared_cache_user,
+            )
+        except sqlite3.Error as e:
+            self.log.warning("Error writing the shared cache: %s", e)
+        return listing
 
-    def __directory_model_from_path(self, path, content=False):
+    def _listings_changed(self):
+        """
+        Drop the cached listings of the user after a change. Bulk operations do this once when they are done
+        :return:
+        """
+        if getattr(self._bulk_local, "active", False):
+            return
+
+        # Listings which started before the change must not be shared with later callers or served again
+        self._remote_calls.detach(kind="list")
+        with self._listings_lock:
+            self._listings.clear()
+            self._listings_generation += 1
+        if self._shared_cache is not None:
+            try:
+                self._shared_cache.invalidate("listing:", scope=self.shared_cache_user)
+            except sqlite3.Error as e:
+                self.log.warning("Error invalidating the shared cache: %s", e)
+
+    def __directory_model_from_path(self, path, content=False, compact=False):
+        """
+        Build the model of a cloud directory
+        :param path: cloud path of the directory
+        :param content: include the directory content
+        :param compact: return namespace listings as DirectoryListing instead of a model
+        :return: directory model or DirectoryListing
+        """
         # if self.vfs.is_dir(path):
         #     lstat = self.fs.lstat(path)
         #     if "ST_MTIME" in lstat and lstat["ST_MTIME"]:
         model = base_directory_model(path)
         model["last_modified"] = model["created"] = DUMMY_CREATED_DATE
-        if not self._is_remote_path(path) and not self._is_remote_dir(path):
+        cloud_path = CloudPath.parse(path)
+        if not cloud_path.is_remote:
             return super()._dir_model(path, content)
 
         if path == "cloud":
-            cloud = base_directory_model("cloud")
-            cloud["format"] = "json"
-            cloud["content"] = self.__build_cloud_notebook_lists()
-            # model["content"] = [cloud]
-            model = cloud
+            model = base_directory_model("cloud")
+            if content:
+                model["content"] = self.__cloud_category_models()
+            else:
+                model["format"] = None
         else:
-            category = self.__category_from_path(path)
-            namespace = self.__namespace_from_path(path)
-
-            if namespace is None:
-                model = self.__list_category(category, content)
-            elif category is not None and namespace is not None:
-                model = self.__list_namespace(category, namespace, content)
+            list_directory = self.__list_directory(cloud_path, content)
+            if content:
+                with priority(LISTING):
+                    model = self.__revalidated_listing(cloud_path.path, list_directory)
+            else:
+                model = list_directory()
 
+        if isinstance(model, DirectoryListing) and not compact:
+            return model.to_model()
         return model
 
+    def __list_directory(self, cloud_path, content):
+        """
+        :param cloud_path: CloudPath of a category or namespace
+        :param content: include the directory content
+        :return: function building the directory model or DirectoryListing
+        """
+        if cloud_path.namespace is None:
+            return functools.partial(self.__list_category, cloud_path.category, content)
+        return functools.partial(
+            self.__list_namespace, cloud_path.category, cloud_path.namespace, content
+        )
+
+    def get_listing(self, path):
+        """
+        Get a directory for streaming: cloud namespaces are returned as DirectoryListing, whose JSON can be encoded
+        a chunk at a time, other directories as their model
+        :param path: path of the directory
+        :return: DirectoryListing or directory model
+        """
+        cloud_path = CloudPath.parse(path.strip("/"))
+        if not cloud_path.is_remote:
+            return self.get(path, content=True, type="directory")
+        if not cloud_path.is_dir:
+            raise http_error(400, "{} is not a directory".format(path))
+
+        return self.__directory_model_from_path(
+            cloud_path.path, content=True, compact=True
+        )
+
     def __group_to_models(self, path_prefix, paths):
         """
         Applies _notebook_model_from_s3_path or _file_model_from_s3_path to each entry of `paths`,
@@ -905,40 +2506,93 @@ class TileDBCloudContentsManager(TileDBContents, FileContentsManager, HasTraits)
                 HTTPError(500, "Unknown file type %s for file '%s'" % (type_, path))
         return ret
 
-    def get(self, path, content=True, type=None, format=None):
-        """Get a file or directory model."""
+    def current_hash(self, path):
+        """
+        Current content hash of a file or notebook, cloud contents are not read, only their metadata
+        :param path: path of the file or notebook
+        :return: hex digest with the HASH_ALGORITHM, None for directories and arrays saved without a hash
+        """
+        cloud_path = CloudPath.parse(path.strip("/"))
+        if not cloud_path.is_remote:
+            os_path = self._get_os_path(path.strip("/"))
+            if not os.path.isfile(os_path):
+                return None
+            digest = hashlib.new(HASH_ALGORITHM)
+            with open(os_path, "rb") as f:
+                for chunk in iter(lambda: f.read(self.download_chunk_size), b""):
+                    digest.update(chunk)
+            return digest.hexdigest()
+
+        if cloud_path.is_dir:
+            return None
+
+        tiledb_uri = cloud_path.tiledb_uri
+        meta = None
+        if self._journal is not None:
+            meta = self._journal.latest_meta(tiledb_uri)
+        if meta is None:
+            try:
+                meta = self._remote("meta", self._read_meta, tiledb_uri)
+            except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
+                raise http_error(500, "Error getting hash: {}".format(str(e)))
+            except tiledb.TileDBError as e:
+                raise http_error(
+                    500, str(e),
+                )
+            self._remember_listing_meta(tiledb_uri, meta)
+
+        return meta.get("content_hash")
+
+    @profiled("get")
+    def get(self, path, content=True, type=None, format=None, require_hash=False):
+        """
+        Get a file or directory model.
+
+        Models of cloud notebooks and files read with their contents carry the hash of their contents, like the
+        hash field of newer Jupyter servers. With require_hash it is also added to models without contents.
+        """
         path_fixed = path.strip("/")
 
         if path_fixed == "" or path_fixed is None:
             path_fixed = "."
 
-        if not self._is_remote_path(path_fixed):
+        cloud_path = CloudPath.parse(path_fixed)
+        if not cloud_path.is_remote:
             model = super().get(path, content, type, format)
-            if path_fixed == "." and content and get_cloud_enabled():
+            if path_fixed == "." and content and self.__cloud_enabled():
+                # The cloud folder is a stub, its contents are only fetched when it is opened
                 cloud = base_directory_model("cloud")
-                cloud["content"] = self.__build_cloud_notebook_lists()
+                cloud["format"] = None
                 model["content"].append(cloud)
+            if require_hash and model["type"] != "directory":
+                model["hash"] = self.current_hash(path)
+                model["hash_algorithm"] = HASH_ALGORITHM
 
             return model
 
-        if path_fixed.endswith(NOTEBOOK_EXT):
-            path_fixed = path_fixed[: -1 * len(NOTEBOOK_EXT)]
+        path_fixed = cloud_path.path
 
         if type is None:
-            if self._is_remote_dir(path_fixed):
+            if cloud_path.is_dir:
                 type = "directory"
             else:
                 type = self.guess_type(path, allow_directory=True)
 
-        if type == "notebook":
-            return self._notebook_from_array(path_fixed, content)
-        elif type == "file":
-            return self._file_from_array(path_fixed, content, format)
+        if type in ("notebook", "file"):
+            if type == "notebook":
+                model = self._notebook_from_array(path_fixed, content)
+            else:
+                model = self._file_from_array(path_fixed, content, format)
+            if require_hash and "hash" not in model:
+                model["hash"] = self.current_hash(path_fixed)
+                model["hash_algorithm"] = HASH_ALGORITHM
+            return model
         elif type == "directory":
             return self.__directory_model_from_path(path_fixed, content)
             # if model is not None:
             #     model.
 
+    @profiled("save")
     def save(self, model, path=""):
         """
         Save a file or directory model to path.
@@ -960,29 +2614,27 @@ class TileDBCloudContentsManager(TileDBContents, FileContentsManager, HasTraits)
         if model["type"] not in ("directory", "file", "notebook"):
             raise http_error(400, "Unhandled contents type: %s" % model["type"])
 
-        if not self._is_remote_path(path_fixed):
+        cloud_path = CloudPath.parse(path_fixed)
+        if not cloud_path.is_remote:
             return super().save(model, path)
 
-        if path_fixed.endswith(NOTEBOOK_EXT):
-            path_fixed = path_fixed[: -1 * len(NOTEBOOK_EXT)]
-
-        self._is_new = True
-        if 'language_info' in model['content']['metadata']:
-            self._is_new = False
+        path_fixed = cloud_path.path
 
         validation_message = None
         try:
             if model["type"] == "notebook":
-                final_name, validation_message = self._save_notebook_tiledb(model, path_fixed)
-                if final_name is not None:
-                    parts = path.split("/")
-                    parts_length = len(parts)
-                    parts[parts_length - 1] = final_name
-                    path = "/".join(parts)
+                # Notebooks which were never run by a kernel have not been saved to an array yet
+                is_new = "language_info" not in model["content"]["metadata"]
+                with self._path_locks.hold(cloud_path.tiledb_uri):
+                    result, validation_message = self._save_notebook_tiledb(
+                        model, path_fixed, is_new
+                    )
             elif model["type"] == "file":
-                validation_message = self._save_file_tiledb(model, path_fixed)
+                with self._path_locks.hold(cloud_path.tiledb_uri):
+                    is_new = not self._array_exists(path_fixed)
+                    result = self._save_file_tiledb(model, path_fixed, is_new)
             else:
-                if self._is_remote_path(path_fixed):
+                if cloud_path.is_remote:
                     raise http_error(
                         400,
                         "Trying to create unsupported type: %s in cloud"
@@ -995,22 +2647,52 @@ class TileDBCloudContentsManager(TileDBContents, FileContentsManager, HasTraits)
             self.log.error("Error while saving file: %s %s", path, e, exc_info=True)
             raise e
 
-        model = self.get(path, type=model["type"], content=False)
+        if result.array_name is not None:
+            self._listings_changed()
+            path_fixed = "{}/{}".format(
+                path_fixed.rsplit("/", 1)[0], result.array_name
+            )
+
+        self._remember_listing_meta(result.tiledb_uri, result.meta)
+
+        if self._shared_cache is not None:
+            # Public notebooks are cached by their URI, the owner must see their own save
+            try:
+                self._shared_cache.invalidate("array:{}".format(result.tiledb_uri))
+            except sqlite3.Error as e:
+                self.log.warning("Error invalidating the shared cache: %s", e)
+
+        if self._search_index is not None and model["type"] == "notebook":
+            self._search_index.update(result.tiledb_uri, path_fixed, model["content"])
+
+        # Build the returned model from the write, there is nothing left to fetch
+        saved = base_model(path_fixed)
+        saved["type"] = model["type"]
+        saved["last_modified"] = result.last_modified
+        add_listing_meta(saved, result.meta)
+        if model["type"] == "file":
+            saved["mimetype"] = model.get("mimetype")
         if validation_message is not None:
-            model["message"] = validation_message
-        return model
+            saved["message"] = validation_message
+        return saved
 
+    @profiled("delete")
     def delete_file(self, path):
         """Delete the file or directory at path."""
-        path_fixed = path.strip("/")
-        if self._is_remote_path(path_fixed):
-
-            if path_fixed.endswith(NOTEBOOK_EXT):
-                path_fixed = path_fixed[: -1 * len(NOTEBOOK_EXT)]
-
-            tiledb_uri = self.tiledb_uri_from_path(path_fixed)
+        cloud_path = CloudPath.parse(path)
+        if cloud_path.is_remote:
+            tiledb_uri = cloud_path.tiledb_uri
+            if self._journal is not None:
+                self._journal.discard(tiledb_uri)
             try:
-                return tiledb.cloud.array.deregister_array(tiledb_uri)
+                with self._admission():
+                    deregistered = tiledb.cloud.array.deregister_array(tiledb_uri)
+                self._listings_changed()
+                self._remember_listing_meta(tiledb_uri, None)
+                self._remote_calls.detach(arg=tiledb_uri)
+                if self._search_index is not None:
+                    self._search_index.remove(tiledb_uri)
+                return deregistered
             except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
                 raise http_error(
                     500, "Error deregistering {}: ".format(tiledb_uri, str(e))
@@ -1022,31 +2704,365 @@ class TileDBCloudContentsManager(TileDBContents, FileContentsManager, HasTraits)
         else:
             return super().delete_file(path)
 
+    @profiled("rename", path_arg="old_path")
     def rename_file(self, old_path, new_path):
         """Rename a file or directory."""
-        old_path_fixed = old_path.strip("/")
-        if self._is_remote_path(old_path_fixed):
-
-            if old_path_fixed.endswith(NOTEBOOK_EXT):
-                old_path_fixed = old_path_fixed[: -1 * len(NOTEBOOK_EXT)]
+        old_cloud_path = CloudPath.parse(old_path)
+        if old_cloud_path.is_remote:
+            tiledb_uri = old_cloud_path.tiledb_uri
+            new_cloud_path = CloudPath.parse(new_path)
+            # Array names do not have the notebook extension the contents API adds to them
+            array_name_new = new_cloud_path.name
+            if old_cloud_path.name is None or array_name_new is None:
+                raise http_error(
+                    400,
+                    "Can not rename {} to {}, only notebooks and files can be renamed".format(
+                        old_path, new_path
+                    ),
+                )
+            if new_cloud_path.namespace != old_cloud_path.namespace:
+                raise http_error(
+                    400,
+                    "Can not move {} to another namespace than {}".format(
+                        old_path, old_cloud_path.namespace
+                    ),
+                )
 
-            tiledb_uri = self.tiledb_uri_from_path(old_path_fixed)
-            parts_new= new_path.split("/")
-            parts_new_length = len(parts_new)
-            array_name_new =  parts_new[parts_new_length - 1]
+            if self._journal is not None and not self._journal.wait(
+                tiledb_uri, self.journal_wait_timeout
+            ):
+                raise http_error(
+                    409, "{} has saves which are not written yet".format(tiledb_uri)
+                )
 
             try:
-                tiledb.cloud.notebook.rename_notebook(uri=tiledb_uri, notebook_name=array_name_new)
+                with self._admission():
+                    tiledb.cloud.notebook.rename_notebook(uri=tiledb_uri, notebook_name=array_name_new)
+                self._listings_changed()
+                self._remember_listing_meta(tiledb_uri, None)
+                self._remote_calls.detach(arg=tiledb_uri)
+                if self._search_index is not None:
+                    self._search_index.move(
+                        tiledb_uri, new_cloud_path.tiledb_uri, new_cloud_path.path
+                    )
             except tiledb.cloud.tiledb_cloud_error.TileDBCloudError as e:
                 raise http_error(
-                    500, "Error renaming {}: ".format(tiledb_uri, str(e))
+                    500, "Error renaming {}: {}".format(tiledb_uri, str(e))
                 )
             except tiledb.TileDBError as e:
                 raise http_error(
                     500, str(e),
                 )
         else:
-            return super().rename(old_path, new_path)
+            return super().rename_file(old_path, new_path)
+
+    def __run_bulk(self, func, items, changes_listings=True):
+        """
+        Run an operation over many items with bounded parallelism
+        :param func: function called with each item, returns the per-item result
+        :param items: items to process
+        :param changes_listings: drop the cached listings once the operation is done
+        :return: list of per-item results, in the same order as items
+        """
+
+        def run(item):
+            # Listing caches are refreshed once the whole batch is done
+            self._bulk_local.active = True
+            try:
+                # Bulk operations must not hold up interactive saves and opens
+                with priority(BACKGROUND):
+                    return func(item)
+            except HTTPError as e:
+                message = e.log_message % e.args if e.log_message else e.reason
+                return dict(ok=False, code=e.status_code, error=message)
+            except Exception as e:
+                return dict(ok=False, code=500, error=str(e))
+
+        if len(items) == 0:
+            return []
+
+        workers = max(1, min(self.bulk_concurrency, len(items)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run, items))
+
+        if changes_listings:
+            self._listings_changed()
+        return results
+
+    def bulk_delete(self, paths):
+        """
+        Delete many files concurrently
+        :param paths: list of paths to delete
+        :return: list of per-path results
+        """
+
+        def delete(path):
+            self.delete(path)
+            return dict(path=path, ok=True)
+
+        results = self.__run_bulk(delete, paths)
+        for path, result in zip(paths, results):
+            result.setdefault("path", path)
+        return results
+
+    def bulk_rename(self, pairs):
+        """
+        Rename many files concurrently
+        :param pairs: list of (old_path, new_path) pairs
+        :return: list of per-pair results
+        """
+
+        def rename(pair):
+            old_path, new_path = pair
+            self.rename(old_path, new_path)
+            return dict(path=old_path, to=new_path, ok=True)
+
+        results = self.__run_bulk(rename, pairs)
+        for (old_path, new_path), result in zip(pairs, results):
+            result.setdefault("path", old_path)
+            result.setdefault("to", new_path)
+        return results
+
+    def bulk_copy(self, pairs):
+        """
+        Copy many files concurrently
+        :param pairs: list of (from_path, to_path) pairs, to_path may be None or a directory
+        :return: list of per-pair results, "to" is the path of the new copy
+        """
+
+        def copy(pair):
+            from_path, to_path = pair
+            model = self.copy(from_path, to_path)
+            return dict(path=from_path, to=model["path"], ok=True)
+
+        results = self.__run_bulk(copy, pairs)
+        for (from_path, to_path), result in zip(pairs, results):
+            result.setdefault("path", from_path)
+            result.setdefault("to", to_path)
+        return results
+
+    def __archive_paths(self, cloud_path):
+        """
+        List the arrays of a cloud category or namespace to export, with the content hash shown in their listing
+        :param cloud_path: CloudPath of a category or namespace
+        :return: list of (cloud path, content hash or None) tuples
+        """
+        if cloud_path.namespace is not None:
+            namespaces = [cloud_path.namespace]
+        else:
+            model = self.__list_category(cloud_path.category, content=True)
+            namespaces = [namespace["name"] for namespace in model["content"]]
+
+        paths = []
+        for namespace in namespaces:
+            listing = self.__list_namespace(cloud_path.category, namespace, content=True)
+            for entry in listing.entries:
+                paths.append(
+                    (
+                        "{}/{}".format(listing.model["path"], entry.name),
+                        (entry.meta or {}).get("content_hash"),
+                    )
+                )
+        return paths
+
+    @staticmethod
+    def __archive_stats(results, skipped, started):
+        """
+        :param results: per-array results of __run_bulk
+        :param skipped: arrays skipped as already done
+        :param started: monotonic time the operation started at
+        :return: dict of counts, bytes, seconds, throughput and failures
+        """
+        seconds = time.monotonic() - started
+        done = [result for result in results if result.get("ok")]
+        size = sum(result["size"] for result in done)
+        return dict(
+            notebooks=len(done),
+            skipped=skipped,
+            failed=[result for result in results if not result.get("ok")],
+            bytes=size,
+            seconds=seconds,
+            notebooks_per_second=len(done) / seconds if seconds > 0 else 0.0,
+            mb_per_second=size / 1e6 / seconds if seconds > 0 else 0.0,
+        )
+
+    def export_archive(self, path, directory):
+        """
+        Export the raw contents and metadata of all notebooks and files of a cloud category or namespace to a local
+        archive, with bulk_concurrency parallel reads. Only notebooks with deduplicated outputs are parsed, their
+        outputs are inlined so the archive is self-contained. Arrays already in the archive with the content hash of
+        their listing are skipped, so an interrupted export is resumed by running it again
+        :param path: cloud path of a category or namespace, e.g. cloud/owned/<namespace>
+        :param directory: local directory of the archive
+        :return: dict of counts, bytes, seconds, throughput and failures
+        """
+        started = time.monotonic()
+        cloud_path = CloudPath.parse(path)
+        if not cloud_path.is_dir or cloud_path.category is None:
+            raise http_error(
+                400, "Only a cloud category or namespace can be exported: {}".format(path)
+            )
+
+        archive = NotebookArchive(directory)
+        exported = archive.exported()
+        with priority(BACKGROUND):
+            paths = self.__archive_paths(cloud_path)
+
+        pending = []
+        for array_path, content_hash in paths:
+            record = exported.get(array_path)
+            if record is None or (
+                content_hash is not None
+                and record["meta"].get(
+                    "stored_content_hash", record["meta"].get("content_hash")
+                )
+                != content_hash
+            ):
+                pending.append(array_path)
+
+        def export(array_path):
+            contents, meta = self._read_array(CloudPath.parse(array_path).tiledb_uri)
+            stored_hash = meta.get("content_hash")
+            # Archives are self-contained, deduplicated outputs are inlined. The hash of the stored notebook is
+            # kept to skip it on the next export
+            contents, meta = self._self_contained(contents, meta)
+            if meta.get("content_hash") != stored_hash:
+                meta = dict(meta, stored_content_hash=stored_hash)
+            record = archive.write(array_path, contents, meta)
+            return dict(path=array_path, ok=True, size=record["size"])
+
+        results = self.__run_bulk(export, pending, changes_listings=False)
+        for array_path, result in zip(pending, results):
+            result.setdefault("path", array_path)
+        return self.__archive_stats(results, len(paths) - len(pending), started)
+
+    def import_archive(self, directory, to_path=None):
+        """
+        Import the arrays of a local archive as new arrays, with bulk_concurrency parallel writes. The notebooks
+        are only parsed to inline the outputs of archives exported with references to an output store, their
+        contents are checked against the content hash in their metadata. Existing arrays
+        are not overwritten, the names of imported arrays are incremented when they are taken. Imports are logged
+        in the archive, so an interrupted import is resumed by running it again
+        :param directory: local directory of the archive
+        :param to_path: cloud path of the namespace to import to, None for the namespaces the arrays came from
+        :return: dict of counts, bytes, seconds, throughput and failures
+        """
+        started = time.monotonic()
+        if to_path is not None:
+            to_cloud_path = CloudPath.parse(to_path)
+            if not to_cloud_path.is_dir or to_cloud_path.namespace is None:
+                raise http_error(
+                    400, "Archives are imported to a namespace: {}".format(to_path)
+                )
+            to_path = to_cloud_path.path
+        if not os.path.isdir(directory):
+            raise http_error(404, "No archive at {}".format(directory))
+
+        archive = NotebookArchive(directory)
+        imported = archive.imported(to_path)
+        records = archive.exported()
+        pending = [
+            record for path, record in records.items() if path not in imported
+        ]
+
+        def import_record(record):
+            from_dir, name = record["path"].rsplit("/", 1)
+            to_dir = to_path or from_dir
+            contents = archive.read(record)
+            meta = record["meta"]
+            if contents is not None:
+                if "content_hash" in meta and (
+                    hashlib.new(HASH_ALGORITHM, contents).hexdigest()
+                    != meta["content_hash"]
+                ):
+                    raise http_error(
+                        400,
+                        "Contents of {} do not match their hash".format(record["path"]),
+                    )
+                contents = numpy.frombuffer(contents, dtype=numpy.uint8)
+            meta = {
+                key: value for key, value in meta.items() if key != "stored_content_hash"
+            }
+            # Archives written before outputs were inlined on export still reference the output store
+            contents, meta = self._self_contained(contents, meta)
+
+            created = self._create_array(
+                CloudPath.parse("{}/{}".format(to_dir, name)).tiledb_uri, 5
+            )
+            if created is None:
+                raise http_error(500, "Error creating {}/{}".format(to_dir, name))
+            tiledb_uri, array_name = created
+            self._write_contents(tiledb_uri, contents, meta)
+
+            new_path = "{}/{}".format(to_dir, array_name)
+            self._remember_listing_meta(tiledb_uri, meta)
+            archive.mark_imported(record["path"], to_path, new_path)
+            return dict(path=record["path"], to=new_path, ok=True, size=record["size"])
+
+        results = self.__run_bulk(import_record, pending)
+        for record, result in zip(pending, results):
+            result.setdefault("path", record["path"])
+        return self.__archive_stats(results, len(records) - len(pending), started)
+
+    @profiled("copy", path_arg="from_path")
+    def copy(self, from_path, to_path=None):
+        """
+        Copy an existing file and return its new model.
+
+        Cloud to cloud copies are done array to array, the contents are never decoded. Copies from or to local
+        paths fall back to the generic get and save implementation.
+        """
+        from_cloud_path = CloudPath.parse(from_path)
+        to_cloud_path = None
+        if to_path is not None:
+            to_cloud_path = CloudPath.parse(to_path)
+
+        if not from_cloud_path.is_remote or (
+            to_cloud_path is not None and not to_cloud_path.is_remote
+        ):
+            return super().copy(from_path, to_path)
+
+        from_dir, from_name = from_cloud_path.path.rsplit("/", 1)
+        if to_cloud_path is None:
+            to_cloud_path = CloudPath.parse(from_dir)
+
+        if to_cloud_path.is_dir:
+            if to_cloud_path.namespace is None:
+                raise http_error(
+                    400,
+                    "Copies must be placed in a namespace: {}".format(
+                        to_cloud_path.path
+                    ),
+                )
+            to_dir = to_cloud_path.path
+            to_name = "{}{}1".format(COPY_PATTERN.sub("", from_name), COPY_INSERT)
+        else:
+            to_dir, to_name = to_cloud_path.path.rsplit("/", 1)
+
+        array_name, meta = self._copy_array(
+            from_cloud_path.tiledb_uri,
+            CloudPath.parse("{}/{}".format(to_dir, to_name)).tiledb_uri,
+        )
+
+        self._listings_changed()
+
+        new_path = "{}/{}".format(to_dir, array_name)
+        self._remember_listing_meta(CloudPath.parse(new_path).tiledb_uri, meta)
+        if self._search_index is not None:
+            self._search_index.move(
+                from_cloud_path.tiledb_uri,
+                CloudPath.parse(new_path).tiledb_uri,
+                new_path,
+                keep=True,
+            )
+        if meta.get("type") == "notebook":
+            model = self._notebook_from_array(new_path, content=False)
+            # Add notebook extension to path, so jupyterlab will open with as a notebook
+            model["path"] = new_path + NOTEBOOK_EXT
+        else:
+            model = self._file_from_array(new_path, content=False)
+            model["mimetype"] = meta.get("mimetype")
+        return add_listing_meta(model, meta)
 
     # ContentsManager API part 2: methods that have usable default
     # implementations, but can be overridden in subclasses.
@@ -1107,9 +3123,7 @@ class TileDBCloudContentsManager(TileDBContents, FileContentsManager, HasTraits)
         # if path == "" or path is None:
         #     path = "."
 
-        path_fixed = path.strip("/")
-        if self._is_remote_path(path_fixed):
-            if path_fixed.endswith(NOTEBOOK_EXT):
-                path_fixed = path_fixed[: -1 * len(NOTEBOOK_EXT)]
-            return self._array_exists(path_fixed)
+        cloud_path = CloudPath.parse(path)
+        if cloud_path.is_remote:
+            return self._array_exists(cloud_path.path)
         return super().file_exists(path)